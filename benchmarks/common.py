@@ -0,0 +1,74 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Systems shared between benchmarks. Geometry follows the scattering tests:
+micron sized polystyrene spheres 15 microns above a detector in water.
+"""
+import numpy as np
+
+from holopy.core import detector_grid, update_metadata
+from holopy.scattering import Sphere, Spheres, Spheroid
+
+WAVELEN = 658e-9
+INDEX = 1.33
+POLARIZATION = (1, 0)
+SPACING = 0.1151e-6
+N_PARTICLE = 1.59 + 1e-4j
+Z = 15e-6
+
+DETECTOR_SIZES = [64, 256, 1024]
+RADII = [0.5e-6, 1.0e-6, 2.0e-6]
+
+
+def make_detector(size):
+    detector = detector_grid(size, SPACING)
+    return update_metadata(detector, illum_wavelen=WAVELEN,
+                           medium_index=INDEX,
+                           illum_polarization=POLARIZATION)
+
+
+def detector_center(size):
+    return size * SPACING / 2
+
+
+def make_sphere(size, radius):
+    c = detector_center(size)
+    return Sphere(n=N_PARTICLE, r=radius, center=(c, c, Z))
+
+
+def make_dimer(size, radius):
+    # a small gap keeps Multisphere convergent for the larger radii
+    c = detector_center(size)
+    offset = 1.05 * radius
+    spheres = [Sphere(n=N_PARTICLE, r=radius, center=(c - offset, c, Z)),
+               Sphere(n=N_PARTICLE, r=radius, center=(c + offset, c, Z))]
+    return Spheres(spheres, warn=False)
+
+
+def make_spheroid(size, radius):
+    c = detector_center(size)
+    return Spheroid(n=N_PARTICLE, r=(radius, 1.5 * radius), center=(c, c, Z))
+
+
+def make_random_spheres(size, number, radius, seed=0):
+    random = np.random.RandomState(seed)
+    xy = random.uniform(0, size * SPACING, (number, 2))
+    z = random.uniform(Z, 2 * Z, number)
+    spheres = [Sphere(n=N_PARTICLE, r=radius, center=(x, y, zi))
+               for (x, y), zi in zip(xy, z)]
+    return Spheres(spheres, warn=False)
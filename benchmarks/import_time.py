@@ -0,0 +1,60 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Start-up cost of HoloPy. Every process pool worker and every script pays
+this, so it is tracked per subpackage. Each import is timed in a fresh
+interpreter.
+"""
+
+SUBPACKAGES = [
+    'holopy',
+    'holopy.core',
+    'holopy.core.metadata',
+    'holopy.core.io',
+    'holopy.core.process',
+    'holopy.propagation',
+    'holopy.scattering',
+    'holopy.scattering.scatterer',
+    'holopy.scattering.interface',
+    'holopy.scattering.theory.mie',
+    'holopy.scattering.theory.multisphere',
+    'holopy.scattering.theory.tmatrix',
+    'holopy.scattering.theory.mielens',
+    'holopy.inference',
+    'holopy.inference.model',
+    'holopy.inference.interface',
+    ]
+
+
+class ImportTime:
+    params = SUBPACKAGES
+    param_names = ['module']
+    timeout = 120
+
+    def timeraw_import(self, module):
+        return "import {}".format(module)
+
+
+class AttributeAccessTime:
+    """Cost of the first use of a name that `import holopy` deferred."""
+    params = ['load', 'detector_grid', 'propagate', 'fit']
+    param_names = ['name']
+    timeout = 120
+
+    def timeraw_first_access(self, name):
+        return "holopy.{}".format(name), "import holopy"
@@ -0,0 +1,182 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+End-to-end inference on synthetic holograms of a single sphere, plus the
+per-evaluation cost of the model that every strategy pays.
+"""
+import warnings
+
+import numpy as np
+
+from holopy.core.metadata import make_subset_data, SubsetSampler
+from holopy.inference import (fit, sample, AlphaModel, NmpfitStrategy,
+                              LeastSquaresScipyStrategy, CmaStrategy,
+                              EmceeStrategy, MultiresolutionStrategy,
+                              MultiStartStrategy, LaplaceStrategy)
+from holopy.inference import prior
+from holopy.scattering import calc_holo, Mie, Sphere
+
+from .common import make_detector, detector_center, N_PARTICLE, Z
+
+DETECTOR_SIZE = 64
+RADIUS = 1e-6
+ALPHA = 0.8
+NOISE_SD = 0.05
+
+
+def synthetic_data(size=DETECTOR_SIZE, seed=0):
+    c = detector_center(size)
+    sphere = Sphere(n=N_PARTICLE, r=RADIUS, center=(c, c, Z))
+    holo = calc_holo(make_detector(size), sphere, theory=Mie(), scaling=ALPHA)
+    noise = np.random.RandomState(seed).normal(0, NOISE_SD, holo.shape)
+    return holo.copy(data=holo.values + noise)
+
+
+def make_model(size=DETECTOR_SIZE):
+    c = detector_center(size)
+    sphere = Sphere(n=prior.Uniform(1.5, 1.7, guess=1.58),
+                    r=prior.Uniform(0.5e-6, 1.5e-6, guess=0.95e-6),
+                    center=[prior.Gaussian(c, 2e-7),
+                            prior.Gaussian(c, 2e-7),
+                            prior.Uniform(10e-6, 20e-6, guess=14.5e-6)])
+    return AlphaModel(sphere, noise_sd=NOISE_SD,
+                      alpha=prior.Uniform(0.5, 1, guess=0.75))
+
+
+FIT_STRATEGIES = {
+    'nmpfit': lambda: NmpfitStrategy(),
+    'scipy lsq': lambda: LeastSquaresScipyStrategy(),
+    'cma': lambda: CmaStrategy(npixels=500, popsize=10, parallel=None,
+                               seed=0, tols={'maxiter': 10}),
+    'multiresolution': lambda: MultiresolutionStrategy(factors=[2]),
+    'multistart': lambda: MultiStartStrategy(nstarts=4, parallel=None,
+                                             seed=0),
+    }
+
+
+class Fit:
+    params = list(FIT_STRATEGIES)
+    param_names = ['strategy']
+    timeout = 900
+    number = 1
+    repeat = 3
+
+    def setup(self, strategy):
+        self.data = synthetic_data()
+        self.model = make_model()
+        self.strategy = FIT_STRATEGIES[strategy]()
+
+    def time_fit(self, strategy):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            fit(self.data, self.model, strategy=self.strategy)
+
+
+class Sample:
+    params = ([100, 1000], [False, True])
+    param_names = ['npixels', 'vectorize']
+    timeout = 900
+    number = 1
+    repeat = 3
+
+    def setup(self, npixels, vectorize):
+        self.data = synthetic_data()
+        self.model = make_model()
+        self.strategy = EmceeStrategy(nwalkers=16, nsamples=20,
+                                      npixels=npixels, parallel=None, seed=0,
+                                      vectorize=vectorize)
+
+    def time_sample(self, npixels, vectorize):
+        sample(self.data, self.model, strategy=self.strategy)
+
+
+class Laplace:
+    params = ['hessian', 'fisher']
+    param_names = ['method']
+    timeout = 900
+    number = 1
+    repeat = 3
+
+    def setup(self, method):
+        self.data = synthetic_data()
+        self.model = make_model()
+        self.strategy = LaplaceStrategy(method=method, parallel=None, seed=0)
+
+    def time_sample(self, method):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            sample(self.data, self.model, strategy=self.strategy)
+
+
+class ModelEvaluation:
+    """Cost of a single posterior evaluation, the unit of work of inference."""
+    params = [64, 256]
+    param_names = ['detector_size']
+
+    def setup(self, detector_size):
+        self.data = synthetic_data(detector_size)
+        self.model = make_model(detector_size)
+        self.pars = [par.guess for par in self.model._parameters]
+
+    def time_lnposterior(self, detector_size):
+        self.model._lnposterior(self.pars, self.data)
+
+    def time_lnprior(self, detector_size):
+        self.model._lnprior(self.pars)
+
+    def time_scatterer_from_parameters(self, detector_size):
+        self.model.scatterer_from_parameters(self.pars)
+
+
+class EnsembleEvaluation:
+    """Posterior of a whole ensemble of walkers, one at a time or batched."""
+    params = [100, 1000]
+    param_names = ['npixels']
+
+    def setup(self, npixels):
+        self.data = make_subset_data(synthetic_data(), pixels=npixels, seed=0)
+        self.model = make_model()
+        self.pars = np.array(self.model.generate_guess(32, seed=0))
+
+    def time_lnposterior_loop(self, npixels):
+        for row in self.pars:
+            self.model._lnposterior(row, self.data)
+
+    def time_lnposterior_batch(self, npixels):
+        self.model._lnposterior_batch(self.pars, self.data)
+
+
+class PixelSubsets:
+    """Drawing a new 1000 pixel subset, as CmaStrategy does per evaluation."""
+    params = [256, 1024]
+    param_names = ['detector_size']
+
+    def setup(self, detector_size):
+        self.data = make_detector(detector_size)
+        self.sampler = SubsetSampler(self.data, seed=0)
+        self.weighted = SubsetSampler(self.data, seed=0,
+                                      weights=np.ones(self.data.shape))
+
+    def time_make_subset_data(self, detector_size):
+        make_subset_data(self.data, pixels=1000)
+
+    def time_subset_sampler(self, detector_size):
+        self.sampler.subset(1000)
+
+    def time_weighted_subset_sampler(self, detector_size):
+        self.weighted.subset(1000)
@@ -0,0 +1,84 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmarks for data handling: reconstruction, center finding and
+background averaging.
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from holopy.core import save_image
+from holopy.core.io import load_average
+from holopy.core.process import center_find
+from holopy.propagation import propagate
+from holopy.scattering import calc_holo, Mie
+
+from .common import make_detector, make_sphere, SPACING, Z
+
+
+def synthetic_hologram(size):
+    detector = make_detector(size)
+    return calc_holo(detector, make_sphere(size, 1e-6), theory=Mie())
+
+
+class Propagate:
+    params = ([256, 1024], [1, 10])
+    param_names = ['detector_size', 'n_distances']
+    timeout = 300
+
+    def setup(self, detector_size, n_distances):
+        self.holo = synthetic_hologram(detector_size)
+        self.distances = np.linspace(Z / 2, Z, n_distances)
+
+    def time_propagate(self, detector_size, n_distances):
+        propagate(self.holo, self.distances)
+
+
+class CenterFind:
+    params = [256, 1024]
+    param_names = ['detector_size']
+    timeout = 300
+
+    def setup(self, detector_size):
+        self.holo = synthetic_hologram(detector_size)
+
+    def time_center_find(self, detector_size):
+        center_find(self.holo)
+
+
+class LoadAverage:
+    params = ([256, 1024], [5, 20])
+    param_names = ['image_size', 'n_images']
+    timeout = 300
+
+    def setup(self, image_size, n_images):
+        self.directory = tempfile.mkdtemp()
+        random = np.random.RandomState(0)
+        for i in range(n_images):
+            image = random.randint(0, 255, (image_size, image_size))
+            path = os.path.join(self.directory, 'bg{:02d}.tif'.format(i))
+            save_image(path, image.astype('uint8'))
+
+    def teardown(self, image_size, n_images):
+        shutil.rmtree(self.directory)
+
+    def time_load_average(self, image_size, n_images):
+        load_average(self.directory, spacing=SPACING)
@@ -0,0 +1,124 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Forward model benchmarks for each scattering theory, detector size and
+particle size.
+"""
+from holopy.scattering import calc_holo, calc_field, SphereArray
+from holopy.scattering.theory import (
+    Mie, MieLens, Multisphere, Tmatrix, Lens, ClusteredMultisphere)
+
+from .common import (make_detector, make_sphere, make_dimer, make_spheroid,
+                     make_random_spheres, DETECTOR_SIZES, RADII)
+
+LENS_ANGLE = 0.8
+
+THEORIES = {
+    'Mie': (Mie, make_sphere),
+    'Multisphere': (Multisphere, make_dimer),
+    'Tmatrix': (Tmatrix, make_spheroid),
+    'Lens(Mie)': (lambda: Lens(LENS_ANGLE, Mie()), make_sphere),
+    'MieLens': (lambda: MieLens(lens_angle=LENS_ANGLE), make_sphere),
+    }
+
+
+class _ForwardModel:
+    params = (list(THEORIES), DETECTOR_SIZES, RADII)
+    param_names = ['theory', 'detector_size', 'radius']
+    timeout = 600
+    number = 1
+
+    def setup(self, theory, detector_size, radius):
+        make_theory, make_scatterer = THEORIES[theory]
+        self.theory = make_theory()
+        self.scatterer = make_scatterer(detector_size, radius)
+        self.detector = make_detector(detector_size)
+
+
+class CalcHolo(_ForwardModel):
+    def time_calc_holo(self, theory, detector_size, radius):
+        calc_holo(self.detector, self.scatterer, theory=self.theory)
+
+    def peakmem_calc_holo(self, theory, detector_size, radius):
+        calc_holo(self.detector, self.scatterer, theory=self.theory)
+
+
+class CalcField(_ForwardModel):
+    def time_calc_field(self, theory, detector_size, radius):
+        calc_field(self.detector, self.scatterer, theory=self.theory)
+
+
+class ManySpheres:
+    """Mie superposition for crowded fields of view."""
+    params = ([10, 50], [256, 1024])
+    param_names = ['n_spheres', 'detector_size']
+    timeout = 600
+    number = 1
+
+    def setup(self, n_spheres, detector_size):
+        self.scatterer = make_random_spheres(detector_size, n_spheres, 0.5e-6)
+        self.detector = make_detector(detector_size)
+
+    def time_calc_holo_mie(self, n_spheres, detector_size):
+        calc_holo(self.detector, self.scatterer, theory=Mie())
+
+    def time_calc_holo_clustered(self, n_spheres, detector_size):
+        calc_holo(self.detector, self.scatterer, theory=ClusteredMultisphere())
+
+    def time_calc_holo_mie_truncated(self, n_spheres, detector_size):
+        calc_holo(self.detector, self.scatterer,
+                  theory=Mie(truncation_tolerance=1e-3))
+
+
+class SphereClusters:
+    """Building and checking large clusters as Spheres or SphereArray."""
+    params = [100, 1000, 10000]
+    param_names = ['n_spheres']
+
+    def setup(self, n_spheres):
+        self.spheres = make_random_spheres(1024, n_spheres, 0.5e-6)
+        self.array = SphereArray.from_spheres(self.spheres)
+        self.parameters = self.spheres.parameters
+
+    def time_overlaps_spheres(self, n_spheres):
+        self.spheres.overlaps
+
+    def time_overlaps_sphere_array(self, n_spheres):
+        self.array.overlaps
+
+    def time_from_parameters_spheres(self, n_spheres):
+        self.spheres.from_parameters(self.parameters)
+
+    def time_from_parameters_sphere_array(self, n_spheres):
+        self.array.from_parameters(self.parameters)
+
+
+class FromParameters:
+    """Per-evaluation cost of rebuilding scatterers during inference."""
+
+    def setup(self):
+        self.sphere = make_sphere(256, 1e-6)
+        self.dimer = make_dimer(256, 1e-6)
+        self.sphere_parameters = self.sphere.parameters
+        self.dimer_parameters = self.dimer.parameters
+
+    def time_sphere(self):
+        self.sphere.from_parameters(self.sphere_parameters)
+
+    def time_dimer(self):
+        self.dimer.from_parameters(self.dimer_parameters)
@@ -31,11 +31,24 @@ images and calculations.
 """
 
 
-from holopy import core, scattering, fitting, inference
-from holopy.core import (load, save, load_image, save_image, show,
-                         check_display, detector_grid, detector_points)
-from holopy.propagation import propagate
-from holopy.inference import fit, sample
+from holopy.core.lazy import lazy_import
+
+# Subpackages (core, scattering, fitting, inference, propagation) and the
+# names below are only imported when first used, so `import holopy` stays
+# cheap for process pool workers and scripts that need a small part of it.
+__getattr__, __dir__ = lazy_import(__name__, {
+    'load': 'holopy.core',
+    'save': 'holopy.core',
+    'load_image': 'holopy.core',
+    'save_image': 'holopy.core',
+    'show': 'holopy.core',
+    'check_display': 'holopy.core',
+    'detector_grid': 'holopy.core',
+    'detector_points': 'holopy.core',
+    'propagate': 'holopy.propagation',
+    'fit': 'holopy.inference',
+    'sample': 'holopy.inference',
+    })
 
 __version__ = '3.4.0'
 __version_info__ = tuple([int(num) for num in __version__.split('.')])
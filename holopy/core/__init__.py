@@ -22,7 +22,18 @@
 
 """
 
-from holopy.core.metadata import (detector_grid, detector_points,
-                                  update_metadata, copy_metadata)
-from holopy.core.io import (load, load_image, save, save_image, save_images,
-                            show, check_display)
+from holopy.core.lazy import lazy_import
+
+__getattr__, __dir__ = lazy_import(__name__, {
+    'detector_grid': 'holopy.core.metadata',
+    'detector_points': 'holopy.core.metadata',
+    'update_metadata': 'holopy.core.metadata',
+    'copy_metadata': 'holopy.core.metadata',
+    'load': 'holopy.core.io',
+    'load_image': 'holopy.core.io',
+    'save': 'holopy.core.io',
+    'save_image': 'holopy.core.io',
+    'save_images': 'holopy.core.io',
+    'show': 'holopy.core.io',
+    'check_display': 'holopy.core.io',
+    })
@@ -36,6 +36,25 @@ except AttributeError:
     FullLoader = yaml.Loader
 YAMLLOADERS = (FullLoader, yaml.SafeLoader)
 
+# HoloPy packages import their modules lazily, so a class's yaml tag is only
+# registered once the module defining it has been imported.
+SERIALIZABLE_PACKAGES = ['holopy.scattering.scatterer',
+                         'holopy.scattering.theory', 'holopy.inference',
+                         'holopy.core.parallel']
+
+
+def _construct_unregistered(loader, tag_suffix, node):
+    from holopy.core.lazy import import_all
+    for package in SERIALIZABLE_PACKAGES:
+        import_all(package)
+    if node.tag in loader.yaml_constructors:
+        return loader.yaml_constructors[node.tag](loader, node)
+    return loader.construct_undefined(node)
+
+
+for loader in YAMLLOADERS:
+    yaml.add_multi_constructor('!', _construct_unregistered, Loader=loader)
+
 # Metaclass black magic to eliminate need for adding yaml_tag lines to classes
 class SerializableMetaclass(yaml.YAMLObjectMetaclass):
     def __init__(cls, name, bases, kwds):
@@ -0,0 +1,91 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Deferred imports for HoloPy packages.
+
+Importing a HoloPy subpackage used to pull in everything it exposes,
+including xarray, scipy.optimize, the compiled scattering codes and the
+probes for optional inference dependencies. Packages instead declare
+where each of their public names lives and the defining module is only
+imported the first time the name is looked up (PEP 562, Python 3.7+).
+"""
+import importlib
+import sys
+
+
+def lazy_import(package, attributes):
+    """
+    Build module level __getattr__ and __dir__ functions for a package
+
+    Parameters
+    ----------
+    package : string
+        __name__ of the package using deferred imports
+    attributes : dict
+        maps each public name of the package to the full name of the module
+        defining it. Submodules of the package do not need to be listed;
+        they are imported on first access.
+
+    Returns
+    -------
+    __getattr__, __dir__ : function
+        assign these at the top level of the package's __init__.py
+
+    Examples
+    --------
+    >>> __getattr__, __dir__ = lazy_import(__name__, {'Mie': 'holopy.x.mie'})
+    """
+    def __getattr__(name):
+        if name in attributes:
+            value = getattr(importlib.import_module(attributes[name]), name)
+        else:
+            value = _import_submodule(package, name)
+        # cache, so that __getattr__ is only called on the first access
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(attributes))
+
+    return __getattr__, __dir__
+
+
+def _import_submodule(package, name):
+    full_name = '{}.{}'.format(package, name)
+    try:
+        return importlib.import_module(full_name)
+    except ModuleNotFoundError as e:
+        if e.name != full_name:
+            # the submodule exists but one of its dependencies doesn't
+            raise
+    msg = "module '{}' has no attribute '{}'".format(package, name)
+    raise AttributeError(msg)
+
+
+def import_all(package):
+    """
+    Import every deferred name of a package.
+
+    Needed wherever code relies on the side effects of importing a module,
+    such as yaml tags being registered when a HoloPyObject class is defined.
+    """
+    module = importlib.import_module(package)
+    for name in dir(module):
+        if not name.startswith('_'):
+            getattr(module, name)
+    return module
@@ -22,6 +22,7 @@ Classes for defining metadata about experimental or calculated results.
 
 """
 
+import os
 from warnings import warn
 from collections import OrderedDict
 
@@ -290,7 +291,8 @@ def copy_metadata(old, data, do_coords=True):
     return new
 
 
-def make_subset_data(data, pixels=None, return_selection=False, seed=None):
+def make_subset_data(data, pixels=None, return_selection=False, seed=None,
+                     weights=None):
     """Sub-sample a data for faster inference.
 
     Parameters
@@ -304,6 +306,9 @@ def make_subset_data(data, pixels=None, return_selection=False, seed=None):
         Default is False
     seed : int or None, optional
         If not None, the seed to seed the random number generator with.
+    weights : str or array, optional
+        Draw pixels with probability proportional to weights instead of
+        uniformly, as described in :class:`SubsetSampler`.
 
     Returns
     -------
@@ -313,6 +318,11 @@ def make_subset_data(data, pixels=None, return_selection=False, seed=None):
     """
     if pixels is None:
         return data
+    if weights is not None:
+        sampler = SubsetSampler(data, seed=seed, weights=weights)
+        selection, importance = sampler._draw(pixels)
+        subset = sampler._subset(selection, importance)
+        return (subset, selection) if return_selection else subset
     if seed is not None:
         np.random.seed(seed)
     tot_pix = len(data.x) * len(data.y)
@@ -328,6 +338,116 @@ def make_subset_data(data, pixels=None, return_selection=False, seed=None):
         return subset
 
 
+class SubsetSampler:
+    """Draws many random pixel subsets of the same data.
+
+    :func:`make_subset_data` flattens the whole image and shuffles every
+    pixel index to draw each subset. A SubsetSampler flattens the image once
+    and draws only the requested pixel indices, so a new subset costs about
+    as much as the pixels in it. This matters when the subset changes on
+    every posterior evaluation, as in CmaStrategy with resample_pixels.
+
+    Parameters
+    ----------
+    data : `xr.DataArray`
+        The data to subsample
+    seed : int or None, optional
+        Seed for the random pixel selections. Processes other than the one
+        that created the sampler, such as pool workers, draw their own
+        unseeded selections so that they do not all repeat the same ones.
+    weights : str or array, optional
+        Draw pixels with probability proportional to weights, which have
+        the shape of data, instead of uniformly. A string is passed as the
+        method to :func:`.fringe_weights` to favor pixels on the fringes of
+        the hologram. Pixels are drawn with replacement and repeats are
+        merged, so subsets can have slightly fewer pixels than asked for.
+        Each subset carries importance weights in its ``pixel_weights``
+        attribute, which :class:`.Model` uses so that the likelihood of a
+        weighted subset has the same expectation as that of a uniform one.
+    """
+    def __init__(self, data, seed=None, weights=None):
+        self.data = data
+        self.seed = seed
+        flattened = copy_metadata(data, flat(data), do_coords=False)
+        flattened.attrs['original_dims'] = {
+            key: data[key].values for key in data.dims}
+        self._flattened = flattened
+        self.size = flattened.sizes['flat']
+        self._pid = os.getpid()
+        self._random = np.random.default_rng(seed)
+        if weights is None:
+            self._probabilities = None
+        else:
+            self._probabilities = self._pixel_probabilities(weights)
+            self._cumulative = np.cumsum(self._probabilities)
+
+    def selection(self, pixels):
+        """Indices of a random set of distinct pixels in the flattened data"""
+        return self._draw(pixels)[0]
+
+    def subset(self, pixels=None, selection=None):
+        """
+        New random subset of the data, like the output of
+        :func:`make_subset_data`. Pass selection instead of pixels to pick
+        the pixels yourself.
+        """
+        if selection is None:
+            if pixels is None:
+                return self.data
+            selection, importance = self._draw(pixels)
+        else:
+            importance = self.importance_weights(selection)
+        return self._subset(selection, importance)
+
+    def values(self, pixels=None, selection=None):
+        """Values of a new random subset of the data as a numpy array"""
+        if selection is None:
+            selection = self.selection(pixels)
+        return self._flattened.values[..., selection]
+
+    def importance_weights(self, selection):
+        """
+        Importance weights of the selected pixels, each drawn once, or None
+        if pixels are drawn uniformly.
+        """
+        if self._probabilities is None:
+            return None
+        return 1 / (self.size * self._probabilities[selection])
+
+    def _draw(self, pixels):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._random = np.random.default_rng()
+        if self._probabilities is None:
+            selection = self._random.choice(self.size, pixels, replace=False)
+            return selection, None
+        draws = np.searchsorted(self._cumulative,
+                                self._random.random(pixels) *
+                                self._cumulative[-1], side='right')
+        draws = np.minimum(draws, self.size - 1)
+        selection, counts = np.unique(draws, return_counts=True)
+        return selection, counts * self.importance_weights(selection)
+
+    def _subset(self, selection, importance):
+        subset = self._flattened.isel(flat=selection)
+        if importance is not None:
+            subset = subset.assign_attrs(pixel_weights=importance)
+        return subset
+
+    def _pixel_probabilities(self, weights):
+        if isinstance(weights, str):
+            from holopy.core.process import fringe_weights
+            weights = fringe_weights(self.data, weights)
+        weights = np.broadcast_to(get_values(weights), self.data.shape)
+        weights = flat(self.data.copy(data=weights.astype(float))).values
+        # one probability per pixel, whatever the other dimensions
+        weights = weights.reshape(-1, self.size).sum(axis=0)
+        if np.any(weights < 0) or not weights.sum() > 0:
+            raise ValueError("Pixel weights must be non-negative and not "
+                             "all zero")
+        return weights / weights.sum()
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #             Methods not part of the Holopy API
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -408,6 +528,34 @@ def get_values(a):
     return getattr(a, 'values', a)
 
 
+def get_metadata(a, key, default=None):
+    """
+    Look up a metadata attribute such as ``medium_index`` of a detector
+
+    Same as ``getattr(a, key, default)``, but reads the attrs of xarray
+    objects directly. Plain attribute access on an xarray object searches
+    its coordinates first, which is slow on flattened detectors.
+    """
+    attrs = getattr(a, 'attrs', None)
+    if isinstance(attrs, dict) and key in attrs:
+        return attrs[key]
+    return getattr(a, key, default)
+
+
+def get_coordinate(a, name):
+    """
+    Values of coordinate `name` of a detector, or None if it has none
+
+    Also finds coordinates stored as levels of a stacked (flat) dimension.
+    """
+    if name in a.coords:
+        return a.coords[name].values
+    for index in a.indexes.values():
+        if name in (index.names or ()):
+            return np.asarray(index.get_level_values(name))
+    return None
+
+
 def default_norms(coords, n):
     if n is 'auto':
         if 'x' in coords:
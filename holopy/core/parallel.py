@@ -0,0 +1,402 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Sharing large inputs with the worker processes of a pool.
+
+Inference strategies evaluate the same posterior, with the same model and
+data, many thousands of times in pool workers. Pickling the model and data
+for every batch of evaluations can cost as much as the evaluations
+themselves. Objects published with :class:`SharedObjects` are instead sent
+to each worker once, either when it starts or the first time it needs them,
+with their arrays placed in memory mapped files that every worker reads
+without copying. From then on, pickling a published object only sends a
+key.
+
+Starting the workers themselves is also slow, since each one has to import
+holopy. A :class:`WorkerPool` keeps its workers running across many fits
+and samplings until it is closed.
+"""
+import os
+import inspect
+import multiprocessing
+import pickle
+import tempfile
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+
+import numpy as np
+import xarray as xr
+
+from holopy.core.holopy_object import HoloPyObject
+from holopy.core.utils import choose_pool, NO_SCHWIMMBAD
+
+# Objects published to this process, by key. Filled in the main process by
+# SharedObjects and in workers by initialize_worker or on first use.
+_PUBLISHED = {}
+# Keys of the objects a worker loaded on first use, oldest first. Workers of
+# a WorkerPool outlive the objects published to them, so only the most recent
+# ones are kept.
+_LOADED = deque()
+_MAX_LOADED = 8
+
+
+class SharedArray:
+    """
+    A read-only numpy array stored in a memory mapped file. Pickling it only
+    sends the file name, and every process restoring it maps the same file.
+    """
+    def __init__(self, array, directory=None):
+        array = np.asarray(array)
+        if directory is None:
+            directory = _shared_directory()
+        handle, self.filename = tempfile.mkstemp(
+            prefix='holopy-', suffix='.npy', dir=directory)
+        os.close(handle)
+        np.save(self.filename, array, allow_pickle=False)
+
+    def restore(self):
+        return np.load(self.filename, mmap_mode='r')
+
+    def delete(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+
+class _SharedDataArray:
+    """An xarray whose values are in a SharedArray."""
+    def __init__(self, data, directory=None):
+        self.values = SharedArray(data.values, directory)
+        self.dims = data.dims
+        self.coords = data.coords
+        self.attrs = data.attrs
+        self.name = data.name
+
+    def restore(self):
+        return xr.DataArray(self.values.restore(), coords=self.coords,
+                            dims=self.dims, attrs=self.attrs, name=self.name)
+
+    def delete(self):
+        self.values.delete()
+
+
+class SharedObjects:
+    """
+    Objects published once to each worker of a process pool.
+
+    Use :meth:`proxy` instead of the objects themselves in functions sent to
+    a pool of local processes. Workers load a published object the first
+    time they need it, or when they start if :func:`initialize_worker` and
+    :attr:`states` are the initializer and initargs of the pool. Call
+    :meth:`close` once the pool is done with the objects to remove the
+    shared files.
+
+    Parameters
+    ----------
+    objects : list
+        Objects to publish, such as :class:`.LnpostWrapper`. xarray and
+        numpy attributes of the objects are placed in shared memory.
+    directory : str, optional
+        Where to put the memory mapped files. Default is /dev/shm if it
+        exists, otherwise the system temporary directory.
+    """
+    def __init__(self, objects, directory=None):
+        if directory is None:
+            directory = _shared_directory()
+        self.keys = []
+        self.states = {}
+        self._state_files = {}
+        self._proxies = {}
+        for obj in objects:
+            key = uuid.uuid4().hex
+            state = {name: _share(value, directory)
+                     for name, value in _getstate(obj).items()}
+            self.keys.append(key)
+            self.states[key] = (type(obj), state)
+            self._state_files[key] = _save_state(self.states[key], directory)
+            self._proxies[id(obj)] = _Proxy(key, self._state_files[key])
+            _PUBLISHED[key] = obj
+
+    def proxy(self, obj):
+        """
+        Stand-in for a published object that pickles as its key. It behaves
+        like obj in this process and in worker processes on the same machine.
+        """
+        return self._proxies[id(obj)]
+
+    def close(self):
+        for key in self.keys:
+            _PUBLISHED.pop(key, None)
+            for value in self.states[key][1].values():
+                if isinstance(value, (SharedArray, _SharedDataArray)):
+                    value.delete()
+            if os.path.exists(self._state_files[key]):
+                os.remove(self._state_files[key])
+        self.keys = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def initialize_worker(states):
+    """
+    Pool initializer restoring the objects published by :class:`SharedObjects`
+    in a worker process.
+    """
+    for key, (cls, state) in states.items():
+        _PUBLISHED[key] = _restore(cls, state)
+
+
+class WorkerPool(HoloPyObject):
+    """
+    A pool of worker processes that stays open until it is closed.
+
+    Strategies close the pools they start when they finish, so every fit,
+    sampling or tempering stage pays for starting workers again. Pass a
+    WorkerPool as the ``parallel`` argument of strategies instead to reuse
+    the same workers for all of them. Models and data sent to the workers
+    are loaded once per worker and fit, and the workers are started the
+    first time they are needed or by :meth:`start`.
+
+    Parameters
+    ----------
+    processes : int, optional
+        number of worker processes. Default is one per CPU.
+
+    Examples
+    --------
+    >>> with WorkerPool(4) as pool:
+    ...     strategy = EmceeStrategy(parallel=pool)
+    ...     results = [model.sample(data, strategy) for data in holograms]
+    """
+    def __init__(self, processes=None):
+        self.processes = processes
+        self._pool = None
+
+    @property
+    def size(self):
+        if self.processes is None:
+            return os.cpu_count()
+        return self.processes
+
+    @property
+    def running(self):
+        return self._pool is not None
+
+    def start(self):
+        """Start the worker processes if they are not running yet."""
+        if self._pool is None:
+            self._pool = choose_pool(self.size)
+        return self
+
+    def map(self, function, arguments):
+        return self.start()._pool.map(function, arguments)
+
+    def close(self):
+        """Stop the worker processes once they finish their current work."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getstate__(self):
+        # running workers cannot be sent to another process
+        return {'processes': self.processes, '_pool': None}
+
+
+@contextmanager
+def persistent_pool(parallel):
+    """
+    Pool to reuse for several calculations in a row.
+
+    Yields a running :class:`WorkerPool`, closed on exit, if parallel would
+    make :func:`.choose_pool` start a multiprocessing pool, and parallel
+    itself otherwise.
+    """
+    if _starts_process_pool(parallel) and not _chooses_mpi(parallel):
+        processes = parallel if isinstance(parallel, int) else None
+        with WorkerPool(processes) as pool:
+            yield pool
+    else:
+        yield parallel
+
+
+class _Proxy:
+    def __init__(self, key, state_file):
+        self._key = key
+        self._state_file = state_file
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        value = getattr(_published(self._key, self._state_file), name)
+        if inspect.ismethod(value):
+            # a bound method would pickle the whole object along with it
+            return partial(_call_published, self._key, self._state_file,
+                           name)
+        return value
+
+    def __reduce__(self):
+        return (_published, (self._key, self._state_file))
+
+
+def _published(key, state_file=None):
+    if key not in _PUBLISHED:
+        with open(state_file, 'rb') as f:
+            _PUBLISHED[key] = _restore(*pickle.load(f))
+        _LOADED.append(key)
+        while len(_LOADED) > _MAX_LOADED:
+            _PUBLISHED.pop(_LOADED.popleft(), None)
+    return _PUBLISHED[key]
+
+
+def _call_published(key, state_file, method_name, *args, **kwargs):
+    return getattr(_published(key, state_file), method_name)(*args, **kwargs)
+
+
+def _restore(cls, state):
+    obj = cls.__new__(cls)
+    for name, value in state.items():
+        if isinstance(value, (SharedArray, _SharedDataArray)):
+            value = value.restore()
+        setattr(obj, name, value)
+    return obj
+
+
+def _getstate(obj):
+    getstate = getattr(type(obj), '__getstate__', None)
+    if getstate is not None and getstate is not getattr(object, '__getstate__',
+                                                        None):
+        return obj.__getstate__()
+    return vars(obj)
+
+
+def _save_state(state, directory):
+    handle, filename = tempfile.mkstemp(
+        prefix='holopy-', suffix='.pkl', dir=directory)
+    with os.fdopen(handle, 'wb') as f:
+        pickle.dump(state, f)
+    return filename
+
+
+@contextmanager
+def shared_pool(parallel, obj):
+    """
+    Choose a pool as :func:`.choose_pool` does, with obj published to its
+    workers if the pool is a :class:`WorkerPool` or one holopy starts itself.
+
+    Yields the pool and the object to use in functions sent to it: a proxy
+    for obj if it was published, otherwise obj itself. Pools chosen here are
+    closed on exit, but pools passed in as parallel are left open.
+
+    Parameters
+    ----------
+    parallel :
+        number of threads to use or pool object or one of
+        {None, 'all', 'mpi', 'auto'}
+    obj :
+        object to publish, usually an :class:`.LnpostWrapper`, or a bound
+        method of one. Plain functions are not published.
+    """
+    method_name = None
+    if inspect.ismethod(obj):
+        obj, method_name = obj.__self__, obj.__name__
+    shared = None
+    if isinstance(parallel, WorkerPool) and not inspect.isroutine(obj):
+        shared = SharedObjects([obj])
+        pool = parallel
+        obj = shared.proxy(obj)
+    elif _starts_process_pool(parallel) and not inspect.isroutine(obj):
+        shared = SharedObjects([obj])
+        pool = choose_pool(parallel, initializer=initialize_worker,
+                           initargs=(shared.states,))
+        if _is_multipool(pool):
+            obj = shared.proxy(obj)
+        else:
+            shared.close()
+            shared = None
+    else:
+        pool = choose_pool(parallel)
+    if method_name is not None:
+        obj = getattr(obj, method_name)
+    try:
+        yield pool, obj
+    finally:
+        if pool is not parallel:
+            pool.close()
+        if shared is not None:
+            shared.close()
+
+
+def in_worker_process():
+    """
+    Whether this is a worker process of a pool, which cannot start worker
+    processes of its own.
+    """
+    if multiprocessing.current_process().daemon:
+        return True
+    if NO_SCHWIMMBAD:
+        return False
+    # schwimmbad's pools are built on multiprocess rather than multiprocessing
+    import multiprocess
+    return multiprocess.current_process().daemon
+
+
+def _is_multipool(pool):
+    if NO_SCHWIMMBAD:
+        return False
+    from schwimmbad import MultiPool
+    return isinstance(pool, MultiPool)
+
+
+def _chooses_mpi(parallel):
+    if parallel == 'mpi':
+        return True
+    if parallel == 'auto' and not NO_SCHWIMMBAD:
+        from schwimmbad import MPIPool
+        return MPIPool.enabled()
+    return False
+
+
+def _starts_process_pool(parallel):
+    return (isinstance(parallel, int) or
+            (isinstance(parallel, str) and parallel in ('all', 'auto')))
+
+
+def _share(value, directory):
+    if isinstance(value, xr.DataArray):
+        return _SharedDataArray(value, directory)
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        return SharedArray(value, directory)
+    return value
+
+
+def _shared_directory():
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm'
+    return None
@@ -25,7 +25,7 @@ or detrending
 .. moduleauthor:: Jerome Fung <jerome.fung@post.harvard.edu>
 """
 from scipy.signal import detrend as dt
-from scipy.ndimage import gaussian_filter
+from scipy.ndimage import gaussian_filter, sobel, uniform_filter
 import numpy as np
 
 from holopy.core.errors import BadImage
@@ -148,6 +148,39 @@ def subimage(arr, center, shape):
     return copy_metadata(arr, arr.isel(x=extent[0], y=extent[1]))
 
 
+def bin_image(image, factor):
+    """
+    Average blocks of pixels into single larger pixels
+
+    Parameters
+    ----------
+    image : xarray.DataArray
+        The image to bin
+    factor : int
+        Width in pixels of the square blocks to average. Pixels left over at
+        the far edges of the image are dropped.
+
+    Returns
+    -------
+    binned : xarray.DataArray
+        Image with factor times fewer pixels along x and y, whose coordinates
+        are the centers of the blocks. noise_sd is divided by factor, as for
+        independent noise in each pixel.
+    """
+    factor = int(factor)
+    if factor < 1:
+        raise ValueError("factor must be a positive integer, not {}".format(
+            factor))
+    if factor == 1:
+        return image
+    binned = image.coarsen(x=factor, y=factor, boundary='trim').mean(
+        keep_attrs=True)
+    binned = copy_metadata(image, binned, do_coords=False)
+    if binned.attrs.get('noise_sd') is not None:
+        binned = update_metadata(binned, noise_sd=image.noise_sd / factor)
+    return binned
+
+
 def add_noise(image, noise_mean=.1, smoothing=.01, poisson_lambda=1000):
     """Add simulated noise to images. Intended for use with exact
     calculated images to make them look more like noisy 'real'
@@ -246,3 +279,49 @@ def bg_correct(raw, bg, df=None):
         holo = update_metadata(holo, noise_sd = bg.noise_sd)
 
     return holo
+
+
+def fringe_weights(image, method='gradient', size=3, floor=0.1):
+    """
+    Weights for each pixel of a hologram that are large where it has fringes
+    and small on flat background, for drawing informative pixel subsets.
+
+    Parameters
+    ----------
+    image : xarray.DataArray
+        Hologram to weight
+    method : {'gradient', 'variance'}, optional
+        'gradient' uses the magnitude of the intensity gradient, smoothed
+        over size pixels. 'variance' uses the variance of the intensity in
+        a window of size pixels around each pixel.
+    size : float, optional
+        Width in pixels of the smoothing or variance window
+    floor : float, optional
+        Fraction of the weight spread evenly over all pixels, so that
+        background pixels still have a chance of being drawn. Between 0
+        and 1.
+
+    Returns
+    -------
+    weights : xarray.DataArray
+        Weights with mean 1, at least floor everywhere
+    """
+    values = np.asarray(image.values, dtype=float)
+    in_plane = [dim in ('x', 'y') for dim in image.dims]
+    if method == 'gradient':
+        values = gaussian_filter(values, [1 if i else 0 for i in in_plane])
+        energy = np.hypot(sobel(values, axis=image.dims.index('x')),
+                          sobel(values, axis=image.dims.index('y')))
+        energy = gaussian_filter(energy, [size if i else 0 for i in in_plane])
+    elif method == 'variance':
+        window = [size if i else 1 for i in in_plane]
+        mean = uniform_filter(values, window)
+        energy = np.maximum(uniform_filter(values**2, window) - mean**2, 0)
+    else:
+        raise ValueError("method must be 'gradient' or 'variance', "
+                         "not {}".format(method))
+    if energy.mean() > 0:
+        weights = (1 - floor) * energy / energy.mean() + floor
+    else:
+        weights = np.ones_like(energy)
+    return copy_metadata(image, image.copy(data=weights))
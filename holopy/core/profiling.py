@@ -0,0 +1,333 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Opt-in profiling of the stages of a HoloPy calculation.
+
+Functions and code blocks along the scattering pipeline are marked as
+named stages. While a :class:`Profiler` is active, each stage records its
+wall time and the memory it allocated; otherwise marking a stage costs a
+single global lookup.
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, namedtuple
+
+StageRecord = namedtuple(
+    'StageRecord',
+    ['name', 'start', 'duration', 'depth', 'allocated', 'peak', 'pid', 'tid'])
+StageRecord.__doc__ = """
+Timing of one call to a profiled stage
+
+start and duration are in seconds from time.perf_counter. allocated is
+the net change in traced memory over the stage and peak the largest
+amount of memory it held above its starting point, both in bytes (None
+if memory was not tracked). Before Python 3.9 tracemalloc cannot reset its
+peak, so peak is then only the larger of the memory held at the start and
+at the end of the stage.
+"""
+
+_active_profiler = None
+# tracemalloc.reset_peak is new in Python 3.9
+_RESETS_PEAK = hasattr(tracemalloc, 'reset_peak')
+
+
+class _NoProfiling:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_NO_PROFILING = _NoProfiling()
+
+
+def stage(name):
+    """
+    Mark a block of code as a profiled stage
+
+    Parameters
+    ----------
+    name : string
+        name of the stage in reports and traces
+
+    Returns
+    -------
+    context manager recording the enclosed block if a :class:`Profiler`
+    is active, and doing nothing otherwise.
+
+    Examples
+    --------
+    >>> with stage('field kernel'):
+    ...     fields = compute_fields()
+    """
+    if _active_profiler is None:
+        return _NO_PROFILING
+    return _active_profiler._stage(name)
+
+
+def profiled(function=None, name=None):
+    """
+    Decorator recording every call to a function as a profiled stage
+
+    The stage is named after the function unless `name` is given.
+    """
+    if function is None:
+        return functools.partial(profiled, name=name)
+    stage_name = function.__name__ if name is None else name
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if _active_profiler is None:
+            return function(*args, **kwargs)
+        with _active_profiler._stage(stage_name):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+class Profiler:
+    """
+    Collects wall time and memory allocations of profiled stages
+
+    Use as a context manager around the calculation to profile. Stages
+    are recorded in the process that runs them, so to profile pool
+    workers run a Profiler in each worker and :meth:`merge` their
+    records back into one profiler.
+
+    Parameters
+    ----------
+    track_memory : bool
+        If True (default) also record bytes allocated by each stage with
+        tracemalloc. This slows down the profiled code noticeably; disable
+        it when only timings are of interest.
+
+    Attributes
+    ----------
+    records : list of :class:`StageRecord`
+        one record per completed stage, in order of completion
+
+    Examples
+    --------
+    >>> with Profiler() as profiler:
+    ...     holo = calc_holo(detector, sphere)
+    >>> print(profiler.report())
+    >>> profiler.save_trace('calc_holo.json')  # open in chrome://tracing
+    """
+    def __init__(self, track_memory=True):
+        self.track_memory = track_memory
+        self.records = []
+        self._open_stages = []
+        self._previous_profiler = None
+        self._started_tracemalloc = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """Begin recording stages in this process"""
+        global _active_profiler
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._previous_profiler = _active_profiler
+        _active_profiler = self
+
+    def stop(self):
+        """Stop recording, reactivating any profiler active before start"""
+        global _active_profiler
+        _active_profiler = self._previous_profiler
+        self._previous_profiler = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def clear(self):
+        """Discard all records"""
+        self.records = []
+
+    def merge(self, other):
+        """
+        Add the records of another profiler, eg. one run in a worker process
+
+        Parameters
+        ----------
+        other : :class:`Profiler` or list of :class:`StageRecord`
+        """
+        records = other.records if isinstance(other, Profiler) else other
+        self.records.extend(StageRecord(*record) for record in records)
+
+    def _stage(self, name):
+        return _Stage(self, name)
+
+    def summary(self):
+        """
+        Aggregate records by process and stage
+
+        Returns
+        -------
+        summary : dict
+            maps (pid, stage name) to a dict with the number of `calls`,
+            `total` and `mean` time in seconds, total net bytes `allocated`
+            and the largest `peak` in bytes, in order of first call.
+        """
+        summary = OrderedDict()
+        for record in sorted(self.records, key=lambda r: (r.pid, r.start)):
+            key = (record.pid, record.name)
+            if key not in summary:
+                summary[key] = {'calls': 0, 'total': 0.0, 'allocated': None,
+                                'peak': None, 'depth': record.depth}
+            entry = summary[key]
+            entry['calls'] += 1
+            entry['total'] += record.duration
+            entry['depth'] = min(entry['depth'], record.depth)
+            if record.allocated is not None:
+                entry['allocated'] = (entry['allocated'] or 0) + record.allocated
+                entry['peak'] = max(entry['peak'] or 0, record.peak)
+        for entry in summary.values():
+            entry['mean'] = entry['total'] / entry['calls']
+        return summary
+
+    def report(self):
+        """
+        Format a table of time and memory spent in each stage per process
+
+        Returns
+        -------
+        report : string
+        """
+        header = '{:<40} {:>7} {:>11} {:>11} {:>12} {:>12}'.format(
+            'stage', 'calls', 'total (ms)', 'mean (ms)', 'allocated',
+            'peak')
+        lines = []
+        current_pid = None
+        for (pid, name), entry in self.summary().items():
+            if pid != current_pid:
+                if lines:
+                    lines.append('')
+                lines.extend(['process {}'.format(pid), header])
+                current_pid = pid
+            lines.append('{:<40} {:>7} {:>11.3f} {:>11.3f} {:>12} {:>12}'.format(
+                '  ' * entry['depth'] + name, entry['calls'],
+                1e3 * entry['total'], 1e3 * entry['mean'],
+                _format_bytes(entry['allocated']), _format_bytes(entry['peak'])))
+        return '\n'.join(lines)
+
+    def trace_events(self):
+        """
+        Records as complete events of the Chrome trace event format
+
+        Returns
+        -------
+        events : list of dict
+        """
+        events = []
+        for record in self.records:
+            event = {'name': record.name, 'cat': 'holopy', 'ph': 'X',
+                     'ts': 1e6 * record.start, 'dur': 1e6 * record.duration,
+                     'pid': record.pid, 'tid': record.tid}
+            if record.allocated is not None:
+                event['args'] = {'allocated': record.allocated,
+                                 'peak': record.peak}
+            events.append(event)
+        return events
+
+    def save_trace(self, filename):
+        """
+        Save records as a json trace
+
+        The trace can be opened in chrome://tracing, Perfetto or speedscope.
+
+        Parameters
+        ----------
+        filename : string
+        """
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': self.trace_events(),
+                       'displayTimeUnit': 'ms'}, f)
+
+
+class _Stage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        open_stages = self.profiler._open_stages
+        self.depth = len(open_stages)
+        self.tracing = tracemalloc.is_tracing()
+        self.peak = None
+        if self.tracing:
+            current, peak = _traced_memory()
+            if open_stages:
+                # a parent's peak may have happened before this stage began
+                open_stages[-1]._note_peak(peak)
+            self.memory_at_start = current
+            self.peak = current
+        open_stages.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        duration = time.perf_counter() - self.start
+        open_stages = self.profiler._open_stages
+        open_stages.pop()
+        allocated = peak = None
+        if self.tracing and tracemalloc.is_tracing():
+            current, peak = _traced_memory()
+            self._note_peak(peak)
+            if open_stages:
+                open_stages[-1]._note_peak(self.peak)
+            allocated = current - self.memory_at_start
+            peak = self.peak - self.memory_at_start
+        self.profiler.records.append(StageRecord(
+            self.name, self.start, duration, self.depth, allocated, peak,
+            os.getpid(), threading.get_ident()))
+
+    def _note_peak(self, peak):
+        if self.peak is not None:
+            self.peak = max(self.peak, peak)
+
+
+def _traced_memory():
+    """
+    Traced memory now and its peak since the last call, or the memory now
+    in place of the peak if tracemalloc cannot reset it
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    if not _RESETS_PEAK:
+        return current, current
+    tracemalloc.reset_peak()
+    return current, peak
+
+
+def _format_bytes(nbytes):
+    if nbytes is None:
+        return '-'
+    for unit in ['B', 'kB', 'MB']:
+        if abs(nbytes) < 1024:
+            return '{:.0f} {}'.format(nbytes, unit)
+        nbytes /= 1024
+    return '{:.1f} GB'.format(nbytes)
@@ -0,0 +1,94 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+import subprocess
+import unittest
+
+import yaml
+from nose.plugins.attrib import attr
+
+import holopy
+from holopy.core.holopy_object import FullLoader
+
+
+def modules_loaded_by(statement):
+    code = ("import sys; {}; "
+            "print(' '.join(sorted(sys.modules)))".format(statement))
+    output = subprocess.check_output([sys.executable, '-c', code])
+    return output.decode().split()
+
+
+class TestLazyImports(unittest.TestCase):
+    @attr("medium")
+    def test_import_holopy_does_not_load_subpackages(self):
+        loaded = modules_loaded_by("import holopy")
+        for module in ['holopy.scattering', 'holopy.inference',
+                       'holopy.fitting', 'xarray', 'scipy']:
+            self.assertNotIn(module, loaded)
+
+    @attr("medium")
+    def test_import_scattering_does_not_load_theories(self):
+        loaded = modules_loaded_by("import holopy.scattering")
+        self.assertNotIn('holopy.scattering.theory.mie', loaded)
+        self.assertNotIn('holopy.scattering.theory.tmatrix', loaded)
+
+    @attr("medium")
+    def test_first_access_imports_defining_module(self):
+        loaded = modules_loaded_by("import holopy; holopy.detector_grid")
+        self.assertIn('holopy.core.metadata', loaded)
+        self.assertNotIn('holopy.inference', loaded)
+
+    @attr("fast")
+    def test_top_level_names_match_subpackages(self):
+        from holopy.core.metadata import detector_grid
+        from holopy.inference.interface import fit
+        self.assertIs(holopy.detector_grid, detector_grid)
+        self.assertIs(holopy.fit, fit)
+
+    @attr("fast")
+    def test_submodules_are_attributes(self):
+        from holopy.inference import prior
+        self.assertIs(holopy.inference.prior, prior)
+
+    @attr("fast")
+    def test_dir_lists_deferred_names(self):
+        self.assertIn('calc_holo', dir(holopy.scattering))
+        self.assertIn('fit', dir(holopy))
+
+    @attr("fast")
+    def test_missing_attribute_raises_attribute_error(self):
+        self.assertRaises(AttributeError, getattr, holopy, 'not_a_module')
+        self.assertFalse(hasattr(holopy.inference, 'not_a_strategy'))
+
+    @attr("medium")
+    def test_yaml_tags_registered_on_demand(self):
+        code = ("import yaml; from holopy.core.holopy_object import FullLoader;"
+                "print(yaml.load('!Sphere {n: 1.5, r: .5, center: [1, 2, 3]}',"
+                " Loader=FullLoader).r)")
+        output = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(output.decode().strip(), '0.5')
+
+    @attr("fast")
+    def test_unknown_yaml_tag_still_fails(self):
+        self.assertRaises(yaml.constructor.ConstructorError, yaml.load,
+                          '!NotAHoloPyClass {a: 1}', Loader=FullLoader)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,7 +6,8 @@ from nose.plugins.attrib import attr
 
 from holopy.core.metadata import (
     detector_grid, detector_points, clean_concat, update_metadata,
-    get_spacing, get_extents, copy_metadata, make_subset_data, data_grid)
+    get_spacing, get_extents, copy_metadata, make_subset_data, data_grid,
+    SubsetSampler)
 from holopy.core.errors import CoordSysError
 
 
@@ -537,6 +538,110 @@ class TestMakeSubsetData(unittest.TestCase):
         self.assertTrue(np.all(subset_z_coords == data_z_coords))
 
 
+class TestSubsetSampler(unittest.TestCase):
+    @attr("fast")
+    def test_matches_make_subset_data(self):
+        data = make_data()
+        data.attrs['noise_sd'] = 0.1
+        expected, selection = make_subset_data(
+            data, pixels=7, return_selection=True, seed=3)
+        subset = SubsetSampler(data).subset(selection=selection)
+        self.assertTrue(subset.equals(expected))
+        self.assertEqual(subset.noise_sd, expected.noise_sd)
+        for key in 'xyz':
+            self.assertTrue(np.all(subset.original_dims[key] ==
+                                   expected.original_dims[key]))
+
+    @attr("fast")
+    def test_selects_distinct_pixels(self):
+        sampler = SubsetSampler(make_data())
+        selection = sampler.selection(10)
+        self.assertEqual(len(set(selection)), 10)
+        self.assertEqual(sampler.subset(10).size, 10)
+
+    @attr("fast")
+    def test_seed_gives_reproducible_subsets(self):
+        data = make_data()
+        subset1 = SubsetSampler(data, seed=2).subset(10)
+        subset2 = SubsetSampler(data, seed=2).subset(10)
+        self.assertTrue(subset1.equals(subset2))
+
+    @attr("fast")
+    def test_values_are_raw_subset_values(self):
+        sampler = SubsetSampler(make_data())
+        selection = sampler.selection(5)
+        self.assertTrue(np.all(sampler.values(selection=selection) ==
+                               sampler.subset(selection=selection).values))
+
+    @attr("fast")
+    def test_no_pixels_returns_data(self):
+        data = make_data()
+        self.assertIs(SubsetSampler(data).subset(), data)
+
+    @attr("fast")
+    def test_uniform_subsets_have_no_pixel_weights(self):
+        subset = SubsetSampler(make_data()).subset(5)
+        self.assertNotIn('pixel_weights', subset.attrs)
+
+
+class TestWeightedSubsets(unittest.TestCase):
+    @attr("fast")
+    def test_draws_only_weighted_pixels(self):
+        data = make_data()
+        weights = np.zeros(data.shape)
+        weights[..., 1:3, 2] = 1
+        sampler = SubsetSampler(data, seed=1, weights=weights)
+        selection = sampler.selection(20)
+        self.assertTrue(set(selection) <= {7, 12})
+        self.assertEqual(len(set(selection)), len(selection))
+
+    @attr("fast")
+    def test_importance_weights_undo_weighting(self):
+        data = make_data()
+        weights = np.arange(data.size, dtype=float).reshape(data.shape) + 1
+        sampler = SubsetSampler(data, seed=1, weights=weights)
+        probabilities = weights.ravel() / weights.sum()
+        self.assertTrue(np.allclose(
+            sampler.importance_weights(np.arange(data.size)),
+            1 / (data.size * probabilities)))
+
+    @attr("fast")
+    def test_weighted_sum_is_unbiased(self):
+        data = make_data()
+        weights = np.abs(data.values) + 0.1
+        sampler = SubsetSampler(data, seed=1, weights=weights)
+        estimates = []
+        for i in range(2000):
+            subset = sampler.subset(5)
+            estimates.append((subset.pixel_weights * subset.values).sum() *
+                             data.size / 5)
+        self.assertAlmostEqual(np.mean(estimates), float(data.sum()),
+                               delta=0.5)
+
+    @attr("fast")
+    def test_make_subset_data_with_weights(self):
+        data = make_data()
+        subset, selection = make_subset_data(
+            data, pixels=10, return_selection=True, seed=1,
+            weights=np.ones(data.shape))
+        self.assertEqual(subset.size, len(selection))
+        self.assertTrue(np.allclose(subset.pixel_weights.sum(), 10))
+
+    @attr("fast")
+    def test_negative_weights_raise(self):
+        data = make_data()
+        self.assertRaises(ValueError, SubsetSampler, data,
+                          weights=-np.ones(data.shape))
+        self.assertRaises(ValueError, SubsetSampler, data,
+                          weights=np.zeros(data.shape))
+
+    @attr("fast")
+    def test_string_weights_use_fringe_weights(self):
+        data = make_data()
+        sampler = SubsetSampler(data, weights='variance')
+        self.assertTrue(np.all(sampler._probabilities > 0))
+
+
 def make_data(seed=1):
     np.random.seed(seed)
     shape = (5, 5)
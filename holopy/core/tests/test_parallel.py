@@ -0,0 +1,216 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pickle
+import unittest
+
+import yaml
+
+import numpy as np
+import xarray as xr
+from nose.plugins.attrib import attr
+
+from holopy.core import detector_grid
+from holopy.core.metadata import make_subset_data
+from holopy.core.utils import NonePool
+from holopy.core.parallel import (
+    SharedArray, SharedObjects, WorkerPool, initialize_worker, shared_pool,
+    persistent_pool, _PUBLISHED, _LOADED, _MAX_LOADED)
+
+
+class Holder:
+    def __init__(self, data, scale):
+        self.data = data
+        self.scale = scale
+
+    def total(self, offset):
+        return self.scale * float(self.data.sum()) + offset
+
+
+def make_data():
+    data = detector_grid(20, 0.1)
+    data.values[:] = np.random.RandomState(0).rand(*data.shape)
+    data.attrs['noise_sd'] = 0.1
+    return data
+
+
+class TestSharedArray(unittest.TestCase):
+    @attr("fast")
+    def test_restore_matches_array(self):
+        array = np.arange(1200.).reshape(30, 40)
+        shared = SharedArray(array)
+        try:
+            restored = shared.restore()
+            self.assertTrue(np.array_equal(restored, array))
+            self.assertFalse(restored.flags.writeable)
+            self.assertLess(len(pickle.dumps(shared)), array.nbytes)
+        finally:
+            shared.delete()
+        self.assertFalse(os.path.exists(shared.filename))
+
+
+class TestSharedObjects(unittest.TestCase):
+    @attr("fast")
+    def test_proxy_pickles_as_key(self):
+        holder = Holder(make_data(), 2)
+        with SharedObjects([holder]) as shared:
+            proxy = shared.proxy(holder)
+            self.assertLess(len(pickle.dumps(proxy.total)), 200)
+            self.assertIs(pickle.loads(pickle.dumps(proxy)), holder)
+            self.assertEqual(pickle.loads(pickle.dumps(proxy.total))(1),
+                             holder.total(1))
+            self.assertEqual(proxy.scale, 2)
+
+    @attr("fast")
+    def test_worker_restores_shared_data(self):
+        holder = Holder(make_subset_data(make_data(), pixels=50, seed=1), 2)
+        with SharedObjects([holder]) as shared:
+            key = shared.keys[0]
+            initialize_worker(pickle.loads(pickle.dumps(shared.states)))
+            restored = _PUBLISHED[key]
+            self.assertIsNot(restored, holder)
+            # a read-only view of the memory mapped file, not a copy
+            self.assertFalse(restored.data.values.flags.writeable)
+            xr.testing.assert_equal(restored.data, holder.data)
+            self.assertEqual(restored.data.noise_sd, holder.data.noise_sd)
+            self.assertEqual(restored.total(1), holder.total(1))
+
+    @attr("fast")
+    def test_worker_loads_object_on_first_use(self):
+        holder = Holder(make_data(), 2)
+        with SharedObjects([holder]) as shared:
+            key = shared.keys[0]
+            pickled = pickle.dumps(shared.proxy(holder).total)
+            # a worker that was running before the object was published
+            del _PUBLISHED[key]
+            self.assertEqual(pickle.loads(pickled)(1), holder.total(1))
+            self.assertIsNot(_PUBLISHED[key], holder)
+            self.assertIn(key, _LOADED)
+
+    @attr("fast")
+    def test_workers_keep_only_recent_objects(self):
+        holders = [Holder(make_data(), i) for i in range(_MAX_LOADED + 1)]
+        with SharedObjects(holders) as shared:
+            for key, holder in zip(shared.keys, holders):
+                pickled = pickle.dumps(shared.proxy(holder))
+                del _PUBLISHED[key]
+                pickle.loads(pickled)
+            self.assertNotIn(shared.keys[0], _PUBLISHED)
+            self.assertIn(shared.keys[-1], _PUBLISHED)
+            self.assertLessEqual(len(_LOADED), _MAX_LOADED)
+
+    @attr("fast")
+    def test_close_removes_files_and_keys(self):
+        holder = Holder(make_data(), 2)
+        shared = SharedObjects([holder])
+        filename = shared.states[shared.keys[0]][1]['data'].values.filename
+        key = shared.keys[0]
+        state_file = shared._state_files[key]
+        shared.close()
+        self.assertFalse(os.path.exists(filename))
+        self.assertFalse(os.path.exists(state_file))
+        self.assertNotIn(key, _PUBLISHED)
+
+
+class TestSharedPool(unittest.TestCase):
+    @attr("fast")
+    def test_serial_pool_uses_object(self):
+        holder = Holder(make_data(), 2)
+        with shared_pool(None, holder.total) as (pool, func):
+            self.assertIsInstance(pool, NonePool)
+            self.assertEqual(func, holder.total)
+
+    @attr("fast")
+    def test_user_pool_is_left_open(self):
+        class UserPool(NonePool):
+            closed = False
+
+            def close(self):
+                self.closed = True
+
+        user_pool = UserPool()
+        holder = Holder(make_data(), 2)
+        with shared_pool(user_pool, holder.total) as (pool, func):
+            self.assertIs(pool, user_pool)
+            self.assertEqual(func, holder.total)
+        self.assertFalse(user_pool.closed)
+
+    @attr("medium")
+    def test_process_pool_matches_serial(self):
+        holder = Holder(make_data(), 2)
+        with shared_pool(2, holder.total) as (pool, func):
+            self.assertEqual(list(pool.map(func, [0, 1, 2])),
+                             [holder.total(i) for i in range(3)])
+
+    @attr("medium")
+    def test_worker_pool_is_left_open(self):
+        holder = Holder(make_data(), 2)
+        with WorkerPool(2) as worker_pool:
+            for offset in range(2):
+                with shared_pool(worker_pool, holder.total) as (pool, func):
+                    self.assertIs(pool, worker_pool)
+                    self.assertEqual(list(pool.map(func, [offset])),
+                                     [holder.total(offset)])
+                self.assertTrue(worker_pool.running)
+
+
+class TestWorkerPool(unittest.TestCase):
+    @attr("fast")
+    def test_workers_start_when_needed(self):
+        pool = WorkerPool(1)
+        self.assertFalse(pool.running)
+        self.assertEqual(pool.size, 1)
+        pool.close()
+        self.assertFalse(pool.running)
+
+    @attr("medium")
+    def test_workers_are_reused(self):
+        with WorkerPool(2) as pool:
+            self.assertTrue(pool.running)
+            first = set(pool.map(_process_id, range(8)))
+            second = set(pool.map(_process_id, range(8)))
+            self.assertTrue(second.issubset(first))
+        self.assertFalse(pool.running)
+
+    @attr("fast")
+    def test_serializes_without_workers(self):
+        pool = WorkerPool(3)
+        self.assertEqual(pickle.loads(pickle.dumps(pool)), pool)
+        loaded = yaml.load(yaml.dump(pool), Loader=yaml.FullLoader)
+        self.assertEqual(loaded.processes, 3)
+        self.assertFalse(loaded.running)
+
+    @attr("fast")
+    def test_persistent_pool_keeps_serial_and_user_pools(self):
+        user_pool = NonePool()
+        for parallel in [None, user_pool]:
+            with persistent_pool(parallel) as pool:
+                self.assertIs(pool, parallel)
+
+    @attr("medium")
+    def test_persistent_pool_starts_and_closes_worker_pool(self):
+        with persistent_pool(2) as pool:
+            self.assertIsInstance(pool, WorkerPool)
+            self.assertTrue(pool.running)
+            self.assertEqual(pool.size, 2)
+        self.assertFalse(pool.running)
+
+
+def _process_id(i):
+    return os.getpid()
@@ -22,8 +22,9 @@ import xarray as xr
 from numpy.testing import assert_allclose
 from nose.plugins.attrib import attr
 
-from holopy.core.process import center_find, subimage, fft, ifft
-from holopy.core.metadata import data_grid, detector_grid
+from holopy.core.process import (center_find, subimage, fft, ifft,
+                                 fringe_weights, bin_image)
+from holopy.core.metadata import data_grid, detector_grid, update_metadata
 from holopy.core.tests.common import get_example_data, assert_obj_close
 
 #Test centerfinder
@@ -132,5 +133,62 @@ class TestFourier(unittest.TestCase):
         self.assertTrue(data_is_same)
 
 
+class TestBinImage(unittest.TestCase):
+    @attr("fast")
+    def test_averages_blocks(self):
+        image = data_grid(np.arange(36.).reshape(1, 6, 6), spacing=0.1)
+        binned = bin_image(image, 2)
+        self.assertEqual(binned.shape, (1, 3, 3))
+        self.assertEqual(float(binned[0, 0, 0]), (0 + 1 + 6 + 7) / 4)
+        assert_allclose(binned.x, [0.05, 0.25, 0.45])
+
+    @attr("fast")
+    def test_drops_leftover_pixels(self):
+        image = detector_grid((7, 9), spacing=0.1)
+        self.assertEqual(bin_image(image, 2).shape, (1, 3, 4))
+
+    @attr("fast")
+    def test_keeps_metadata_and_reduces_noise(self):
+        holo = update_metadata(get_example_data('image0001'), noise_sd=0.1)
+        binned = bin_image(holo, 4)
+        self.assertEqual(binned.illum_wavelen, holo.illum_wavelen)
+        self.assertAlmostEqual(binned.noise_sd, holo.noise_sd / 4)
+
+    @attr("fast")
+    def test_factor_one_returns_image(self):
+        holo = get_example_data('image0001')
+        self.assertIs(bin_image(holo, 1), holo)
+        self.assertRaises(ValueError, bin_image, holo, 0)
+
+
+class TestFringeWeights(unittest.TestCase):
+    @attr("fast")
+    def test_weights_have_mean_one_and_floor(self):
+        holo = get_example_data('image0001')
+        for method in ['gradient', 'variance']:
+            weights = fringe_weights(holo, method, floor=0.2)
+            self.assertEqual(weights.shape, holo.shape)
+            self.assertAlmostEqual(float(weights.mean()), 1)
+            self.assertTrue(weights.min() >= 0.2 - 1e-12)
+
+    @attr("fast")
+    def test_fringes_outweigh_background(self):
+        holo = get_example_data('image0001')
+        weights = fringe_weights(holo).values.squeeze()
+        row, col = np.round(gold_location).astype(int)
+        self.assertGreater(weights[row-10:row+10, col-10:col+10].mean(),
+                           weights[:10, :10].mean())
+
+    @attr("fast")
+    def test_flat_image_gives_uniform_weights(self):
+        weights = fringe_weights(detector_grid(10, 0.1))
+        self.assertTrue(np.all(weights.values == 1))
+
+    @attr("fast")
+    def test_unknown_method_raises(self):
+        self.assertRaises(ValueError, fringe_weights,
+                          detector_grid(10, 0.1), 'edges')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,190 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import json
+import tempfile
+import shutil
+import unittest
+from unittest import mock
+
+import numpy as np
+from nose.plugins.attrib import attr
+
+from holopy.core import profiling
+from holopy.core.profiling import Profiler, StageRecord, stage, profiled
+
+
+@profiled
+def make_array(n):
+    return np.ones(n)
+
+
+@profiled(name='renamed')
+def add_one(x):
+    return x + 1
+
+
+class TestProfiler(unittest.TestCase):
+    @attr("fast")
+    def test_stages_are_not_recorded_without_profiler(self):
+        profiler = Profiler()
+        make_array(10)
+        with stage('unprofiled'):
+            pass
+        self.assertEqual(profiler.records, [])
+        self.assertIs(stage('unprofiled'), stage('other'))
+
+    @attr("fast")
+    def test_profiler_is_deactivated_on_exit(self):
+        with Profiler():
+            pass
+        self.assertIsNone(profiling._active_profiler)
+
+    @attr("fast")
+    def test_nested_profilers_restore_outer_profiler(self):
+        with Profiler() as outer:
+            with Profiler() as inner:
+                make_array(10)
+            make_array(10)
+        self.assertEqual(len(inner.records), 1)
+        self.assertEqual(len(outer.records), 1)
+
+    @attr("fast")
+    def test_records_names_and_depth(self):
+        with Profiler(track_memory=False) as profiler:
+            with stage('outer'):
+                make_array(10)
+                add_one(1)
+        names = [record.name for record in profiler.records]
+        depths = [record.depth for record in profiler.records]
+        self.assertEqual(names, ['make_array', 'renamed', 'outer'])
+        self.assertEqual(depths, [1, 1, 0])
+
+    @attr("fast")
+    def test_profiled_function_returns_result(self):
+        with Profiler():
+            self.assertEqual(add_one(1), 2)
+        self.assertEqual(add_one.__name__, 'add_one')
+
+    @attr("fast")
+    def test_stage_recorded_when_exception_raised(self):
+        with Profiler(track_memory=False) as profiler:
+            with self.assertRaises(ValueError):
+                with stage('failing'):
+                    raise ValueError
+        self.assertEqual(profiler.records[0].name, 'failing')
+
+    @attr("fast")
+    def test_records_process(self):
+        with Profiler(track_memory=False) as profiler:
+            make_array(10)
+        self.assertEqual(profiler.records[0].pid, os.getpid())
+
+    @attr("fast")
+    def test_memory_tracking(self):
+        nbytes = 8 * 10**6
+        with Profiler() as profiler:
+            with stage('outer'):
+                with stage('temporary'):
+                    np.ones(nbytes // 8).sum()
+                kept = make_array(nbytes // 8)
+        records = {record.name: record for record in profiler.records}
+        self.assertLess(records['temporary'].allocated, nbytes // 10)
+        self.assertGreaterEqual(records['temporary'].peak, nbytes)
+        self.assertGreaterEqual(records['make_array'].allocated, nbytes)
+        self.assertGreaterEqual(records['outer'].peak, nbytes)
+        self.assertGreaterEqual(records['outer'].allocated, nbytes)
+
+    @attr("fast")
+    def test_memory_tracking_without_reset_peak(self):
+        nbytes = 8 * 10**6
+        with mock.patch.object(profiling, '_RESETS_PEAK', False):
+            with Profiler() as profiler:
+                with stage('outer'):
+                    with stage('temporary'):
+                        np.ones(nbytes // 8).sum()
+                    kept = make_array(nbytes // 8)
+        records = {record.name: record for record in profiler.records}
+        self.assertLess(records['temporary'].allocated, nbytes // 10)
+        self.assertGreaterEqual(records['make_array'].allocated, nbytes)
+        self.assertGreaterEqual(records['outer'].peak, nbytes)
+
+    @attr("fast")
+    def test_memory_not_tracked(self):
+        with Profiler(track_memory=False) as profiler:
+            make_array(10)
+        self.assertIsNone(profiler.records[0].allocated)
+        self.assertIsNone(profiler.records[0].peak)
+
+    @attr("fast")
+    def test_summary(self):
+        with Profiler() as profiler:
+            for _ in range(3):
+                make_array(10)
+        summary = profiler.summary()[(os.getpid(), 'make_array')]
+        self.assertEqual(summary['calls'], 3)
+        total = sum(record.duration for record in profiler.records)
+        self.assertAlmostEqual(summary['total'], total)
+        self.assertAlmostEqual(summary['mean'], total / 3)
+
+    @attr("fast")
+    def test_report_lists_processes_and_stages(self):
+        with Profiler() as profiler:
+            make_array(10)
+        worker = StageRecord('worker stage', 0., 1., 0, None, None, -1, 0)
+        profiler.merge([worker])
+        report = profiler.report()
+        for item in ['make_array', 'worker stage', str(os.getpid()),
+                     'process -1']:
+            self.assertIn(item, report)
+
+    @attr("fast")
+    def test_merge_profiler(self):
+        first = Profiler()
+        with first:
+            make_array(10)
+        with Profiler() as second:
+            add_one(1)
+        first.merge(second)
+        self.assertEqual([record.name for record in first.records],
+                         ['make_array', 'renamed'])
+
+    @attr("fast")
+    def test_save_trace(self):
+        with Profiler() as profiler:
+            make_array(10)
+        tempdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tempdir, 'trace.json')
+            profiler.save_trace(filename)
+            with open(filename) as f:
+                trace = json.load(f)
+        finally:
+            shutil.rmtree(tempdir)
+        event, = trace['traceEvents']
+        record, = profiler.records
+        self.assertEqual(event['name'], 'make_array')
+        self.assertEqual(event['ph'], 'X')
+        self.assertEqual(event['pid'], os.getpid())
+        self.assertAlmostEqual(event['dur'], 1e6 * record.duration)
+        self.assertEqual(event['args']['allocated'], record.allocated)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,6 +17,7 @@
 # along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import pickle
 import shutil
 import unittest
 import tempfile
@@ -36,13 +37,15 @@ except ModuleNotFoundError:
 
 from holopy.core.utils import (
     ensure_array, ensure_listlike, ensure_scalar, mkdir_p, dict_without,
-    updated, repeat_sing_dims, choose_pool)
+    updated, repeat_sing_dims, choose_pool, evaluate_in_batches, NonePool,
+    LnpostWrapper, finite_difference_jacobian, finite_difference_hessian)
 from holopy.core.math import (
     rotate_points, rotation_matrix, transform_cartesian_to_spherical,
     transform_spherical_to_cartesian, transform_cartesian_to_cylindrical,
     transform_cylindrical_to_cartesian, transform_cylindrical_to_spherical,
     transform_spherical_to_cylindrical, find_transformation_function,
     keep_in_same_coordinates)
+from holopy.core.metadata import detector_grid
 from holopy.core.tests.common import assert_obj_close, get_example_data
 
 
@@ -430,5 +433,158 @@ class TestChoosePool(unittest.TestCase):
         self.assertTrue(isinstance(auto_pool, (pool.BasePool, mp.pool.Pool)))
 
 
+class DataSumModel:
+    def _lnposterior(self, pars, data, pixels=None):
+        return float(data.sum())
+
+    def _lnposterior_batch(self, pars, data, pixels=None):
+        return np.full(len(pars), float(data.sum()))
+
+
+class TestLnpostWrapper(unittest.TestCase):
+    @attr("fast")
+    def test_new_pixels_for_each_evaluation(self):
+        data = detector_grid(20, 0.1)
+        data.values[:] = np.random.RandomState(1).rand(*data.shape)
+        wrapper = LnpostWrapper(DataSumModel(), data, new_pixels=10)
+        values = {wrapper.evaluate([0]) for i in range(5)}
+        self.assertGreater(len(values), 1)
+        self.assertEqual(len(wrapper.evaluate_batch([[0], [1]])), 2)
+
+    @attr("fast")
+    def test_seeded_pixels_are_reproducible(self):
+        data = detector_grid(20, 0.1)
+        data.values[:] = np.random.RandomState(1).rand(*data.shape)
+        wrappers = [LnpostWrapper(DataSumModel(), data, new_pixels=10, seed=2)
+                    for i in range(2)]
+        first, second = [[wrapper.evaluate([0]) for i in range(3)]
+                         for wrapper in wrappers]
+        self.assertEqual(first, second)
+
+    @attr("fast")
+    def test_pickle_leaves_out_subset_sampler(self):
+        data = detector_grid(20, 0.1)
+        wrapper = LnpostWrapper(DataSumModel(), data, new_pixels=10)
+        wrapper.evaluate([0])
+        unpickled = pickle.loads(pickle.dumps(wrapper))
+        self.assertNotIn('_subsets', vars(unpickled))
+        self.assertEqual(unpickled.evaluate([0]), 0)
+
+    @attr("fast")
+    def test_evaluate_lnlike_batch(self):
+        class DataSumLikelihoodModel(DataSumModel):
+            def _lnlike_batch(self, pars, data):
+                return np.asarray(pars).sum(axis=1) + float(data.sum())
+
+        data = detector_grid(2, 0.1) + 1
+        wrapper = LnpostWrapper(DataSumLikelihoodModel(), data, minus=True)
+        assert_allclose(wrapper.evaluate_lnlike_batch([[0], [1]]), [-4, -5])
+
+
+class RecordingPool(NonePool):
+    _processes = 3
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def map(self, function, arguments):
+        arguments = list(arguments)
+        self.batch_sizes.extend(len(argument) for argument in arguments)
+        return map(function, arguments)
+
+
+class TestFiniteDifferenceJacobian(unittest.TestCase):
+    @staticmethod
+    def function(x):
+        return np.array([x[0]**2, x[0] * x[1], np.sin(x[1])])
+
+    @attr("fast")
+    def test_matches_analytic_jacobian(self):
+        x = np.array([1.5, -0.5])
+        residuals, jacobian = finite_difference_jacobian(
+            self.function, x, NonePool())
+        assert_allclose(residuals, self.function(x))
+        assert_allclose(jacobian, [[3, 0], [-0.5, 1.5], [0, np.cos(-0.5)]],
+                        rtol=1e-6, atol=1e-7)
+
+    @attr("fast")
+    def test_one_evaluation_per_parameter_with_known_residuals(self):
+        recording_pool = RecordingPool()
+        x = np.array([1.5, -0.5])
+        finite_difference_jacobian(lambda x: [x.sum()], x, recording_pool,
+                                   residuals=[1.])
+        self.assertEqual(len(recording_pool.batch_sizes), 2)
+        recording_pool = RecordingPool()
+        finite_difference_jacobian(lambda x: [x.sum()], x, recording_pool)
+        self.assertEqual(len(recording_pool.batch_sizes), 3)
+
+    @attr("fast")
+    def test_steps_back_from_upper_bounds(self):
+        def function(x):
+            assert np.all(x <= 1)
+            return x**2
+
+        _, jacobian = finite_difference_jacobian(
+            function, np.array([1., 0.5]), NonePool(), upper_bounds=[1, 1])
+        assert_allclose(np.diag(jacobian), [2, 1], rtol=1e-6)
+
+    @attr("fast")
+    def test_steps_forward_from_lower_bounds(self):
+        def function(x):
+            assert np.all(x >= -1)
+            return x**2
+
+        _, jacobian = finite_difference_jacobian(
+            function, np.array([-1., -0.5]), NonePool(),
+            lower_bounds=[-1, -1])
+        assert_allclose(np.diag(jacobian), [-2, -1], rtol=1e-6)
+
+
+class TestFiniteDifferenceHessian(unittest.TestCase):
+    @staticmethod
+    def function(points):
+        x, y = np.transpose(points)
+        return x**2 * y + 3 * y**2
+
+    @attr("fast")
+    def test_matches_analytic_hessian(self):
+        x = np.array([1.5, -0.5])
+        value, hessian = finite_difference_hessian(
+            self.function, x, [1e-4, 1e-4], NonePool())
+        self.assertAlmostEqual(value, self.function([x])[0])
+        assert_allclose(hessian, [[-1, 3], [3, 6]], rtol=1e-6)
+
+    @attr("fast")
+    def test_evaluations_are_batched(self):
+        recording_pool = RecordingPool()
+        finite_difference_hessian(lambda points: np.sum(points**2, axis=1),
+                                  np.zeros(3), np.ones(3), recording_pool)
+        self.assertEqual(recording_pool.batch_sizes, [5, 4, 4])
+
+
+class TestEvaluateInBatches(unittest.TestCase):
+    @attr("fast")
+    def test_one_batch_per_worker(self):
+        recording_pool = RecordingPool()
+        par_vals = np.arange(14).reshape(7, 2)
+        values = evaluate_in_batches(lambda x: x.sum(axis=1), par_vals,
+                                     recording_pool)
+        assert_allclose(values, par_vals.sum(axis=1))
+        self.assertEqual(recording_pool.batch_sizes, [3, 2, 2])
+
+    @attr("fast")
+    def test_fewer_rows_than_workers(self):
+        recording_pool = RecordingPool()
+        values = evaluate_in_batches(lambda x: x[:, 0], [[1.]], recording_pool)
+        assert_allclose(values, [1.])
+        self.assertEqual(recording_pool.batch_sizes, [1])
+
+    @attr("fast")
+    def test_serial_pool_uses_single_batch(self):
+        values = evaluate_in_batches(lambda x: x[:, 0], np.ones((4, 1)),
+                                     NonePool())
+        assert_allclose(values, np.ones(4))
+
+
 if __name__ == '__main__':
     unittest.main()
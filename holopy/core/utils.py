@@ -184,20 +184,234 @@ class LnpostWrapper(HoloPyObject):
     only takes parameter values as an argument for passing into optimizers.
     However, individual functions can't be pickled to distribute hologram
     calculations with python multiprocessing. This class solves both issues.
+
+    If new_pixels is given, each evaluation uses a new random subset of that
+    many pixels of data, drawn from a generator seeded with seed. Worker
+    processes each draw from their own generator, seeded from seed and the
+    process id.
     '''
-    def __init__(self, model, data, new_pixels=None, minus=False):
+    def __init__(self, model, data, new_pixels=None, minus=False,
+                 pixel_weights=None, seed=None):
         self.data = data
         self.pixels = new_pixels
+        self.pixel_weights = pixel_weights
+        self.seed = seed
+        self._pid = os.getpid()
         self.func = model._lnposterior
+        self.batch_func = model._lnposterior_batch
+        # only needed by samplers that temper the likelihood alone
+        self.lnlike_batch_func = getattr(model, '_lnlike_batch', None)
         self.prefactor = -1 if minus else 1
 
     def evaluate(self, par_vals):
-        return self.prefactor * self.func(par_vals, self.data, self.pixels)
+        return self.prefactor * self.func(par_vals, self._new_data(), None)
+
+    def evaluate_batch(self, par_vals):
+        """
+        Evaluate many sets of parameter values at once, one set per row of
+        par_vals. Returns a 1D array.
+        """
+        par_vals = np.asarray(par_vals)
+        return self.prefactor * self.batch_func(par_vals, self._new_data(),
+                                                None)
+
+    def evaluate_lnlike_batch(self, par_vals):
+        """
+        Like evaluate_batch, but for the log-likelihood alone
+        """
+        par_vals = np.asarray(par_vals)
+        return self.prefactor * self.lnlike_batch_func(par_vals,
+                                                       self._new_data())
+
+    def _new_data(self):
+        if self.pixels is None:
+            return self.data
+        if getattr(self, '_subsets', None) is None:
+            # flattened once per process, then each subset is cheap
+            from holopy.core.metadata import SubsetSampler
+            seed = self.seed
+            if seed is not None and os.getpid() != self._pid:
+                # workers must not all draw the same subsets
+                seed = np.random.SeedSequence(seed, spawn_key=(os.getpid(),))
+            self._subsets = SubsetSampler(self.data, seed=seed,
+                                          weights=self.pixel_weights)
+        return self._subsets.subset(self.pixels)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_subsets', None)
+        return state
+
+
+class ResidualsWrapper(HoloPyObject):
+    '''
+    Residuals of a model for least-squares minimizers, in a form that can be
+    sent to a process pool, as LnpostWrapper does for the posterior.
 
+    If guess_lnprior is given, sqrt(guess_lnprior - lnprior) is appended to
+    the residuals so that the minimizer also sees the prior.
+    '''
+    def __init__(self, model, data, guess_lnprior=None):
+        self.model = model
+        self.data = data
+        self.guess_lnprior = guess_lnprior
 
-def choose_pool(parallel):
+    def evaluate(self, par_vals):
+        noise = self.model._find_noise(par_vals, self.data)
+        residuals = np.asarray(
+            self.model._residuals(par_vals, self.data, noise)).flatten()
+        if self.guess_lnprior is not None:
+            prior = np.sqrt(self.guess_lnprior - self.model._lnprior(par_vals))
+            residuals = np.append(residuals, prior)
+        return residuals
+
+    def evaluate_scaled(self, scaled_vals):
+        """
+        Like evaluate, but for parameter values scaled as by Prior.scale
+        """
+        par_vals = [par.unscale(value) for par, value in
+                    zip(self.model._parameters, scaled_vals)]
+        return self.evaluate(par_vals)
+
+
+def finite_difference_jacobian(function, x, pool, residuals=None,
+                               upper_bounds=None, lower_bounds=None):
+    """
+    Forward-difference Jacobian of function, with the displaced points
+    evaluated concurrently on pool.
+
+    Parameters
+    ----------
+    function: callable
+        takes a 1D array of parameter values and returns a 1D array
+    x: 1D array
+        point to differentiate at
+    pool: object with a map method
+        pool to evaluate the displaced points on, as returned by choose_pool
+    residuals: 1D array, optional
+        function(x), if already known. Otherwise it is evaluated on the pool
+        along with the displaced points.
+    upper_bounds: 1D array, optional
+        steps that would cross these bounds are taken backwards instead
+    lower_bounds: 1D array, optional
+        steps that would cross these bounds are taken forwards instead
+
+    Returns
+    -------
+    residuals: 1D array
+        function(x)
+    jacobian: 2D array
+        derivative of each element of function(x), one row per element and
+        one column per parameter
+    """
+    x = np.asarray(x, dtype=float)
+    # same step as scipy's '2-point' differences
+    steps = np.sqrt(np.finfo(float).eps) * np.maximum(1, np.abs(x))
+    steps = np.where(x < 0, -steps, steps)
+    if upper_bounds is not None:
+        steps = np.where(x + steps > upper_bounds, -np.abs(steps), steps)
+    if lower_bounds is not None:
+        steps = np.where(x + steps < lower_bounds, np.abs(steps), steps)
+    points = x + np.diag(steps)
+    steps = np.diagonal(points) - x
+    if residuals is None:
+        points = np.vstack([x, points])
+    values = [np.asarray(value, dtype=float)
+              for value in pool.map(function, points)]
+    if residuals is None:
+        residuals = values.pop(0)
+    jacobian = np.stack([(value - residuals) / step
+                         for value, step in zip(values, steps)], axis=1)
+    return residuals, jacobian
+
+
+def finite_difference_hessian(function, x, steps, pool):
+    """
+    Central-difference Hessian of a scalar function, with the displaced
+    points evaluated concurrently on pool. Takes n**2 + n + 1 evaluations
+    for n parameters.
+
+    Parameters
+    ----------
+    function: callable
+        takes a 2D array with one set of parameter values per row and returns
+        a 1D array with one value per row, like LnpostWrapper.evaluate_batch
+    x: 1D array
+        point to differentiate at
+    steps: 1D array
+        step to take in each parameter
+    pool: object with a map method
+        pool to evaluate the displaced points on, as returned by choose_pool
+
+    Returns
+    -------
+    value: float
+        function at x
+    hessian: 2D array
+        second derivatives of function at x
+    """
+    x = np.asarray(x, dtype=float)
+    steps = np.asarray(steps, dtype=float)
+    n = len(x)
+    displacements = np.diag(steps)
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    points = np.vstack(
+        [x[np.newaxis], x + displacements, x - displacements] +
+        [np.array([x + displacements[i] + displacements[j],
+                   x - displacements[i] - displacements[j]])
+         for i, j in pairs])
+    values = evaluate_in_batches(function, points, pool)
+    center, plus, minus = values[0], values[1:n + 1], values[n + 1:2 * n + 1]
+    hessian = np.diag((plus - 2 * center + minus) / steps**2)
+    for k, (i, j) in enumerate(pairs):
+        both_plus, both_minus = values[2 * n + 1 + 2 * k:2 * n + 3 + 2 * k]
+        hessian[i, j] = hessian[j, i] = (
+            both_plus - plus[i] - plus[j] + 2 * center - minus[i] - minus[j] +
+            both_minus) / (2 * steps[i] * steps[j])
+    return center, hessian
+
+
+def evaluate_in_batches(function, par_vals, pool):
+    """
+    Split the rows of par_vals into one batch per worker of pool and evaluate
+    function on each batch.
+
+    Parameters
+    ----------
+    function: callable
+        takes a 2D array with one set of parameter values per row and returns
+        a 1D array with one value per row, like LnpostWrapper.evaluate_batch
+    par_vals: 2D array
+        parameter values to evaluate
+    pool: object with a map method
+        pool to distribute batches over, as returned by choose_pool
+
+    Returns
+    -------
+    values: 1D array
+    """
+    par_vals = np.asarray(par_vals)
+    nbatches = max(min(_pool_size(pool), len(par_vals)), 1)
+    batches = np.array_split(par_vals, nbatches)
+    return np.concatenate([np.asarray(values, dtype=float)
+                           for values in pool.map(function, batches)])
+
+
+def _pool_size(pool):
+    for attribute in ['_processes', 'size']:
+        size = getattr(pool, attribute, None)
+        if isinstance(size, int) and size > 0:
+            return size
+    return 1
+
+
+def choose_pool(parallel, initializer=None, initargs=()):
     """
     This is a remake of schwimmbad.choose_pool with a single argument.
+
+    initializer and initargs are passed on to multiprocessing pools started
+    here, which call initializer(*initargs) in each worker as it starts.
+    They are ignored for MPI, serial and user-defined pools.
     """
     # TODO: This function should be refactored as a factory class with methods
     #       to enable more thorough testing of imports, MPI behaviour, etc.
@@ -215,10 +429,10 @@ def choose_pool(parallel):
             "multiprocessing.Pool object. To run serial calculations instead, "
             "pass in parallel=None.")
     elif isinstance(parallel, int):
-        pool = schwimmbad.MultiPool(parallel)
+        pool = schwimmbad.MultiPool(parallel, initializer, initargs)
     elif parallel is 'all':
         threads = os.cpu_count()
-        pool = choose_pool(threads)
+        pool = choose_pool(threads, initializer, initargs)
     elif parallel is 'mpi':
         pool = schwimmbad.MPIPool()
         # need to kill all non-master instances of currently running script
@@ -230,7 +444,7 @@ def choose_pool(parallel):
         if schwimmbad.MPIPool.enabled():
             pool = choose_pool('mpi')
         else:
-            pool = choose_pool('all')
+            pool = choose_pool('all', initializer, initargs)
     else:
         raise TypeError("Could not interpret 'parallel' argument. Use an "
                         "integer, 'mpi', 'all', 'auto', None or pass a pool "
@@ -16,12 +16,29 @@
 # You should have received a copy of the GNU General Public License
 # along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
 
-from holopy.inference.result import (
-    FitResult, SamplingResult, TemperedSamplingResult)
-from holopy.inference.model import (AlphaModel, ExactModel, LimitOverlaps)
-from holopy.inference.interface import (
-    fit, sample, available_fit_strategies, available_sampling_strategies)
-from holopy.inference.emcee import EmceeStrategy, TemperedStrategy
-from holopy.inference.nmpfit import NmpfitStrategy
-from holopy.inference.cmaes import CmaStrategy
-from holopy.inference.scipyfit import LeastSquaresScipyStrategy
+from holopy.core.lazy import lazy_import
+
+__getattr__, __dir__ = lazy_import(__name__, {
+    'FitResult': 'holopy.inference.result',
+    'SamplingResult': 'holopy.inference.result',
+    'TemperedSamplingResult': 'holopy.inference.result',
+    'AlphaModel': 'holopy.inference.model',
+    'ExactModel': 'holopy.inference.model',
+    'LimitOverlaps': 'holopy.inference.model',
+    'MarginalizedNoise': 'holopy.inference.model',
+    'fit': 'holopy.inference.interface',
+    'sample': 'holopy.inference.interface',
+    'available_fit_strategies': 'holopy.inference.interface',
+    'available_sampling_strategies': 'holopy.inference.interface',
+    'EmceeStrategy': 'holopy.inference.emcee',
+    'TemperedStrategy': 'holopy.inference.emcee',
+    'ConvergenceMonitor': 'holopy.inference.emcee',
+    'ParallelTemperingStrategy': 'holopy.inference.paralleltempering',
+    'NmpfitStrategy': 'holopy.inference.nmpfit',
+    'CmaStrategy': 'holopy.inference.cmaes',
+    'LeastSquaresScipyStrategy': 'holopy.inference.scipyfit',
+    'MultiresolutionStrategy': 'holopy.inference.multiresolution',
+    'MultiStartStrategy': 'holopy.inference.multistart',
+    'LaplaceStrategy': 'holopy.inference.laplace',
+    'WorkerPool': 'holopy.core.parallel',
+    })
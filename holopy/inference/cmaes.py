@@ -21,10 +21,7 @@ Stochastic fitting of models to data
 .. moduleauthor:: Solomon Barkley
 """
 import time
-import os
-import sys
-import tempfile
-import shutil
+import numbers
 import warnings
 
 import numpy as np
@@ -37,7 +34,8 @@ except ModuleNotFoundError:
 
 from holopy.core.holopy_object import HoloPyObject
 from holopy.core.metadata import make_subset_data
-from holopy.core.utils import choose_pool, LnpostWrapper
+from holopy.core.utils import LnpostWrapper, evaluate_in_batches
+from holopy.core.parallel import shared_pool
 from holopy.core.errors import DependencyMissing
 from holopy.inference import prior
 from holopy.inference.result import FitResult, UncertainValue
@@ -55,6 +53,11 @@ class CmaStrategy(HoloPyObject):
     resample_pixels: Boolean, optional
         If true (default), new pixels are chosen for each call of posterior.
         Otherwise, a single pixel subset is used throughout calculation.
+    pixel_weights: str or array, optional
+        Choose pixels with probability proportional to these weights, or to
+        holopy.core.process.fringe_weights(data, pixel_weights) if a string,
+        instead of uniformly. The likelihood is corrected with importance
+        weights.
     parent_fraction: float, optional
         Fraction of each generation to use to construct the next generation.
         Takes symbol \mu in cma literature
@@ -67,11 +70,15 @@ class CmaStrategy(HoloPyObject):
     parallel: optional
         number of threads to use or pool object or one of {None, 'all', 'mpi'}.
         Default tries 'mpi' then 'all'.
+    vectorize: Boolean, optional
+        If True, the posterior of each generation is computed at once with
+        model.lnposterior_batch, split into one batch per worker of the pool.
+        Default False computes one candidate at a time.
     """
     def __init__(self, npixels=None, popsize=None, resample_pixels=True,
                  parent_fraction=0.25, weight_function=None,
                  walker_initial_pos=None, tols={}, seed=None,
-                 parallel='auto'):
+                 parallel='auto', vectorize=False, pixel_weights=None):
         self.npixels = npixels
         self.popsize = popsize
         if resample_pixels:
@@ -88,13 +95,16 @@ class CmaStrategy(HoloPyObject):
         self.tols.update(tols)
         self.seed = seed
         self.parallel = parallel
+        self.vectorize = vectorize
+        self.pixel_weights = pixel_weights
 
     def fit(self, model, data):
         parameters = model._parameters
         par_names = model._parameter_names
         time_start = time.time()
         if self.npixels is not None and self.new_pixels is None:
-            data = make_subset_data(data, pixels=self.npixels, seed=self.seed)
+            data = make_subset_data(data, pixels=self.npixels, seed=self.seed,
+                                    weights=self.pixel_weights)
         if self.popsize is None:
             npars = len(parameters)
             self.popsize = int(2 + npars + np.sqrt(npars))
@@ -103,15 +113,20 @@ class CmaStrategy(HoloPyObject):
         if self.walker_initial_pos is None:
             self.walker_initial_pos = model.generate_guess(self.popsize,
                                                            seed=self.seed)
-        obj_func = LnpostWrapper(model, data, self.new_pixels, True)
-        sampler = run_cma(obj_func.evaluate, parameters,
-                          self.walker_initial_pos, self.weights, self.tols,
-                          self.seed, self.parallel)
-        xrecent = sampler.logger.data['xrecent']
+        obj_func = LnpostWrapper(model, data, self.new_pixels, True,
+                                 self.pixel_weights, self.seed)
+        if self.vectorize:
+            func = obj_func.evaluate_batch
+        else:
+            func = obj_func.evaluate
+        sampler = run_cma(func, parameters, self.walker_initial_pos,
+                          self.weights, self.tols, self.seed, self.parallel,
+                          self.vectorize)
+        best_solutions, best_func_vals = sampler.recorder.best()
         samples = xr.DataArray(
-            [xrecent[:, 5:]], dims=['walker', 'chain', 'parameter'],
+            [best_solutions], dims=['walker', 'chain', 'parameter'],
             coords={'parameter': par_names})
-        lnprobs = xr.DataArray([-xrecent[:, 4]], dims=['walker', 'chain'])
+        lnprobs = xr.DataArray([-best_func_vals], dims=['walker', 'chain'])
         best_vals = sampler.best.get()[0]
         diffs = sampler.result.stds
         intervals = [UncertainValue(best_val, diff, name=par) for
@@ -125,7 +140,7 @@ class CmaStrategy(HoloPyObject):
 
 
 def run_cma(obj_func, parameters, initial_population, weight_function,
-            tols={}, seed=None, parallel='auto'):
+            tols={}, seed=None, parallel='auto', vectorize=False):
     """
     instantiate and run a CMAEvolutionStrategy object
 
@@ -146,6 +161,16 @@ def run_cma(obj_func, parameters, initial_population, weight_function,
     parallel: optional
         number of threads to use or pool object or one of {None, 'all', 'mpi'}.
         Default tries 'mpi' then 'all'.
+    vectorize: Boolean, optional
+        If True, obj_func takes a 2D array with one candidate per row and
+        returns an array of values, and is called once per batch of
+        candidates instead of once per candidate.
+
+    Returns
+    -------
+    cma_strategy : cma.CMAEvolutionStrategy
+        the finished strategy. Its `recorder` attribute is a
+        PopulationRecorder holding every generation.
     """
     if _CMA_MISSING:
         raise DependencyMissing('cma', "Install it with \'pip install cma\'.")
@@ -157,33 +182,87 @@ def run_cma(obj_func, parameters, initial_population, weight_function,
     if weights[-1] > 0:
         weights[-1] = 0
         warnings.warn('Setting weight of worst parent to 0')
-    with tempfile.TemporaryDirectory() as tempdir:
-        cmaoptions = {'CMA_stds': stds, 'CMA_recombination_weights': weights,
-                      'verb_filenameprefix': tempdir, 'verbose': -3}
-        cmaoptions.update(tols)
-        if seed is not None:
-            cmaoptions.update({'seed': seed})
-        guess = [par.guess for par in parameters]
-        cma_strategy = cma.CMAEvolutionStrategy(guess, 1, cmaoptions)
-        cma_strategy.inject(initial_population, force=True)
-        solutions = np.zeros((popsize, len(parameters)))
-        func_vals = np.zeros(popsize)
-        pool = choose_pool(parallel)
+    cmaoptions = {'CMA_stds': stds, 'CMA_recombination_weights': weights,
+                  'verbose': -3, 'verb_log': 0}
+    cmaoptions.update(tols)
+    if seed is not None:
+        cmaoptions.update({'seed': seed})
+    guess = [par.guess for par in parameters]
+    cma_strategy = cma.CMAEvolutionStrategy(guess, 1, cmaoptions)
+    cma_strategy.inject(initial_population, force=True)
+    recorder = PopulationRecorder(popsize, len(parameters),
+                                  tols.get('maxiter'))
+    solutions = np.zeros((popsize, len(parameters)))
+    func_vals = np.zeros(popsize)
+    with shared_pool(parallel, obj_func) as (pool, obj_func):
         while not cma_strategy.stop():
             invalid = np.ones(popsize, dtype=bool)
             inf_replace_counter = 0
             while invalid.any() and inf_replace_counter < 10:
                 attempts = cma_strategy.ask(np.sum(invalid))
                 solutions[invalid, :] = attempts
-                func_vals[invalid] = list(pool.map(obj_func, attempts))
+                if vectorize:
+                    func_vals[invalid] = evaluate_in_batches(
+                        obj_func, attempts, pool)
+                else:
+                    func_vals[invalid] = list(pool.map(obj_func, attempts))
                 invalid = ~np.isfinite(func_vals)
                 inf_replace_counter += 1  # catches case where all are inf
             cma_strategy.tell(solutions, func_vals)
-            cma_strategy.logger.add()
-        cma_strategy.logger.load()
-
-    if pool is not parallel:
-        # I made pool, responsible for closing it.
-        pool.close()
+            recorder.add(solutions, func_vals)
+    cma_strategy.recorder = recorder
     return cma_strategy
 
+
+class PopulationRecorder:
+    """
+    Keeps the candidates and objective values of every generation of a CMA-ES
+    run in memory.
+
+    Parameters
+    ----------
+    popsize : int
+        number of candidates in each generation
+    ndim : int
+        number of parameters
+    maxiter : int, optional
+        expected number of generations, used to size the arrays. They grow
+        if more generations are added.
+    """
+    def __init__(self, popsize, ndim, maxiter=None):
+        if not isinstance(maxiter, numbers.Number) or not maxiter < np.inf:
+            maxiter = 100
+        capacity = max(1, min(int(maxiter), 10000))
+        self._solutions = np.empty((capacity, popsize, ndim))
+        self._func_vals = np.empty((capacity, popsize))
+        self.ngenerations = 0
+
+    @property
+    def solutions(self):
+        """Candidates of each generation, shape (ngen, popsize, ndim)"""
+        return self._solutions[:self.ngenerations]
+
+    @property
+    def func_vals(self):
+        """Objective values of each candidate, shape (ngen, popsize)"""
+        return self._func_vals[:self.ngenerations]
+
+    def add(self, solutions, func_vals):
+        if self.ngenerations == len(self._solutions):
+            self._solutions = np.concatenate(
+                [self._solutions, np.empty_like(self._solutions)])
+            self._func_vals = np.concatenate(
+                [self._func_vals, np.empty_like(self._func_vals)])
+        self._solutions[self.ngenerations] = solutions
+        self._func_vals[self.ngenerations] = func_vals
+        self.ngenerations += 1
+
+    def best(self):
+        """
+        Best candidate of each generation and its objective value, with
+        shapes (ngen, ndim) and (ngen,)
+        """
+        index = np.argmin(self.func_vals, axis=1)
+        generations = np.arange(self.ngenerations)
+        return (self.solutions[generations, index],
+                self.func_vals[generations, index])
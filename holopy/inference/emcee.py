@@ -22,6 +22,7 @@ Sample posterior probabilities given model and data
 """
 import multiprocessing
 import time
+from functools import partial
 
 import xarray as xr
 import numpy as np
@@ -33,7 +34,8 @@ except ModuleNotFoundError:
 
 from holopy.core.holopy_object import HoloPyObject
 from holopy.core.metadata import make_subset_data
-from holopy.core.utils import choose_pool, LnpostWrapper
+from holopy.core.utils import LnpostWrapper, evaluate_in_batches
+from holopy.core.parallel import shared_pool, persistent_pool
 from holopy.core.errors import DependencyMissing
 from holopy.inference.result import SamplingResult, TemperedSamplingResult
 from holopy.inference import prior
@@ -48,10 +50,54 @@ def sample_one_sigma_gaussian(result):
 
 
 class EmceeStrategy(HoloPyObject):
+    """
+    Inference strategy sampling the posterior with the emcee ensemble sampler
+
+    Parameters
+    ----------
+    nwalkers : int, optional
+        number of walkers in the ensemble
+    nsamples : int, optional
+        number of steps each walker takes
+    npixels : int, optional
+        Number of pixels in the image to sample against. default uses all.
+    walker_initial_pos : array, optional
+        starting positions of the walkers, shape (nwalkers, nparameters)
+    parallel : optional
+        number of threads to use or pool object or one of {None, 'all', 'mpi'}.
+        Default tries 'mpi' then 'all'.
+    seed : int, optional
+        random seed to use
+    vectorize : bool, optional
+        If True, the log-posterior of the whole ensemble is computed at once
+        with model.lnposterior_batch, split into one batch per worker of the
+        pool. Default False computes one walker at a time.
+    pixel_weights : str or array, optional
+        Choose the npixels with probability proportional to these weights,
+        or to holopy.core.process.fringe_weights(data, pixel_weights) if a
+        string, instead of uniformly. The likelihood is corrected with
+        importance weights.
+    checkpoint : str, optional
+        Name of an HDF5 file to write the samples to as they are drawn,
+        instead of keeping them in memory. If the file already holds samples
+        of the same model, for instance from a run that was interrupted,
+        sampling continues from the last stored step until there are
+        nsamples in total. The result reads the samples from the file when
+        they are first used.
+    checkpoint_steps : int, optional
+        Number of steps to hold in memory between writes to checkpoint.
+        An interrupted run loses at most this many steps.
+    convergence : ConvergenceMonitor, optional
+        Stop sampling before nsamples steps once the chain has converged
+        according to this monitor. Its diagnostics are stored in the
+        convergence attribute of the result.
+    """
     _default_nsamples = 1000
 
     def __init__(self, nwalkers=100, nsamples=None, npixels=None,
-                 walker_initial_pos=None, parallel='auto', seed=None):
+                 walker_initial_pos=None, parallel='auto', seed=None,
+                 vectorize=False, pixel_weights=None, checkpoint=None,
+                 checkpoint_steps=10, convergence=None):
         self.nwalkers = nwalkers
         if nsamples is None:
             nsamples = self._default_nsamples
@@ -60,6 +106,11 @@ class EmceeStrategy(HoloPyObject):
         self.walker_initial_pos = walker_initial_pos
         self.parallel = parallel
         self.seed = seed
+        self.vectorize = vectorize
+        self.pixel_weights = pixel_weights
+        self.checkpoint = checkpoint
+        self.checkpoint_steps = checkpoint_steps
+        self.convergence = convergence
 
     def sample(self, model, data, nsamples=None, walker_initial_pos=None):
         if nsamples is not None:
@@ -76,20 +127,35 @@ class EmceeStrategy(HoloPyObject):
             self.walker_initial_pos = walker_initial_pos
         time_start = time.time()
         if self.npixels is not None:
-            data = make_subset_data(data, pixels=self.npixels, seed=self.seed)
+            data = make_subset_data(data, pixels=self.npixels, seed=self.seed,
+                                    weights=self.pixel_weights)
         if self.walker_initial_pos is None:
             self.walker_initial_pos = model.generate_guess(self.nwalkers,
                                                            seed=self.seed)
+        if self.checkpoint is None:
+            backend = None
+        else:
+            backend = BufferedBackend(self.checkpoint, model._parameter_names,
+                                      self.checkpoint_steps)
         sampler = sample_emcee(model=model, data=data, nwalkers=self.nwalkers,
                                walker_initial_pos=self.walker_initial_pos,
                                nsamples=self.nsamples, parallel=self.parallel,
-                               seed=self.seed)
+                               seed=self.seed, vectorize=self.vectorize,
+                               backend=backend, convergence=self.convergence)
 
-        samples = emcee_samples_DataArray(sampler, model._parameter_names)
-        lnprobs = emcee_lnprobs_DataArray(sampler)
+        if backend is None:
+            samples = emcee_samples_DataArray(sampler, model._parameter_names)
+            lnprobs = emcee_lnprobs_DataArray(sampler)
+        else:
+            samples = partial(backend.read, emcee_samples_DataArray,
+                              model._parameter_names)
+            lnprobs = partial(backend.read, emcee_lnprobs_DataArray)
 
         d_time = time.time() - time_start
         kwargs = {'lnprobs': lnprobs, 'samples': samples}
+        if self.convergence is not None:
+            kwargs['convergence'] = self.convergence.diagnose(
+                sampler, model._parameter_names)
         return SamplingResult(data, model, self, d_time, kwargs)
 
 
@@ -97,10 +163,13 @@ class TemperedStrategy(EmceeStrategy):
     def __init__(self, next_initial_dist=sample_one_sigma_gaussian,
                  nwalkers=100, nsamples=1000, min_pixels=None, npixels=1000,
                  walker_initial_pos=None, parallel='auto', stages=3,
-                 stage_len=30, seed=None):
+                 stage_len=30, seed=None, pixel_weights=None,
+                 convergence=None):
         self.nwalkers = nwalkers
         self.parallel = parallel
         self.seed = seed
+        self.pixel_weights = pixel_weights
+        self.convergence = convergence
         self.walker_initial_pos = walker_initial_pos
         self.next_initial_dist = next_initial_dist
         self.stage_strategies = []
@@ -118,7 +187,9 @@ class TemperedStrategy(EmceeStrategy):
                           nsamples=nsamples,
                           npixels=int(round(npixels)),
                           parallel=self.parallel,
-                          seed=self.seed))
+                          seed=self.seed,
+                          pixel_weights=self.pixel_weights,
+                          convergence=self.convergence))
         if self.seed is not None:
             self.seed += 1
 
@@ -126,11 +197,17 @@ class TemperedStrategy(EmceeStrategy):
         start_time = time.time()
         stage_results = []
         guess = self.walker_initial_pos
-        for i, strategy in enumerate(self.stage_strategies):
-            strategy.walker_initial_pos = guess
-            result = strategy.sample(model, data)
-            stage_results.append(result)
-            guess = self.next_initial_dist(result)
+        # start workers once for all stages instead of once per stage
+        with persistent_pool(self.parallel) as pool:
+            for i, strategy in enumerate(self.stage_strategies):
+                strategy.walker_initial_pos = guess
+                strategy.parallel = pool
+                try:
+                    result = strategy.sample(model, data)
+                finally:
+                    strategy.parallel = self.parallel
+                stage_results.append(result)
+                guess = self.next_initial_dist(result)
         d_time = time.time()-start_time
         return TemperedSamplingResult(result, stage_results, self, d_time)
 
@@ -160,22 +237,225 @@ def emcee_lnprobs_DataArray(sampler):
 
 
 def sample_emcee(model, data, nwalkers, nsamples, walker_initial_pos,
-                 parallel='auto', seed=None):
+                 parallel='auto', seed=None, vectorize=False, backend=None,
+                 convergence=None):
     if _EMCEE_MISSING:
         raise DependencyMissing(
             'emcee', "Install it with \'conda install -c conda-forge emcee\'.")
 
+    if backend is not None and backend.iteration > 0:
+        # resume a stored chain, including the state of its random numbers
+        walker_initial_pos = None
+        nsamples = max(nsamples - backend.iteration, 0)
+        seed = None
+
     obj_func = LnpostWrapper(model, data)
-    pool = choose_pool(parallel)
-    sampler = emcee.EnsembleSampler(nwalkers, len(model._parameters),
-                                    obj_func.evaluate, pool=pool)
-    if seed is not None:
-        np.random.seed(seed)
-        seed_state = np.random.mtrand.RandomState(seed).get_state()
-        sampler.random_state = seed_state
-
-    sampler.run_mcmc(walker_initial_pos, nsamples)
-    if pool is not parallel:
-        pool.close()
+    if vectorize:
+        lnpost = obj_func.evaluate_batch
+    else:
+        lnpost = obj_func.evaluate
+    with shared_pool(parallel, lnpost) as (pool, lnpost):
+        if vectorize:
+            # emcee ignores its pool for vectorized functions, so split the
+            # ensemble over the pool ourselves
+            lnpost = partial(evaluate_in_batches, lnpost, pool=pool)
+            sampler = emcee.EnsembleSampler(nwalkers, len(model._parameters),
+                                            lnpost, vectorize=True,
+                                            backend=backend)
+        else:
+            sampler = emcee.EnsembleSampler(nwalkers, len(model._parameters),
+                                            lnpost, pool=pool, backend=backend)
+        if seed is not None:
+            np.random.seed(seed)
+            seed_state = np.random.mtrand.RandomState(seed).get_state()
+            sampler.random_state = seed_state
+
+        try:
+            if nsamples > 0 and convergence is not None:
+                convergence.run(sampler, walker_initial_pos, nsamples)
+            elif nsamples > 0:
+                sampler.run_mcmc(walker_initial_pos, nsamples)
+        finally:
+            if backend is not None:
+                backend.flush()
 
     return sampler
+
+
+class ConvergenceMonitor(HoloPyObject):
+    """
+    Stops an emcee run once its chain is many autocorrelation times long
+    and the estimates of the autocorrelation times have settled.
+
+    Parameters
+    ----------
+    n_autocorr : float, optional
+        Number of integrated autocorrelation times, of the slowest
+        parameter, that the chain must be
+    rtol : float, optional
+        Largest relative change in the autocorrelation time of any
+        parameter since the previous check
+    check_steps : int, optional
+        Number of steps between estimates of the autocorrelation times
+    """
+    def __init__(self, n_autocorr=50, rtol=0.01, check_steps=100):
+        self.n_autocorr = n_autocorr
+        self.rtol = rtol
+        self.check_steps = check_steps
+
+    def run(self, sampler, initial_state, nsamples):
+        """
+        Advance sampler by up to nsamples steps, stopping early once it has
+        converged. Returns True if it converged.
+        """
+        history = self._history(sampler)
+        if initial_state is None:
+            # continue a resumed chain from its last step, as run_mcmc does
+            initial_state = sampler._previous_state
+        for state in sampler.sample(initial_state, iterations=nsamples):
+            if sampler.iteration % self.check_steps == 0:
+                history['converged'] = self.check(sampler)
+                if history['converged']:
+                    break
+        return history['converged']
+
+    def check(self, sampler):
+        """
+        Estimate the autocorrelation times of the chain so far, record them
+        and return True if the chain has converged.
+        """
+        tau = sampler.get_autocorr_time(tol=0)
+        history = self._history(sampler)
+        previous = history['autocorr_time'][-1:]
+        history['iteration'].append(int(sampler.iteration))
+        history['autocorr_time'].append(tau)
+        if not previous or not np.all(np.isfinite(tau)):
+            return False
+        long_enough = sampler.iteration > self.n_autocorr * tau.max()
+        change = np.abs(tau - previous[0]) / tau
+        return bool(long_enough and np.all(change < self.rtol))
+
+    def diagnose(self, sampler, parameter_names):
+        """
+        Dictionary of the reason sampler stopped and the autocorrelation
+        times estimated while it ran, by parameter.
+        """
+        history = self._history(sampler)
+        if history['iteration'][-1:] != [int(sampler.iteration)]:
+            history['converged'] = self.check(sampler)
+        converged = history['converged']
+        tau = history['autocorr_time'][-1]
+        if converged:
+            reason = 'chain is {:.1f} autocorrelation times long'.format(
+                sampler.iteration / tau.max())
+        else:
+            reason = 'reached nsamples before converging'
+        return {'converged': converged, 'stop_reason': reason,
+                'iterations': int(sampler.iteration),
+                'autocorr_time': {name: float(t) for name, t in
+                                  zip(parameter_names, tau)},
+                'check_iterations': list(history['iteration']),
+                'autocorr_history': [[float(t) for t in taus] for taus in
+                                     history['autocorr_time']]}
+
+    @staticmethod
+    def _history(sampler):
+        # kept with the sampler, so one monitor can watch several runs
+        if not hasattr(sampler, '_holopy_convergence'):
+            sampler._holopy_convergence = {
+                'iteration': [], 'autocorr_time': [], 'converged': False}
+        return sampler._holopy_convergence
+
+
+class BufferedBackend:
+    """
+    emcee backend that stores the chain in an HDF5 file, writing a block of
+    steps at a time instead of opening the file at every step.
+
+    Parameters
+    ----------
+    filename : str
+        HDF5 file to store the chain in. A chain already in the file is
+        continued if it has the same parameter_names.
+    parameter_names : list of str
+        Names of the sampled parameters, stored with the chain
+    steps : int, optional
+        Number of steps to hold in memory between writes. Call flush to
+        write the steps held so far.
+    name : str, optional
+        Name of the group of the file that holds the chain
+    """
+    def __init__(self, filename, parameter_names, steps=10, name='mcmc'):
+        if _EMCEE_MISSING:
+            raise DependencyMissing(
+                'emcee',
+                "Install it with \'conda install -c conda-forge emcee\'.")
+        self.backend = emcee.backends.HDFBackend(filename, name=name)
+        self.parameter_names = list(parameter_names)
+        self.steps = steps
+        self._held = []
+        if self.backend.initialized:
+            with self.backend.open() as f:
+                stored = f[name].attrs.get('parameter_names')
+            if stored is None or list(stored) != self.parameter_names:
+                raise ValueError(
+                    "{} holds a chain of parameters {}, not {}".format(
+                        filename, stored, self.parameter_names))
+
+    def __getattr__(self, name):
+        if name in ['backend', '_held']:
+            raise AttributeError(name)
+        # everything else reads the file, so it must hold every step
+        self.flush()
+        return getattr(self.backend, name)
+
+    @property
+    def iteration(self):
+        if not self.backend.initialized:
+            return 0
+        return self.backend.iteration + len(self._held)
+
+    def reset(self, nwalkers, ndim):
+        self._held = []
+        self.backend.reset(nwalkers, ndim)
+        with self.backend.open('a') as f:
+            f[self.backend.name].attrs['parameter_names'] = \
+                self.parameter_names
+
+    def save_step(self, state, accepted):
+        self._held.append((np.copy(state.coords), np.copy(state.log_prob),
+                           np.copy(accepted), state.random_state))
+        if len(self._held) >= self.steps:
+            self.flush()
+
+    def flush(self):
+        """Write the steps held in memory to the file"""
+        if len(self._held) == 0:
+            return
+        coords, log_prob, accepted, random_states = zip(*self._held)
+        with self.backend.open('a') as f:
+            g = f[self.backend.name]
+            start = g.attrs['iteration']
+            stop = start + len(coords)
+            g['chain'][start:stop] = np.array(coords)
+            g['log_prob'][start:stop] = np.array(log_prob)
+            g['accepted'][:] += np.sum(accepted, axis=0)
+            for i, value in enumerate(random_states[-1]):
+                g.attrs['random_state_{}'.format(i)] = value
+            g.attrs['iteration'] = stop
+        self._held = []
+
+    def read(self, to_DataArray, *args):
+        """
+        Apply one of the emcee_*_DataArray functions to the stored chain
+        """
+        self.flush()
+        nwalkers, ndim = self.backend.shape
+        sampler = emcee.EnsembleSampler(nwalkers, ndim, None,
+                                        backend=self.backend)
+        return to_DataArray(sampler, *args)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_held'] = []
+        return state
@@ -27,16 +27,23 @@ from holopy.inference.prior import Uniform
 from holopy.inference.nmpfit import NmpfitStrategy
 from holopy.inference.scipyfit import LeastSquaresScipyStrategy
 from holopy.inference.cmaes import CmaStrategy
+from holopy.inference.multiresolution import MultiresolutionStrategy
+from holopy.inference.multistart import MultiStartStrategy
 from holopy.inference.emcee import EmceeStrategy, TemperedStrategy
+from holopy.inference.paralleltempering import ParallelTemperingStrategy
+from holopy.inference.laplace import LaplaceStrategy
 
 COORD_KEYS = ['x', 'y', 'z']
 DEFAULT_STRATEGY = {'fit': 'nmpfit', 'sample': 'emcee'}
 ALL_STRATEGIES = {'fit': {'nmpfit': NmpfitStrategy,
                           'scipy lsq': LeastSquaresScipyStrategy,
-                          'cma': CmaStrategy},
+                          'cma': CmaStrategy,
+                          'multiresolution': MultiresolutionStrategy,
+                          'multistart': MultiStartStrategy},
                   'sample': {'emcee': EmceeStrategy,
                              'subset tempering': TemperedStrategy,
-                             'parallel tempering': NotImplemented}}
+                             'parallel tempering': ParallelTemperingStrategy,
+                             'laplace': LaplaceStrategy}}
 
 available_fit_strategies = ALL_STRATEGIES['fit']
 available_sampling_strategies = ALL_STRATEGIES['sample']
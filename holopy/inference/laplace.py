@@ -0,0 +1,212 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Gaussian (Laplace) approximation of the posterior around its maximum, as a
+fast alternative to sampling.
+"""
+import time
+import warnings
+
+import numpy as np
+import xarray as xr
+
+from holopy.core.holopy_object import HoloPyObject
+from holopy.core.metadata import make_subset_data
+from holopy.core.utils import (
+    LnpostWrapper, ResidualsWrapper, finite_difference_hessian,
+    finite_difference_jacobian)
+from holopy.core.parallel import shared_pool
+from holopy.inference.nmpfit import NmpfitStrategy
+from holopy.inference.prior import Prior
+from holopy.inference.result import SamplingResult, UncertainValue
+
+
+LAPLACE_METHODS = ['hessian', 'fisher']
+
+
+class LaplaceStrategy(HoloPyObject):
+    """
+    Inference strategy approximating the posterior with a Gaussian centered
+    on its maximum.
+
+    A local fit finds the maximum a posteriori (MAP) parameters, and the
+    curvature of the log-posterior there gives the covariance of the
+    Gaussian. This costs a fit and a few dozen more forward models, instead
+    of the many thousands of a sampler, but is only accurate for posteriors
+    that are close to Gaussian: a single mode, narrow compared to the prior
+    bounds near it.
+
+    Parameters
+    ----------
+    strategy : fitting strategy, optional
+        strategy used to find the MAP. Default is NmpfitStrategy().
+    method : {'hessian', 'fisher'}, optional
+        'hessian' takes second derivatives of the log-likelihood by central
+        finite differences, which takes n**2 + n + 1 likelihoods for n
+        parameters. 'fisher' approximates them by the Fisher information
+        J^T J, where J is the Jacobian of the residuals from n + 1 forward
+        models. 'fisher' needs a Gaussian likelihood with known noise_sd.
+        Either way the curvature of the priors is added afterwards.
+    nsamples : int, optional
+        number of samples drawn from the Gaussian. Samples outside the
+        support of the priors are drawn again.
+    step : float, optional
+        finite difference step for 'hessian', relative to the scale of each
+        parameter's prior (see Prior.scale)
+    npixels : int, optional
+        Number of pixels in the image to fit and differentiate against.
+        default uses all.
+    parallel : optional
+        number of threads to use or pool object or one of {None, 'all', 'mpi'}.
+        Default tries 'mpi' then 'all'. The finite differences are evaluated
+        concurrently on the pool.
+    seed : int, optional
+        random seed to use
+    """
+    def __init__(self, strategy=None, method='hessian', nsamples=1000,
+                 step=1e-4, npixels=None, parallel='auto', seed=None):
+        if strategy is None:
+            strategy = NmpfitStrategy()
+        if method not in LAPLACE_METHODS:
+            raise ValueError("method must be one of {}, not {}".format(
+                LAPLACE_METHODS, method))
+        self.strategy = strategy
+        self.method = method
+        self.nsamples = nsamples
+        self.step = step
+        self.npixels = npixels
+        self.parallel = parallel
+        self.seed = seed
+
+    def sample(self, model, data):
+        time_start = time.time()
+        if self.method == 'fisher' and _noise_is_unknown(model):
+            raise ValueError("The Fisher information needs a known noise_sd. "
+                             "Use method='hessian' with MarginalizedNoise or "
+                             "a prior on noise_sd.")
+        if self.npixels is not None:
+            data = make_subset_data(data, pixels=self.npixels, seed=self.seed)
+        fit_result = self.strategy.fit(model, data)
+        best = np.array(fit_result._parameters, dtype=float)
+        if self.method == 'hessian':
+            hessian = self._lnlike_hessian(model, data, best)
+        else:
+            hessian = -self._fisher_information(model, data, best)
+        hessian += np.diag(_lnprior_curvature(model._parameters, best))
+        covariance = _covariance(-hessian)
+
+        random = np.random.RandomState(self.seed)
+        draws = _draw_within_priors(model, best, covariance, self.nsamples,
+                                    random)
+        displacements = draws - best
+        max_lnprob = model._lnposterior(list(best), data)
+        lnprobs = max_lnprob - 0.5 * np.einsum(
+            'ij,jk,ik->i', displacements, -hessian, displacements)
+        samples = xr.DataArray(
+            draws[:, np.newaxis], dims=['walker', 'chain', 'parameter'],
+            coords={'parameter': list(model._parameter_names)})
+        lnprobs = xr.DataArray(lnprobs[:, np.newaxis],
+                               dims=['walker', 'chain'])
+        errors = np.sqrt(np.diag(covariance))
+        intervals = [UncertainValue(value, error, name=name) for
+                     value, error, name in
+                     zip(best, errors, model._parameter_names)]
+        laplace = {'method': self.method,
+                   'covariance': covariance.tolist()}
+        d_time = time.time() - time_start
+        kwargs = {'lnprobs': lnprobs, 'samples': samples,
+                  'intervals': intervals, 'laplace': laplace}
+        return SamplingResult(data, model, self, d_time, kwargs)
+
+    def _lnlike_hessian(self, model, data, best):
+        steps = self.step * np.array([par.scale_factor
+                                      for par in model._parameters])
+        # the likelihood alone, so that steps may cross prior bounds
+        obj_func = LnpostWrapper(model, data)
+        with shared_pool(self.parallel, obj_func.evaluate_lnlike_batch) as (
+                pool, lnlike):
+            return finite_difference_hessian(lnlike, best, steps, pool)[1]
+
+    def _fisher_information(self, model, data, best):
+        residuals = ResidualsWrapper(model, data)
+        scales = np.array([par.scale_factor for par in model._parameters])
+        with shared_pool(self.parallel, residuals.evaluate_scaled) as (
+                pool, shared_residuals):
+            jacobian = finite_difference_jacobian(
+                shared_residuals, best / scales, pool)[1]
+        jacobian = jacobian / scales
+        return np.dot(jacobian.T, jacobian)
+
+
+def _noise_is_unknown(model):
+    # J^T J of the noise-scaled residuals leaves out the curvature of the
+    # Gaussian normalization, which matters when noise_sd is a parameter
+    if model._marginalized_noise(model._parameters) is not None:
+        return True
+    noise_sd = model._read_maps(model._parameters)['optics'].get('noise_sd')
+    if isinstance(noise_sd, dict):
+        noise_sd = list(noise_sd.values())
+    noise_sd = getattr(noise_sd, 'values', noise_sd)
+    return any(isinstance(value, Prior) for value in
+               np.ravel(np.array(noise_sd, dtype=object)))
+
+
+def _lnprior_curvature(parameters, values, step=1e-4):
+    # second derivative of each prior at values, 0 where a step would leave
+    # the support of the prior, such as next to the bounds of a Uniform
+    curvature = []
+    for parameter, value in zip(parameters, values):
+        h = step * parameter.scale_factor
+        lnprobs = [parameter.lnprob(value + h), parameter.lnprob(value),
+                   parameter.lnprob(value - h)]
+        second = (lnprobs[0] - 2 * lnprobs[1] + lnprobs[2]) / h**2
+        curvature.append(second if np.isfinite(second) else 0)
+    return np.array(curvature)
+
+
+def _covariance(precision):
+    """
+    Inverse of precision. Directions in which the log-posterior does not
+    curve downwards are given the magnitude of their curvature instead, with
+    a warning.
+    """
+    eigenvalues, eigenvectors = np.linalg.eigh(precision)
+    if np.any(eigenvalues <= 0):
+        warnings.warn("The log-posterior is not at a maximum in every "
+                      "direction, so the fit may not have converged. "
+                      "Uncertainties in those directions are unreliable.")
+        tiny = np.finfo(float).eps * np.abs(eigenvalues).max()
+        eigenvalues = np.maximum(np.abs(eigenvalues), tiny)
+    return np.dot(eigenvectors / eigenvalues, eigenvectors.T)
+
+
+def _draw_within_priors(model, mean, covariance, nsamples, random,
+                        max_rounds=100):
+    draws = np.empty((0, len(mean)))
+    for i in range(max_rounds):
+        needed = nsamples - len(draws)
+        if needed == 0:
+            break
+        new = random.multivariate_normal(mean, covariance, needed)
+        allowed = model._lnprior_batch(new) > -np.inf
+        draws = np.vstack([draws, new[allowed]])
+    if len(draws) < nsamples:
+        warnings.warn("Only {} of {} samples from the Gaussian "
+                      "approximation are within the priors.".format(
+                          len(draws), nsamples))
+    return draws
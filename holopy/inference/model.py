@@ -16,22 +16,31 @@
 # You should have received a copy of the GNU General Public License
 # along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import OrderedDict
 from copy import copy
+from operator import itemgetter
+import threading
 import warnings
+import weakref
 
 import yaml
 import numpy as np
 import xarray as xr
+from scipy.special import gammaln
 
-from holopy.core.metadata import dict_to_array, make_subset_data
+from holopy.core.metadata import (
+    dict_to_array, make_subset_data, get_metadata)
 from holopy.core.utils import ensure_array, ensure_listlike, ensure_scalar
 from holopy.core.holopy_object import HoloPyObject
 from holopy.scattering.errors import (MultisphereFailure, TmatrixFailure,
-                                      InvalidScatterer, MissingParameter)
-from holopy.scattering.interface import calc_holo
+                                      InvalidScatterer, MissingParameter,
+                                      ParameterSpecificationError)
+from holopy.scattering.interface import (
+    calc_holo, calc_holo_batch, prep_schema, interpret_theory, finalize,
+    scattered_field_to_hologram)
 from holopy.scattering.theory import MieLens
-from holopy.inference.prior import (Prior, Uniform, TransformedPrior,
-                                    generate_guess)
+from holopy.inference.prior import (Prior, Uniform, Gaussian,
+                                    TransformedPrior, generate_guess)
 
 
 OPTICS_KEYS = ['medium_index', 'illum_wavelen',
@@ -97,6 +106,46 @@ def read_map(map_entry, parameter_values):
         return map_entry
 
 
+def compile_map(map_entry):
+    '''
+    Compiles a map into a function of parameter values
+
+    The returned function gives the same result as ``read_map(map_entry,
+    parameter_values)``, but the map is only interpreted once, so it is
+    cheap to call for every evaluation of a model.
+
+    Parameters
+    ----------
+    map_entry:
+        map or subset of map created by model methods
+    '''
+    if isinstance(map_entry, str) and map_entry[:11] == '_parameter_':
+        return itemgetter(int(map_entry[11:]))
+    elif isinstance(map_entry, list):
+        if len(map_entry) == 2 and callable(map_entry[0]):
+            func, args = map_entry
+            if func is dict and _is_dictionary_map(args):
+                keys = [key for key, value in args[0]]
+                values = [compile_map(value) for key, value in args[0]]
+                return lambda pars: {key: value(pars) for key, value in
+                                     zip(keys, values)}
+            args = [compile_map(arg) for arg in args]
+            return lambda pars: func(*[arg(pars) for arg in args])
+        else:
+            items = [compile_map(item) for item in map_entry]
+            return lambda pars: [item(pars) for item in items]
+    else:
+        return lambda pars: map_entry
+
+
+def _is_dictionary_map(args):
+    # maps made by Model._map_dictionary: [dict, [[[key, value], ...]]]
+    return (len(args) == 1 and isinstance(args[0], list) and
+            all(isinstance(item, list) and len(item) == 2 and
+                isinstance(item[0], str) and
+                not item[0].startswith('_parameter_') for item in args[0]))
+
+
 def edit_map_indices(map_entry, indices):
     '''
     Adjusts a map to account for ties between parameters
@@ -129,7 +178,17 @@ class Model(HoloPyObject):
 
     Compute probabilities that observed data could be explained by a set of
     scatterer and observation parameters.
+
+    Recent log-likelihoods and forward models can be cached by parameter
+    values and data, see :class:`EvaluationCache`, for work that evaluates
+    the same parameters again. Fits and samplers rarely do, so the caches
+    are off unless cache_size (the number of log-likelihoods kept) or
+    forward_cache_size (the number of forward models kept) is set before
+    the model is first evaluated.
     """
+    cache_size = 0
+    forward_cache_size = 0
+
     def __init__(self, scatterer, noise_sd=None, medium_index=None,
                  illum_wavelen=None, illum_polarization=None, theory='auto',
                  constraints=[]):
@@ -137,7 +196,8 @@ class Model(HoloPyObject):
         self._dummy_scatterer = scatterer.from_parameters(dummy_parameters)
         self.theory = theory
         self.constraints = ensure_listlike(constraints)
-        if not (np.isscalar(noise_sd) or isinstance(noise_sd, (Prior, dict))):
+        if not (np.isscalar(noise_sd) or
+                isinstance(noise_sd, (Prior, dict, MarginalizedNoise))):
             noise_sd = ensure_array(noise_sd)
         optics = [medium_index, illum_wavelen, illum_polarization, noise_sd]
         optics_parameters = {key: val for key, val in zip(OPTICS_KEYS, optics)}
@@ -248,6 +308,79 @@ class Model(HoloPyObject):
             self._parameter_names[indices[0]] = new_name
         self._maps = {key: edit_map_indices(val, indices)
                       for key, val in self._maps.items()}
+        self.clear_cache()
+
+    def _compiled_maps(self):
+        """
+        Compiled version of each map in self._maps
+
+        Maps are compiled the first time they are used and again only after
+        they are replaced, e.g. by add_tie or by subclasses adding maps. Maps
+        must be replaced rather than modified in place for this to notice.
+        """
+        compiled = self.__dict__.setdefault('_plan', {})
+        for key in [key for key in compiled if key not in self._maps]:
+            del compiled[key]
+            self.__dict__.pop('_last_read', None)
+        for key, map_entry in self._maps.items():
+            if key not in compiled or compiled[key][0] is not map_entry:
+                compiled[key] = (map_entry, compile_map(map_entry))
+                # values read from the old map are stale
+                self.__dict__.pop('_last_read', None)
+        return {key: function for key, (map_entry, function)
+                in compiled.items()}
+
+    def _read_maps(self, pars):
+        """
+        Values of every map in self._maps for parameter values pars
+
+        The result for the most recent pars is kept, so that the prior
+        constraints, optics, noise and forward model of one posterior
+        evaluation share a single read of the maps and a single scatterer.
+        Callers should not modify the returned dictionary.
+        """
+        compiled = self._compiled_maps()
+        key = tuple(pars)
+        last_key, last_values = self.__dict__.get('_last_read', (None, None))
+        if last_key is not None and _same_values(last_key, key):
+            return last_values
+        values = {name: function(pars) for name, function in compiled.items()}
+        self._last_read = (key, values)
+        return values
+
+    def __getstate__(self):
+        # compiled maps hold closures that cannot be pickled; they are
+        # rebuilt on first use
+        state = self.__dict__.copy()
+        state.pop('_plan', None)
+        state.pop('_last_read', None)
+        state.pop('_caches', None)
+        return state
+
+    @property
+    def cache_info(self):
+        """
+        hits, misses, size and maxsize of the caches of log-likelihoods
+        ('lnlike') and forward models ('forward'). Evaluations in worker
+        processes of a parallel strategy use their own copies of the model
+        and are not counted.
+        """
+        return {kind: self._evaluation_cache(kind).info()
+                for kind in ['lnlike', 'forward']}
+
+    def clear_cache(self):
+        self.__dict__.pop('_last_read', None)
+        for kind in ['lnlike', 'forward']:
+            self._evaluation_cache(kind).clear()
+
+    def _evaluation_cache(self, kind):
+        # separate caches, so that large forward models cannot push out
+        # log-likelihoods
+        if '_caches' not in self.__dict__:
+            self._caches = {
+                'lnlike': EvaluationCache(self.cache_size),
+                'forward': EvaluationCache(self.forward_cache_size)}
+        return self._caches[kind]
 
     def _iteritems(self):
         keys = ['scatterer', 'theory', '_parameters',
@@ -319,11 +452,14 @@ class Model(HoloPyObject):
 
     @property
     def noise_sd(self):
+        marginalized = self._marginalized_noise(self._parameters)
+        if marginalized is not None:
+            return marginalized
         return self._find_noise(self._parameters, None)
 
     @property
     def scatterer(self):
-        return self._scatterer_from_parameters(self._parameters)
+        return self._new_scatterer(self._parameters)
 
     def scatterer_from_parameters(self, pars):
         """
@@ -339,14 +475,22 @@ class Model(HoloPyObject):
         scatterer
         """
         pars = self.ensure_parameters_are_listlike(pars)
-        return self._scatterer_from_parameters(pars)
+        return self._new_scatterer(pars)
+
+    def _new_scatterer(self, pars):
+        scatterer_parameters = self._compiled_maps()['scatterer'](pars)
+        return self._dummy_scatterer.from_parameters(scatterer_parameters)
 
     def _scatterer_from_parameters(self, pars):
         """
-        Internal function taking pars as a list only
+        Internal function taking pars as a list only. The scatterer is
+        shared by every call with the same pars and should not be modified.
         """
-        scatterer_parameters = read_map(self._maps['scatterer'], pars)
-        return self._dummy_scatterer.from_parameters(scatterer_parameters)
+        values = self._read_maps(pars)
+        if '_scatterer' not in values:
+            values['_scatterer'] = self._dummy_scatterer.from_parameters(
+                values['scatterer'])
+        return values['_scatterer']
 
     def ensure_parameters_are_listlike(self, pars):
         if isinstance(pars, dict):
@@ -362,13 +506,13 @@ class Model(HoloPyObject):
         pars: list
             values to create optics. Order should match model._parameters
         """
-        mapped_optics = read_map(self._maps['optics'], pars)
+        mapped_optics = self._read_maps(pars)['optics']
 
         def find_parameter(key):
             if key in mapped_optics and mapped_optics[key] is not None:
                 val = mapped_optics[key]
-            elif hasattr(schema, key) and getattr(schema, key) is not None:
-                val = getattr(schema, key)
+            elif get_metadata(schema, key) is not None:
+                val = get_metadata(schema, key)
             else:
                 raise MissingParameter(key)
             return val
@@ -383,11 +527,11 @@ class Model(HoloPyObject):
         pars: list
             values to create noise_sd. Order should match model._parameters
         """
-        optics_map = read_map(self._maps['optics'], pars)
+        optics_map = self._read_maps(pars)['optics']
         if 'noise_sd' in optics_map and optics_map['noise_sd'] is not None:
             val = optics_map['noise_sd']
-        elif hasattr(schema, 'noise_sd'):
-            val = schema.noise_sd
+        elif get_metadata(schema, 'noise_sd', _MISSING) is not _MISSING:
+            val = get_metadata(schema, 'noise_sd')
         else:
             raise MissingParameter('noise_sd')
         if val is None:
@@ -395,8 +539,21 @@ class Model(HoloPyObject):
                 val = 1
             else:
                 raise MissingParameter('noise_sd for non-uniform priors')
+        elif isinstance(val, MarginalizedNoise):
+            # residuals stay in the units of the data; the noise only enters
+            # the likelihood, see _lnlike_of_residuals
+            val = 1
         return val
 
+    def _marginalized_noise(self, pars):
+        """
+        The MarginalizedNoise given as noise_sd, or None if there is none
+        """
+        noise_sd = self._read_maps(pars)['optics'].get('noise_sd')
+        if isinstance(noise_sd, MarginalizedNoise):
+            return noise_sd
+        return None
+
     def generate_guess(self, n=1, scaling=1, seed=None):
         return generate_guess(self._parameters, n, scaling, seed)
 
@@ -420,17 +577,35 @@ class Model(HoloPyObject):
         """
         Internal function taking pars as a list only
         """
+        if not self._satisfies_constraints(pars):
+            return -np.inf
+        return sum([p.lnprob(val) for p, val in
+                    zip(self._parameters, pars)])
+
+    def _satisfies_constraints(self, pars):
         if 'scatterer' in self._maps:
             try:
                 par_scat = self._scatterer_from_parameters(pars)
             except InvalidScatterer:
-                return -np.inf
+                return False
 
         for constraint in self.constraints:
             if not constraint.check(par_scat):
-                return -np.inf
-        return sum([p.lnprob(val) for p, val in
-                    zip(self._parameters, pars)])
+                return False
+        return True
+
+    def _lnprior_batch(self, pars):
+        """
+        Internal function taking pars as a 2D array, one row per set of
+        parameter values
+        """
+        lnprior = np.zeros(len(pars))
+        for parameter, values in zip(self._parameters, np.transpose(pars)):
+            lnprior += _lnprob_of_column(parameter, values)
+        for i in np.flatnonzero(lnprior > -np.inf):
+            if not self._satisfies_constraints(pars[i]):
+                lnprior[i] = -np.inf
+        return lnprior
 
     def lnposterior(self, pars, data, pixels=None):
         """
@@ -467,17 +642,112 @@ class Model(HoloPyObject):
         else:
             if pixels is not None:
                 data = make_subset_data(data, pixels=pixels)
-            return lnprior + self._lnlike(pars, data)
+            return lnprior + self._evaluation_cache('lnlike').evaluate(
+                pars, data, self._lnlike)
+
+    def lnposterior_batch(self, pars, data, pixels=None):
+        """
+        Compute the log-posterior probability of many sets of pars at once
+
+        Parameters
+        -----------
+        pars: 2D array or list of dicts or lists
+            Each row holds values for every parameter, either in the order
+            of self._parameters or as a dict with keys matching
+            self.parameters
+        data: xarray
+            The data to compute posterior against
+        pixels: int(optional)
+            Specify to use a random subset of all pixels in data. The same
+            subset is used for every row of pars.
+
+        Returns
+        --------
+        lnposterior: 1D array
+        """
+        pars = np.array([self.ensure_parameters_are_listlike(row)
+                         for row in pars])
+        return self._lnposterior_batch(pars, data, pixels)
+
+    def _lnposterior_batch(self, pars, data, pixels=None):
+        """
+        Internal function taking pars as a 2D array only
+        """
+        if _overrides(self, '_lnposterior'):
+            return np.array([self._lnposterior(row, data, pixels)
+                             for row in pars], dtype=float)
+        lnposterior = self._lnprior_batch(pars)
+        # as in _lnposterior, skip the likelihood where the prior forbids it
+        allowed = lnposterior > -np.inf
+        if allowed.any():
+            if pixels is not None:
+                data = make_subset_data(data, pixels=pixels)
+            lnposterior[allowed] += self._cached_lnlike_batch(pars[allowed],
+                                                              data)
+        return lnposterior
 
-    def forward(self, pars, detector):
+    def _cached_lnlike_batch(self, pars, data):
+        """
+        self._lnlike_batch, computing only the rows missing from the cache
+        """
+        cache = self._evaluation_cache('lnlike')
+        lnlike = [cache.lookup(row, data) for row in pars]
+        missing = [i for i, value in enumerate(lnlike) if value is _MISSING]
+        if missing:
+            computed = self._lnlike_batch(pars[missing], data)
+            for i, value in zip(missing, computed):
+                lnlike[i] = value
+                cache.store(pars[i], data, value)
+        return np.array(lnlike, dtype=float)
+
+    def forward(self, pars, detector, data=None):
+        """
+        Compute the forward model for pars on detector
+
+        Parameters
+        -----------
+        pars: dict or list
+            list - values for each parameter in the order of self._parameters
+            dict - keys should match self.parameters
+        detector: xarray
+            dimensions and metadata of the forward model
+        data: xarray, optional
+            Data to fit any analytically handled values to, such as alpha of
+            an AlphaModel with analytic_alpha. Ignored by other models.
+
+        Returns
+        --------
+        forward_model: xarray
+        """
         pars = self.ensure_parameters_are_listlike(pars)
-        return self._forward(pars, detector)
+        forward_model = self._evaluation_cache('forward').evaluate(
+            pars, detector, self._forward)
+        if isinstance(forward_model, xr.DataArray):
+            # the cached hologram is shared with later evaluations
+            forward_model = forward_model.copy()
+        return forward_model
 
     def _forward(self, pars, detector):
         raise NotImplementedError("Implement in subclass")
 
+    def _analytic_parameters(self, pars, data):
+        """
+        Values which the model fits to data analytically instead of treating
+        them as parameters, as a dict. Models without any return {}.
+        """
+        return {}
+
+    def _forward_batch(self, pars, detector):
+        """
+        Compute forward models for each row of pars. Returns either a list
+        with one result per row or an xarray with a leading 'batch'
+        dimension. Subclasses can override this to share work between rows.
+        """
+        return [self._forward(row, detector) for row in pars]
+
     def _residuals(self, pars, data, noise):
-        forward_model = self._forward(pars, data)
+        forward_model = self._evaluation_cache('forward').evaluate(
+            pars, data, self._forward)
         return ((forward_model - data) / noise).values
 
     def lnlike(self, pars, data):
@@ -497,19 +767,49 @@ class Model(HoloPyObject):
         lnlike: float
         """
         pars = self.ensure_parameters_are_listlike(pars)
-        return self._lnlike(pars, data)
+        return self._evaluation_cache('lnlike').evaluate(
+            pars, data, self._lnlike)
 
     def _lnlike(self, pars, data):
         """
         Internal function taking pars as a list only
         """
         noise_sd = self._find_noise(pars, data)
-        N = data.size
-        log_likelihood = ensure_scalar(
-            -N/2 * np.log(2 * np.pi) -
-            N * np.mean(np.log(ensure_array(noise_sd))) -
-            0.5 * (self._residuals(pars, data, noise_sd)**2).sum())
-        return log_likelihood
+        return self._lnlike_of_residuals(
+            pars, self._residuals(pars, data, noise_sd), noise_sd, data)
+
+    def _lnlike_of_residuals(self, pars, residuals, noise_sd, data):
+        marginalized = self._marginalized_noise(pars)
+        if marginalized is None:
+            return _gaussian_lnlike(residuals, noise_sd, data)
+        return marginalized.lnlike(residuals, data)
+
+    def _lnlike_batch(self, pars, data):
+        """
+        Internal function taking pars as a 2D array only
+        """
+        if _overrides(self, '_lnlike') or _overrides(self, '_residuals'):
+            return np.array([self._lnlike(row, data) for row in pars])
+        return self._gaussian_lnlike_batch(pars, data)
+
+    def _gaussian_lnlike_batch(self, pars, data):
+        """
+        Gaussian log-likelihoods of the forward models of each row of pars,
+        computed together with self._forward_batch
+        """
+        forward_models = self._forward_batch(pars, data)
+        if isinstance(forward_models, xr.DataArray):
+            differences = (forward_models - data).transpose('batch', ...)
+        else:
+            differences = [forward_model - data
+                           for forward_model in forward_models]
+        lnlike = np.empty(len(pars))
+        for i, (row, difference) in enumerate(zip(pars, differences)):
+            noise_sd = self._find_noise(row, data)
+            residuals = ensure_array(difference / noise_sd)
+            lnlike[i] = self._lnlike_of_residuals(row, residuals, noise_sd,
+                                                  data)
+        return lnlike
 
     def fit(self, data, strategy=None):
         from holopy.fitting import fit_warning
@@ -526,6 +826,149 @@ class Model(HoloPyObject):
         return strategy.sample(self, data)
 
 
+_MISSING = object()
+
+
+class EvaluationCache(object):
+    """
+    Least recently used cache of model evaluations, such as forward models
+    or log-likelihoods.
+
+    Entries are keyed by the parameter values and the identity of the data,
+    so the cache assumes that neither the model nor the data are modified in
+    place between evaluations. The data are only weakly referenced, so the
+    cache does not keep them alive; entries for data that no longer exist
+    are dropped. Evaluations with array valued parameters are not cached.
+
+    Parameters
+    ----------
+    maxsize : int
+        The largest number of evaluations kept. 0 turns the cache off.
+    """
+    def __init__(self, maxsize=0):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # a model may be shared by the threads of a thread pool
+        self._lock = threading.Lock()
+
+    def _key(self, pars, data):
+        if self.maxsize == 0:
+            return None
+        key = (id(data), tuple(pars))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def lookup(self, pars, data):
+        """
+        The cached evaluation, or _MISSING if there is none
+        """
+        key = self._key(pars, data)
+        if key is None:
+            return _MISSING
+        with self._lock:
+            entry = self._entries.get(key)
+            # the id of data that no longer exist may have been reused
+            if entry is not None and entry[0]() is data:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return _MISSING
+
+    def store(self, pars, data, value):
+        key = self._key(pars, data)
+        if key is None:
+            return
+        try:
+            reference = weakref.ref(data)
+        except TypeError:
+            return
+        with self._lock:
+            for old_key in [old_key for old_key, (old_reference, old_value)
+                            in self._entries.items()
+                            if old_reference() is None]:
+                del self._entries[old_key]
+            self._entries[key] = (reference, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def evaluate(self, pars, data, calculation):
+        """
+        The cached evaluation if there is one, otherwise calculation(pars,
+        data), which is then cached
+        """
+        value = self.lookup(pars, data)
+        if value is _MISSING:
+            value = calculation(pars, data)
+            self.store(pars, data, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._entries), 'maxsize': self.maxsize}
+
+
+def _gaussian_lnlike(residuals, noise_sd, data):
+    N, chi_squared = _weighted_chisq(residuals, data)
+    return ensure_scalar(
+        -N/2 * np.log(2 * np.pi) -
+        N * np.mean(np.log(ensure_array(noise_sd))) -
+        0.5 * chi_squared)
+
+
+def _weighted_chisq(residuals, data):
+    """
+    Number of pixels and sum of squared residuals, corrected with the pixel
+    weights of data if it is an importance weighted pixel subset
+    """
+    weights = get_metadata(data, 'pixel_weights')
+    if weights is None:
+        return data.size, (residuals**2).sum()
+    # importance weighted pixel subset, see SubsetSampler
+    N = np.sum(weights) * data.size / np.size(weights)
+    return N, (weights * residuals**2).sum()
+
+
+def _overrides(model, method_name, base=Model):
+    return getattr(type(model), method_name) is not getattr(base, method_name)
+
+
+def _lnprob_of_column(parameter, values):
+    try:
+        lnprob = np.broadcast_to(parameter.lnprob(values), values.shape)
+    except (TypeError, ValueError):
+        # prior only understands one value at a time
+        lnprob = [parameter.lnprob(value) for value in values]
+    return np.asarray(lnprob, dtype=float)
+
+
+def _has_parameters(map_entry):
+    if isinstance(map_entry, str):
+        return map_entry.startswith('_parameter_')
+    if isinstance(map_entry, (list, tuple)):
+        return any(_has_parameters(item) for item in map_entry)
+    return False
+
+
+def _same_values(pars1, pars2):
+    try:
+        return len(pars1) == len(pars2) and all(
+            p1 is p2 or p1 == p2 for p1, p2 in zip(pars1, pars2))
+    except ValueError:
+        # array valued parameters, not worth comparing
+        return False
+
+
 class LimitOverlaps(HoloPyObject):
     """
     Constraint prohibiting overlaps beyond a certain tolerance.
@@ -539,22 +982,106 @@ class LimitOverlaps(HoloPyObject):
         return s.largest_overlap() <= ((np.min(s.r) * 2) * self.fraction)
 
 
+ANALYTIC_ALPHA_OPTIONS = ['profile', 'marginalize']
+
+
+class MarginalizedNoise(HoloPyObject):
+    """
+    Noise of unknown size, to be integrated out of the likelihood.
+
+    Give this as the noise_sd of a model instead of a prior on noise_sd. The
+    variance of the noise has an inverse gamma prior, and integrating the
+    Gaussian likelihood over it leaves a Student-t like function of the sum
+    of squared residuals. The noise is therefore not a parameter of the
+    model and costs no extra forward models.
+
+    Parameters
+    ----------
+    shape, scale : float, optional
+        Shape and scale of the inverse gamma prior on the variance of the
+        noise. The default of 0 for both is the Jeffreys prior, proportional
+        to 1/noise_sd, which is improper, so the likelihood is then only
+        known up to a constant factor.
+
+    Notes
+    -----
+    Least-squares fits of a model with marginalized noise minimize the sum
+    of squared residuals in the units of the data, and report uncertainties
+    for a noise_sd of 1.
+    """
+    def __init__(self, shape=0, scale=0):
+        if shape < 0 or scale < 0:
+            raise ParameterSpecificationError(
+                "Shape {} and scale {} of the noise prior must not be "
+                "negative.".format(shape, scale))
+        self.shape = shape
+        self.scale = scale
+
+    def lnlike(self, residuals, data):
+        """
+        Log-likelihood of residuals, in the units of data, with the noise
+        integrated out
+        """
+        N, chi_squared = _weighted_chisq(residuals, data)
+        return ensure_scalar(self.lnlike_of_chisq(chi_squared, N))
+
+    def lnlike_of_chisq(self, chi_squared, npixels):
+        """
+        Log-likelihood of npixels residuals with sum of squares chi_squared,
+        with the noise integrated out. Accepts arrays of chi_squared.
+        """
+        shape = self.shape + npixels / 2
+        lnlike = (gammaln(shape) - npixels / 2 * np.log(2 * np.pi) -
+                  shape * np.log(self.scale + np.asarray(chi_squared) / 2))
+        if self.shape > 0 and self.scale > 0:
+            lnlike += self.shape * np.log(self.scale) - gammaln(self.shape)
+        return lnlike
+
+
 class AlphaModel(Model):
     """
     Model of hologram image formation with scaling parameter alpha.
+
+    The hologram is a quadratic function of alpha, so alpha can be handled
+    analytically instead of as a parameter of the model. With
+    analytic_alpha='profile', each set of parameters is evaluated at the alpha
+    that best fits the data within the bounds of the alpha prior. With
+    analytic_alpha='marginalize', the likelihood is integrated over the alpha
+    prior. Either way the scattered field is computed once for each set of
+    parameters. Forward models are scaled by the alpha that best fits the
+    data passed to forward, or by the guess of the alpha prior if no data are
+    given. Results report the best fitting alpha in their parameters.
     """
     def __init__(self, scatterer, alpha=1, noise_sd=None, medium_index=None,
                  illum_wavelen=None, illum_polarization=None, theory='auto',
-                 constraints=[]):
+                 constraints=[], analytic_alpha=None):
         super().__init__(scatterer, noise_sd, medium_index, illum_wavelen,
                          illum_polarization, theory, constraints)
-        self._maps['model'] = self._convert_to_map({'alpha': alpha})
+        if analytic_alpha is None:
+            self._maps['model'] = self._convert_to_map({'alpha': alpha})
+        else:
+            _check_analytic_alpha(alpha, analytic_alpha)
+            # alpha is kept out of self._parameters, so the map holds the
+            # prior itself
+            self._maps['model'] = [dict, [[['alpha', alpha],
+                                           ['analytic_alpha', analytic_alpha]]]]
 
     @property
     def alpha(self):
         return read_map(self._maps['model'], self._parameters)['alpha']
 
-    def _forward(self, pars, detector):
+    @property
+    def analytic_alpha(self):
+        return read_map(self._maps['model'],
+                        self._parameters).get('analytic_alpha')
+
+    def forward(self, pars, detector, data=None):
+        if self.analytic_alpha is None or data is None:
+            return super().forward(pars, detector)
+        pars = self.ensure_parameters_are_listlike(pars)
+        return self._forward(pars, detector, self.fit_alpha(pars, data))
+
+    def _forward(self, pars, detector, alpha=None):
         """
         Compute a hologram from pars with dimensions and metadata of detector,
         scaled by self.alpha.
@@ -567,8 +1094,14 @@ class AlphaModel(Model):
         detector: xarray
             dimensions of the resulting hologram. Metadata taken from
             detector if not given explicitly when instantiating self.
+        alpha: float, optional
+            Scaling to use instead of the one given by pars, or by the guess
+            of the alpha prior with analytic_alpha.
         """
-        alpha = read_map(self._maps['model'], pars)['alpha']
+        if alpha is None and self.analytic_alpha is None:
+            alpha = self._read_maps(pars)['model']['alpha']
+        elif alpha is None:
+            alpha = self.alpha.guess
         optics = self._find_optics(pars, detector)
         scatterer = self._scatterer_from_parameters(pars)
         try:
@@ -577,6 +1110,206 @@ class AlphaModel(Model):
         except (MultisphereFailure, TmatrixFailure, InvalidScatterer):
             return -np.inf
 
+    def _forward_batch(self, pars, detector):
+        """
+        Compute holograms for each row of pars together with calc_holo_batch,
+        which shares the detector setup between rows. Falls back to one
+        hologram at a time if the optics depend on the parameters, alpha is
+        handled analytically or any scattering calculation fails.
+        """
+        if (_has_parameters(self._maps['optics']) or
+                self.analytic_alpha is not None):
+            return super()._forward_batch(pars, detector)
+        optics = self._find_optics(pars[0], detector)
+        try:
+            scatterers = [self._scatterer_from_parameters(row)
+                          for row in pars]
+            alphas = [self._read_maps(row)['model']['alpha'] for row in pars]
+            return calc_holo_batch(detector, scatterers, theory=self.theory,
+                                   scaling=alphas, **optics)
+        except (MultisphereFailure, TmatrixFailure, InvalidScatterer):
+            return super()._forward_batch(pars, detector)
+
+    def fit_alpha(self, pars, data):
+        """
+        Find the alpha within the bounds of the alpha prior that best fits
+        data for parameter values pars
+
+        Parameters
+        -----------
+        pars: dict or list
+            list - values for each parameter in the order of self._parameters
+            dict - keys should match self.parameters
+        data: xarray
+            The data to fit alpha to
+
+        Returns
+        --------
+        alpha: float
+        """
+        pars = self.ensure_parameters_are_listlike(pars)
+        terms = self._alpha_terms(pars, data, 1)
+        coefficients = _chisq_coefficients(*terms, data)
+        return _best_alpha(coefficients, self.alpha)
+
+    def _analytic_parameters(self, pars, data):
+        if self.analytic_alpha is None:
+            return {}
+        try:
+            return {'alpha': float(self.fit_alpha(pars, data))}
+        except (MultisphereFailure, TmatrixFailure, InvalidScatterer):
+            return {'alpha': np.nan}
+
+    def _alpha_terms(self, pars, data, noise_sd):
+        """
+        Residuals as a quadratic in alpha, with the scattered field computed
+        only once: residuals = quadratic * alpha**2 + linear * alpha + offset.
+        Returns the three coefficients as arrays like those of _residuals.
+        """
+        optics = self._find_optics(pars, data)
+        scatterer = self._scatterer_from_parameters(pars)
+        schema = prep_schema(data, **optics)
+        theory = interpret_theory(scatterer, self.theory, schema)
+        field = theory.calculate_scattered_field(scatterer, schema)
+        reference = schema.illum_polarization
+        quadratic = (np.abs(field.sel(vector=['x', 'y']))**2).sum(dim='vector')
+        linear = 2 * (field * np.conj(reference)).real.sel(
+            vector=['x', 'y']).sum(dim='vector')
+        offset = scattered_field_to_hologram(0 * field, reference)
+        quadratic, linear, offset = [finalize(schema, term) for term in
+                                     (quadratic, linear, offset)]
+        offset = offset - data
+        return [ensure_array(term / noise_sd) for term in
+                xr.broadcast(quadratic, linear, offset)]
+
+    def _residuals(self, pars, data, noise):
+        if self.analytic_alpha is None:
+            return super()._residuals(pars, data, noise)
+        quadratic, linear, offset = self._alpha_terms(pars, data, noise)
+        coefficients = _chisq_coefficients(quadratic, linear, offset, data)
+        alpha = _best_alpha(coefficients, self.alpha)
+        return quadratic * alpha**2 + linear * alpha + offset
+
+    def _lnlike(self, pars, data):
+        """
+        Internal function taking pars as a list only
+        """
+        if self.analytic_alpha is None:
+            return super()._lnlike(pars, data)
+        noise_sd = self._find_noise(pars, data)
+        try:
+            terms = self._alpha_terms(pars, data, noise_sd)
+        except (MultisphereFailure, TmatrixFailure, InvalidScatterer):
+            return -np.inf
+        coefficients = _chisq_coefficients(*terms, data)
+        alpha = _best_alpha(coefficients, self.alpha)
+        marginalized = self._marginalized_noise(pars)
+        if marginalized is None:
+            # log-likelihood of residuals which are all 0
+            normalization = _gaussian_lnlike(np.zeros_like(terms[0]),
+                                             noise_sd, data)
+
+            def lnlike_of_chisq(chi_squared):
+                return normalization - chi_squared / 2
+        else:
+            npixels = _weighted_chisq(terms[0], data)[0]
+
+            def lnlike_of_chisq(chi_squared):
+                return marginalized.lnlike_of_chisq(chi_squared, npixels)
+        if self.analytic_alpha == 'profile':
+            return lnlike_of_chisq(np.polyval(coefficients, alpha))
+        return _marginal_lnlike(coefficients, alpha, self.alpha,
+                                lnlike_of_chisq)
+
+    def _lnlike_batch(self, pars, data):
+        """
+        Internal function taking pars as a 2D array only
+        """
+        if (self.analytic_alpha is None and
+                not _overrides(self, '_lnlike', AlphaModel) and
+                not _overrides(self, '_residuals', AlphaModel)):
+            return self._gaussian_lnlike_batch(pars, data)
+        return np.array([self._lnlike(row, data) for row in pars])
+
+
+def _check_analytic_alpha(alpha, analytic_alpha):
+    if analytic_alpha not in ANALYTIC_ALPHA_OPTIONS:
+        raise ValueError("analytic_alpha must be None or one of {}, not "
+                         "{}".format(ANALYTIC_ALPHA_OPTIONS, analytic_alpha))
+    if not isinstance(alpha, (Uniform, Gaussian)):
+        raise ValueError("analytic_alpha requires alpha to be a Uniform or "
+                         "Gaussian prior, not {}".format(alpha))
+    if analytic_alpha == 'marginalize' and isinstance(alpha, Uniform):
+        if not np.isfinite(alpha.interval):
+            raise ValueError("Cannot marginalize over alpha with an "
+                             "improper uniform prior.")
+
+
+def _chisq_coefficients(quadratic, linear, offset, data):
+    """
+    Polynomial coefficients of chi squared as a function of alpha, highest
+    power first, for residuals quadratic * alpha**2 + linear * alpha + offset
+    """
+    weights = get_metadata(data, 'pixel_weights')
+    if weights is None:
+        weights = 1
+    return np.array([np.sum(weights * quadratic**2),
+                     2 * np.sum(weights * quadratic * linear),
+                     np.sum(weights * (linear**2 + 2 * quadratic * offset)),
+                     2 * np.sum(weights * linear * offset),
+                     np.sum(weights * offset**2)])
+
+
+def _alpha_bounds(prior):
+    return (getattr(prior, 'lower_bound', -np.inf),
+            getattr(prior, 'upper_bound', np.inf))
+
+
+def _best_alpha(coefficients, prior):
+    """
+    Alpha within the bounds of prior that minimizes chi squared
+    """
+    lower, upper = _alpha_bounds(prior)
+    candidates = [root.real for root in np.roots(np.polyder(coefficients))
+                  if abs(root.imag) <= 1e-8 * abs(root)]
+    candidates = np.clip(candidates + [prior.guess], lower, upper)
+    return candidates[np.argmin(np.polyval(coefficients, candidates))]
+
+
+def _marginal_lnlike(coefficients, best_alpha, prior, lnlike_of_chisq,
+                     npoints=129):
+    """
+    log of the integral over alpha of the likelihood times the prior, where
+    lnlike_of_chisq gives the log-likelihood as a function of chi squared
+
+    Chi squared is quartic in alpha, so the integrand is not Gaussian. It is
+    integrated numerically with the trapezoid rule, on a fine grid around
+    best_alpha together with a coarse grid over the whole prior.
+    """
+    lower, upper = _alpha_bounds(prior)
+    if isinstance(prior, Gaussian):
+        lower = max(lower, prior.mu - 10 * prior.sd)
+        upper = min(upper, prior.mu + 10 * prior.sd)
+    grid = [np.linspace(lower, upper, npoints)]
+    # second derivative of the log-likelihood at best_alpha, where the first
+    # derivative of chi squared vanishes
+    chi_squared = np.polyval(coefficients, best_alpha)
+    step = 1e-6 * max(chi_squared, 1)
+    slope = (lnlike_of_chisq(chi_squared + step) -
+             lnlike_of_chisq(chi_squared)) / step
+    curvature = -slope * np.polyval(np.polyder(coefficients, 2), best_alpha)
+    if curvature > 0:
+        width = 12 / np.sqrt(curvature)
+        fine = np.linspace(best_alpha - width, best_alpha + width, npoints)
+        grid.append(np.clip(fine, lower, upper))
+    grid = np.unique(np.concatenate(grid))
+    lnintegrand = (lnlike_of_chisq(np.polyval(coefficients, grid)) +
+                   _lnprob_of_column(prior, grid))
+    peak = lnintegrand.max()
+    if not np.isfinite(peak):
+        return -np.inf
+    return peak + np.log(np.trapz(np.exp(lnintegrand - peak), grid))
+
 
 # TODO: Change the default theory (when it is "auto") to be
 # selected by the model.
@@ -651,10 +1384,10 @@ class PerfectLensModel(Model):
             dimensions of the resulting hologram. Metadata taken from
             detector if not given explicitly when instantiating self.
         """
-        alpha = read_map(self._maps['model'], pars)['alpha']
+        alpha = self._read_maps(pars)['model']['alpha']
         optics_kwargs = self._find_optics(pars, detector)
         scatterer = self._scatterer_from_parameters(pars)
-        theory_kwargs = read_map(self._maps['theory'], pars)
+        theory_kwargs = self._read_maps(pars)['theory']
         # FIXME would be nice to have access to the interpolator kwargs
         theory = MieLens(**theory_kwargs)
         try:
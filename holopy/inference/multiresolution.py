@@ -0,0 +1,110 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Coarse-to-fine fitting of holograms downsampled to progressively finer
+pixels.
+"""
+import time
+
+from holopy.core.holopy_object import HoloPyObject
+from holopy.core.metadata import copy_metadata
+from holopy.core.process import bin_image
+from holopy.inference.nmpfit import NmpfitStrategy
+from holopy.inference.result import FitResult
+
+
+class MultiresolutionStrategy(HoloPyObject):
+    """
+    Fits downsampled copies of the data from coarsest to finest, starting
+    each fit from the solution of the previous one.
+
+    Downsampling by a factor of f costs about 1/f**2 of a full resolution
+    forward model, so most of the distance from a rough guess, such as one
+    from center_find, is covered cheaply and the final fit on the full data
+    needs only a few iterations.
+
+    Parameters
+    ----------
+    strategy : fit strategy, optional
+        Strategy used for each fit. It must have an initial_guess attribute,
+        like :class:`.NmpfitStrategy` (the default) and
+        :class:`.LeastSquaresScipyStrategy`.
+    factors : list of int, optional
+        Downsampling factors of the coarse fits, coarsest first. A final fit
+        is always made on the data as given. The hologram's fringes must
+        still be resolved at the coarsest level.
+    bin_pixels : bool, optional
+        If False (default), coarse fits use every factor-th pixel of the
+        data along x and y, so their solutions are unbiased. If True, they
+        use :func:`.bin_image`, which averages out noise and fine fringes
+        but lowers the fringe contrast, which biases the coarse solutions.
+    """
+    def __init__(self, strategy=None, factors=(4, 2), bin_pixels=False):
+        if strategy is None:
+            strategy = NmpfitStrategy()
+        self.strategy = strategy
+        self.factors = factors
+        self.bin_pixels = bin_pixels
+
+    def fit(self, model, data):
+        """
+        fit a model to some data
+
+        Parameters
+        ----------
+        model : :class:`~holopy.fitting.model.Model` object
+            A model describing the scattering system which leads to your
+            data and the parameters to vary to fit it to the data
+        data : xarray.DataArray
+            The data to fit
+
+        Returns
+        -------
+        result : :class:`FitResult`
+            Result of the final, full resolution fit
+        """
+        time_start = time.time()
+        strategy = self.strategy
+        initial_guess = strategy.initial_guess
+        npixels = getattr(strategy, 'npixels', None)
+        try:
+            for factor in list(self.factors) + [1]:
+                level_data = self._downsample(data, factor)
+                if npixels is not None:
+                    # coarse levels can have fewer pixels than npixels
+                    size = len(level_data.x) * len(level_data.y)
+                    strategy.npixels = npixels if npixels < size else None
+                result = strategy.fit(model, level_data)
+                strategy.initial_guess = result._parameters
+        finally:
+            strategy.initial_guess = initial_guess
+            if npixels is not None:
+                strategy.npixels = npixels
+        d_time = time.time() - time_start
+        kwargs = {key: getattr(result, key) for key in result._kwargs_keys}
+        return FitResult(result.data, model, self, d_time, kwargs)
+
+    def _downsample(self, data, factor):
+        if factor == 1:
+            return data
+        if self.bin_pixels:
+            return bin_image(data, factor)
+        start = factor // 2
+        return copy_metadata(data, data.isel(x=slice(start, None, factor),
+                                             y=slice(start, None, factor)),
+                             do_coords=False)
@@ -0,0 +1,201 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Global fitting by running local fits from many starting points at once.
+"""
+import time
+import warnings
+from copy import copy
+
+import numpy as np
+
+from holopy.core.holopy_object import HoloPyObject
+from holopy.core.parallel import shared_pool
+from holopy.inference.nmpfit import NmpfitStrategy
+from holopy.inference.result import FitResult
+from holopy.scattering.errors import (
+    InvalidScatterer, MultisphereFailure, TmatrixFailure)
+
+# raised when a local fit steps to parameters that cannot be calculated,
+# which unbounded minimizers can do from a poor starting point
+LOCAL_FIT_FAILURES = (InvalidScatterer, MultisphereFailure, TmatrixFailure)
+
+
+class MultiStartStrategy(HoloPyObject):
+    """
+    Runs local fits from starting points drawn from the priors and keeps the
+    best one.
+
+    Least-squares fits of holograms often land in the wrong basin in z or
+    radius. Here nstarts fits run concurrently on the pool, a few iterations
+    at a time. After each round, starts that could not catch up with the
+    best one even if they kept improving at their current rate are stopped.
+
+    Parameters
+    ----------
+    strategy : fit strategy, optional
+        Strategy used for each local fit. It must have an initial_guess
+        attribute and a maxiter or max_nfev attribute, like
+        :class:`.NmpfitStrategy` (the default) and
+        :class:`.LeastSquaresScipyStrategy`. It should not use a pool of its
+        own.
+    nstarts : int, optional
+        number of starting points, drawn with model.generate_guess
+    round_iterations : int, optional
+        iterations each local fit runs between checks of its progress. For
+        strategies limited by max_nfev, (nparameters + 1) times as many
+        function evaluations.
+    max_rounds : int, optional
+        rounds after which all local fits stop
+    parallel : optional
+        number of threads to use or pool object or one of {None, 'all', 'mpi'}.
+        Default tries 'mpi' then 'all'.
+    seed : int, optional
+        random seed used to draw the starting points
+    """
+    def __init__(self, strategy=None, nstarts=8, round_iterations=10,
+                 max_rounds=10, parallel='auto', seed=None):
+        if strategy is None:
+            strategy = NmpfitStrategy()
+        self.strategy = strategy
+        self.nstarts = nstarts
+        self.round_iterations = round_iterations
+        self.max_rounds = max_rounds
+        self.parallel = parallel
+        self.seed = seed
+
+    def fit(self, model, data):
+        """
+        fit a model to some data
+
+        Parameters
+        ----------
+        model : :class:`~holopy.fitting.model.Model` object
+            A model describing the scattering system which leads to your
+            data and the parameters to vary to fit it to the data
+        data : xarray.DataArray
+            The data to fit
+
+        Returns
+        -------
+        result : :class:`FitResult`
+            Result of the best local fit. Its local_optima attribute lists
+            every start, best first, with the parameters and log-posterior
+            it reached and whether it converged, was stopped early, ran out
+            of rounds or failed because its scatterer could not be
+            calculated.
+        """
+        time_start = time.time()
+        guesses = model.generate_guess(self.nstarts, seed=self.seed)
+        starts = [{'start': list(guess), 'parameters': list(guess),
+                   'lnprobs': [], 'result': None, 'status': 'running'}
+                  for guess in guesses]
+        local_fit = _LocalFit(model, data, self.strategy,
+                              self.round_iterations)
+        with shared_pool(self.parallel, local_fit.run) as (pool, run):
+            for rounds_left in range(self.max_rounds - 1, -1, -1):
+                running = [start for start in starts
+                           if start['status'] == 'running']
+                if len(running) == 0:
+                    break
+                outcomes = pool.map(run, [start['parameters']
+                                          for start in running])
+                for start, (result, lnprob, converged) in zip(running,
+                                                              outcomes):
+                    if isinstance(result, LOCAL_FIT_FAILURES):
+                        start['status'] = 'failed'
+                        start['error'] = result
+                        start['lnprobs'].append(-np.inf)
+                        continue
+                    start['result'] = result
+                    start['parameters'] = result._parameters
+                    start['lnprobs'].append(lnprob)
+                    if converged:
+                        start['status'] = 'converged'
+                best_lnprob = max(start['lnprobs'][-1] for start in starts
+                                  if start['lnprobs'])
+                for start in running:
+                    if (start['status'] == 'running' and
+                            _cannot_catch_up(start['lnprobs'], best_lnprob,
+                                             rounds_left)):
+                        start['status'] = 'stopped early'
+        for start in starts:
+            if start['status'] == 'running':
+                start['status'] = 'out of rounds'
+        starts.sort(key=lambda start: start['lnprobs'][-1], reverse=True)
+        best = starts[0]['result']
+        if best is None:
+            raise starts[0]['error']
+        names = model._parameter_names
+        local_optima = [
+            {'parameters': {name: float(value) for name, value in
+                            zip(names, start['parameters'])},
+             'start': {name: float(value) for name, value in
+                       zip(names, start['start'])},
+             'lnprob': float(start['lnprobs'][-1]),
+             'rounds': len(start['lnprobs']),
+             'status': start['status']}
+            for start in starts]
+        d_time = time.time() - time_start
+        kwargs = {key: getattr(best, key) for key in best._kwargs_keys}
+        kwargs['local_optima'] = local_optima
+        return FitResult(best.data, model, self, d_time, kwargs)
+
+
+def _cannot_catch_up(lnprobs, best_lnprob, rounds_left):
+    if len(lnprobs) < 2:
+        return False
+    gain = max(lnprobs[-1] - lnprobs[-2], 0)
+    return lnprobs[-1] + gain * rounds_left < best_lnprob
+
+
+class _LocalFit:
+    # Runs one round of a local fit, in a form that can be published to the
+    # workers of a pool
+    def __init__(self, model, data, strategy, iterations):
+        self.model = model
+        self.data = data
+        self.strategy = strategy
+        self.iterations = iterations
+
+    def run(self, initial_guess):
+        strategy = copy(self.strategy)
+        strategy.initial_guess = list(initial_guess)
+        if hasattr(strategy, 'maxiter'):
+            strategy.maxiter = self.iterations
+        else:
+            nparameters = len(self.model._parameters)
+            strategy.max_nfev = self.iterations * (nparameters + 1)
+        with warnings.catch_warnings():
+            # most rounds stop at the iteration limit on purpose
+            warnings.simplefilter('ignore')
+            try:
+                result = strategy.fit(self.model, self.data)
+            except LOCAL_FIT_FAILURES as error:
+                return error, -np.inf, True
+        # compare starts on all of the data, even if the fits use subsets
+        lnprob = self.model.lnposterior(result._parameters, self.data)
+        return result, lnprob, _converged(result)
+
+
+def _converged(result):
+    details = getattr(result, 'mpfit_details', None)
+    if details is not None:
+        return details.status != 5
+    # least_squares status 0 means max_nfev was reached
+    return result.minimizer_info.status != 0
@@ -24,12 +24,15 @@ of third party minimizers.
 
 import time
 import warnings
+from functools import partial
 
 import numpy as np
 
 from holopy.core.holopy_object import HoloPyObject
 from holopy.core.metadata import flat, make_subset_data
 from holopy.core.math import chisq, rsq
+from holopy.core.utils import ResidualsWrapper, finite_difference_jacobian
+from holopy.core.parallel import shared_pool
 from holopy.inference.third_party import nmpfit
 from holopy.inference.prior import Uniform
 from holopy.scattering.errors import (
@@ -68,6 +71,16 @@ class NmpfitStrategy(HoloPyObject):
         nmpfit documentation.
     maxiter: int
         Maximum number of Levenberg-Marquardt iterations to be performed.
+    initial_guess: list or dict, optional
+        Values of the model parameters to start from. Defaults to the guesses
+        of the model's priors.
+    parallel: optional
+        number of processes or pool object or one of {'all', 'mpi', 'auto'}
+        to compute the columns of the Jacobian on concurrently, one forward
+        model per parameter. A thread pool such as
+        multiprocessing.pool.ThreadPool works well for theories that release
+        the GIL. Default None lets nmpfit take finite differences one
+        parameter at a time. Cannot be combined with damp.
 
     Notes
     -----
@@ -80,7 +93,12 @@ class NmpfitStrategy(HoloPyObject):
 
     """
     def __init__(self, npixels=None, quiet=True, ftol=1e-10, xtol=1e-10,
-                 gtol=1e-10, damp=0, maxiter=100, seed=None):
+                 gtol=1e-10, damp=0, maxiter=100, seed=None,
+                 initial_guess=None, parallel=None):
+        if damp and parallel is not None:
+            raise ValueError("nmpfit cannot damp residuals when the Jacobian "
+                             "is computed in parallel. Use parallel=None "
+                             "with damp.")
         self.ftol = ftol
         self.xtol = xtol
         self.gtol = gtol
@@ -89,6 +107,8 @@ class NmpfitStrategy(HoloPyObject):
         self.quiet = quiet
         self.npixels = npixels
         self.seed = seed
+        self.initial_guess = initial_guess
+        self.parallel = parallel
 
     def unscale_pars_from_minimizer(self, values):
         assert len(values) == len(self._parameters)
@@ -121,15 +141,22 @@ class NmpfitStrategy(HoloPyObject):
         if self.npixels is not None:
             data = make_subset_data(data, pixels=self.npixels, seed=self.seed)
         guess_prior = model.lnprior(model.initial_guess)
-        def residual(par_vals):
-            noise = model._find_noise(par_vals, data)
-            residuals = model._residuals(par_vals, data, noise).flatten()
-            prior = np.sqrt(guess_prior - model._lnprior(par_vals))
-            residuals = np.append(residuals, prior)
-            return residuals
-
-        fitted_pars, minimizer_info = self.minimize(model._parameters,
-                                                    residual)
+        residuals = ResidualsWrapper(model, data, guess_prior)
+
+        initial_guess = self.initial_guess
+        if initial_guess is not None:
+            initial_guess = model.ensure_parameters_are_listlike(initial_guess)
+        if self.parallel is None:
+            fitted_pars, minimizer_info = self.minimize(
+                model._parameters, residuals.evaluate, initial_guess)
+        else:
+            with shared_pool(self.parallel, residuals.evaluate_scaled) as (
+                    pool, shared_residuals):
+                jacobian = partial(finite_difference_jacobian,
+                                   shared_residuals, pool=pool)
+                fitted_pars, minimizer_info = self.minimize(
+                    model._parameters, residuals.evaluate, initial_guess,
+                    jacobian)
 
         if minimizer_info.status == 5:
             setattr(minimizer_info, 'converged', False)
@@ -150,12 +177,24 @@ class NmpfitStrategy(HoloPyObject):
         return FitResult(data, model, self, d_time,
                      {'intervals': intervals, 'mpfit_details':minimizer_info})
 
-    def minimize(self, parameters, obj_func):
+    def minimize(self, parameters, obj_func, initial_guess=None,
+                 jacobian=None):
+        """
+        jacobian, if given, is called as jacobian(values, residuals=...) with
+        the scaled parameter values and the residuals there, if known, and
+        returns the residuals and their Jacobian with respect to the scaled
+        values, as finite_difference_jacobian does.
+        """
+        if self.damp and jacobian is not None:
+            raise ValueError("nmpfit cannot damp residuals with a "
+                             "user-supplied Jacobian.")
         if not hasattr(self, "_parameters"):
             self._parameters = parameters
+        if initial_guess is None:
+            initial_guess = [par.guess for par in parameters]
         nmp_pars = []
-        for par in parameters:
-            d = {'parname': par.name, 'value': par.scale(par.guess),
+        for par, guess in zip(parameters, initial_guess):
+            d = {'parname': par.name, 'value': par.scale(guess),
                  'limited': [False, False], 'limits': [np.NaN, np.NaN]}
             if hasattr(par, "lower_bound") and par.lower_bound > -np.inf:
                 d['limited'][0] = True
@@ -165,10 +204,27 @@ class NmpfitStrategy(HoloPyObject):
                 d['limits'][1] = par.scale(par.upper_bound)
             nmp_pars.append(d)
 
+        last = {}
+
         def resid_wrapper(parameters, fjac=None):
             status = 0
-            out = obj_func(self.unscale_pars_from_minimizer(parameters))
-            return [status, out]
+            if fjac is None:
+                out = obj_func(self.unscale_pars_from_minimizer(parameters))
+                last['parameters'] = np.array(parameters)
+                last['residuals'] = out
+                return [status, out]
+            known = None
+            if np.array_equal(parameters, last.get('parameters')):
+                known = last['residuals']
+            upper_bounds = [d['limits'][1] if d['limited'][1] else np.inf
+                            for d in nmp_pars]
+            lower_bounds = [d['limits'][0] if d['limited'][0] else -np.inf
+                            for d in nmp_pars]
+            out, derivatives = jacobian(parameters, residuals=known,
+                                        upper_bounds=upper_bounds,
+                                        lower_bounds=lower_bounds)
+            # nmpfit expects derivatives of the model, not the residuals
+            return [status, out, -derivatives]
 
         # now fit it
         with warnings.catch_warnings():
@@ -176,7 +232,8 @@ class NmpfitStrategy(HoloPyObject):
             fitresult = nmpfit.mpfit(
                 resid_wrapper, parinfo=nmp_pars, ftol = self.ftol,
                 xtol = self.xtol, gtol = self.gtol, damp = self.damp,
-                maxiter = self.maxiter, quiet = self.quiet)
+                maxiter = self.maxiter, quiet = self.quiet,
+                autoderivative = int(jacobian is None))
 
         result_pars = self.unscale_pars_from_minimizer(fitresult.params)
 
@@ -0,0 +1,242 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Sampling of multimodal posteriors with replica exchange between ensembles of
+walkers at a ladder of temperatures.
+"""
+import time
+from functools import partial
+
+import numpy as np
+import xarray as xr
+
+from holopy.core.holopy_object import HoloPyObject
+from holopy.core.metadata import make_subset_data
+from holopy.core.utils import LnpostWrapper, evaluate_in_batches
+from holopy.core.parallel import shared_pool
+from holopy.inference.result import SamplingResult
+
+
+class ParallelTemperingStrategy(HoloPyObject):
+    """
+    Inference strategy sampling the posterior with an ensemble of walkers at
+    each of a ladder of temperatures.
+
+    Walkers at temperature T sample prior * likelihood**(1/T), so hot walkers
+    cross between the modes of a multimodal posterior, such as the mirror
+    images of a particle in z, and pass them down the ladder by exchanging
+    places with colder walkers. Only the walkers at T = 1 sample the
+    posterior, and only they are kept in the result. Each ensemble moves
+    with the affine invariant stretch move of emcee, and the likelihoods of
+    all temperatures are computed together on the pool.
+
+    Parameters
+    ----------
+    nwalkers : int, optional
+        number of walkers at each temperature
+    nsamples : int, optional
+        number of steps each walker takes
+    ntemps : int, optional
+        number of temperatures
+    max_temp : float, optional
+        hottest temperature. The temperatures are evenly spaced in log
+        between 1 and max_temp. The likelihood at max_temp should be flat
+        enough for walkers to move between modes.
+    npixels : int, optional
+        Number of pixels in the image to sample against. default uses all.
+    walker_initial_pos : array, optional
+        starting positions of the walkers, shape (nwalkers, nparameters) to
+        start every temperature from the same positions or (ntemps,
+        nwalkers, nparameters). Default draws them from the priors.
+    parallel : optional
+        number of threads to use or pool object or one of {None, 'all', 'mpi'}.
+        Default tries 'mpi' then 'all'.
+    seed : int, optional
+        random seed to use
+    """
+    def __init__(self, nwalkers=100, nsamples=1000, ntemps=8, max_temp=1000,
+                 npixels=None, walker_initial_pos=None, parallel='auto',
+                 seed=None):
+        self.nwalkers = nwalkers
+        self.nsamples = nsamples
+        self.ntemps = ntemps
+        self.max_temp = max_temp
+        self.npixels = npixels
+        self.walker_initial_pos = walker_initial_pos
+        self.parallel = parallel
+        self.seed = seed
+
+    @property
+    def betas(self):
+        """Inverse temperatures of the ladder, coldest first"""
+        return np.geomspace(1, 1 / self.max_temp, self.ntemps)
+
+    def sample(self, model, data):
+        time_start = time.time()
+        if self.npixels is not None:
+            data = make_subset_data(data, pixels=self.npixels, seed=self.seed)
+        if self.walker_initial_pos is None:
+            guess = model.generate_guess(self.ntemps * self.nwalkers,
+                                         seed=self.seed)
+            self.walker_initial_pos = guess.reshape(self.ntemps,
+                                                    self.nwalkers, -1)
+        positions = np.array(self.walker_initial_pos, dtype=float)
+        if positions.ndim == 2:
+            positions = np.repeat(positions[np.newaxis], self.ntemps, axis=0)
+
+        obj_func = LnpostWrapper(model, data)
+        with shared_pool(self.parallel, obj_func.evaluate_lnlike_batch) as (
+                pool, lnlike):
+            evaluate = partial(evaluate_in_batches, lnlike, pool=pool)
+            run = sample_parallel_tempering(
+                model._lnprior_batch, evaluate, positions, self.betas,
+                self.nsamples, np.random.RandomState(self.seed))
+
+        samples = xr.DataArray(
+            run['chain'].transpose(1, 0, 2),
+            dims=['walker', 'chain', 'parameter'],
+            coords={'parameter': list(model._parameter_names)},
+            attrs={'acceptance_fraction': run['acceptance'][0]})
+        lnprobs = xr.DataArray(
+            run['lnprob'].T, dims=['walker', 'chain'],
+            attrs={'acceptance_fraction': run['acceptance'][0]})
+        tempering = {'temperatures': [float(1 / b) for b in self.betas],
+                     'acceptance_fraction': list(run['acceptance']),
+                     'swap_acceptance_fraction': list(run['swap_acceptance'])}
+        d_time = time.time() - time_start
+        kwargs = {'lnprobs': lnprobs, 'samples': samples,
+                  'tempering': tempering}
+        return SamplingResult(data, model, self, d_time, kwargs)
+
+
+def sample_parallel_tempering(lnprior, lnlike, positions, betas, nsamples,
+                              random=np.random):
+    """
+    Run parallel tempered ensembles of walkers
+
+    Parameters
+    ----------
+    lnprior : function
+        log-prior of a 2D array of parameter values, one set per row
+    lnlike : function
+        log-likelihood of a 2D array of parameter values, one set per row
+    positions : array
+        starting positions, shape (ntemps, nwalkers, nparameters)
+    betas : array
+        inverse temperature of each ensemble, starting with 1
+    nsamples : int
+        number of steps
+    random : RandomState, optional
+        source of random numbers
+
+    Returns
+    -------
+    run : dict
+        'chain' and 'lnprob' of the walkers at the first temperature, of
+        shapes (nsamples, nwalkers, nparameters) and (nsamples, nwalkers),
+        the 'acceptance' fraction of moves at each temperature and the
+        'swap_acceptance' fraction of exchanges between each temperature
+        and the next hotter one.
+    """
+    positions = np.array(positions, dtype=float)
+    betas = np.asarray(betas, dtype=float)
+    ntemps, nwalkers, ndim = positions.shape
+    prior_values, like_values = _evaluate(
+        lnprior, lnlike, positions.reshape(-1, ndim))
+    prior_values = prior_values.reshape(ntemps, nwalkers)
+    like_values = like_values.reshape(ntemps, nwalkers)
+
+    chain = np.empty((nsamples, nwalkers, ndim))
+    lnprob = np.empty((nsamples, nwalkers))
+    accepted = np.zeros(ntemps)
+    swapped = np.zeros(max(ntemps - 1, 0))
+    halves = np.arange(nwalkers) < nwalkers // 2
+    for step in range(nsamples):
+        for active in [halves, ~halves]:
+            accepted += _stretch_move(
+                lnprior, lnlike, positions, prior_values, like_values,
+                betas, active, random)
+        swapped += _exchange(positions, prior_values, like_values, betas,
+                             random)
+        chain[step] = positions[0]
+        lnprob[step] = prior_values[0] + like_values[0]
+    return {'chain': chain, 'lnprob': lnprob,
+            'acceptance': accepted / (nsamples * nwalkers),
+            'swap_acceptance': swapped / (nsamples * nwalkers)}
+
+
+def _evaluate(lnprior, lnlike, points):
+    prior_values = np.asarray(lnprior(points), dtype=float)
+    like_values = np.full(len(points), -np.inf)
+    # as in Model._lnposterior, skip the likelihood where the prior forbids it
+    allowed = prior_values > -np.inf
+    if allowed.any():
+        like_values[allowed] = lnlike(points[allowed])
+    return prior_values, like_values
+
+
+def _stretch_move(lnprior, lnlike, positions, prior_values, like_values,
+                  betas, active, random, a=2.0):
+    # moves the active walkers of every temperature in place, by stretching
+    # towards a random inactive walker of the same temperature
+    ntemps, nwalkers, ndim = positions.shape
+    moving = positions[:, active]
+    others = positions[:, ~active]
+    nmoving = moving.shape[1]
+    z = ((a - 1) * random.rand(ntemps, nmoving) + 1)**2 / a
+    partners = others[np.arange(ntemps)[:, np.newaxis],
+                      random.randint(others.shape[1], size=(ntemps, nmoving))]
+    proposal = partners + z[..., np.newaxis] * (moving - partners)
+    new_prior, new_like = _evaluate(lnprior, lnlike,
+                                    proposal.reshape(-1, ndim))
+    new_prior = new_prior.reshape(ntemps, nmoving)
+    new_like = new_like.reshape(ntemps, nmoving)
+    with np.errstate(invalid='ignore'):
+        lnratio = ((ndim - 1) * np.log(z) + new_prior - prior_values[:, active]
+                   + betas[:, np.newaxis] * (new_like - like_values[:, active]))
+    accept = np.log(random.rand(ntemps, nmoving)) < lnratio
+    index = np.flatnonzero(active)
+    positions[:, index] = np.where(accept[..., np.newaxis], proposal, moving)
+    prior_values[:, index] = np.where(accept, new_prior,
+                                      prior_values[:, active])
+    like_values[:, index] = np.where(accept, new_like, like_values[:, active])
+    return accept.sum(axis=1)
+
+
+def _exchange(positions, prior_values, like_values, betas, random):
+    # proposes swapping each walker with one at the next colder temperature,
+    # from the hottest pair down, and swaps them in place
+    ntemps, nwalkers, ndim = positions.shape
+    swapped = np.zeros(max(ntemps - 1, 0))
+    for hot in range(ntemps - 1, 0, -1):
+        cold = hot - 1
+        hot_walkers = random.permutation(nwalkers)
+        cold_walkers = random.permutation(nwalkers)
+        with np.errstate(invalid='ignore'):
+            lnratio = (betas[cold] - betas[hot]) * (
+                like_values[hot, hot_walkers] -
+                like_values[cold, cold_walkers])
+        accept = np.log(random.rand(nwalkers)) < lnratio
+        hot_walkers = hot_walkers[accept]
+        cold_walkers = cold_walkers[accept]
+        for values in [positions, prior_values, like_values]:
+            hot_values = values[hot, hot_walkers].copy()
+            values[hot, hot_walkers] = values[cold, cold_walkers]
+            values[cold, cold_walkers] = hot_values
+        swapped[cold] = accept.sum()
+    return swapped
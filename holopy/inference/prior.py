@@ -177,6 +177,10 @@ class Uniform(Prior):
             self.scale_factor = 1.
 
     def lnprob(self, p):
+        if np.ndim(p) > 0:
+            p = np.asarray(p)
+            outside = (p < self.lower_bound) | (p > self.upper_bound)
+            return np.where(outside, -np.inf, self._lnprob)
         if p < self.lower_bound or p > self.upper_bound:
             return -np.inf
         # For a uniform prior, the value is always the same, so precompute it
@@ -274,6 +278,10 @@ class BoundedGaussian(Gaussian):
         """Note that this does not return the actual log-probability, but
         a value proportional to it.
         """
+        if np.ndim(p) > 0:
+            p = np.asarray(p)
+            outside = (p < self.lower_bound) | (p > self.upper_bound)
+            return np.where(outside, -np.inf, super().lnprob(p))
         if p < self.lower_bound or p > self.upper_bound:
             return -np.inf
         else:
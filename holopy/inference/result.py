@@ -35,6 +35,7 @@ from holopy.core.metadata import detector_grid, copy_metadata
 from holopy.core.holopy_object import HoloPyObject, FullLoader
 from holopy.core.io.io import pack_attrs, unpack_attrs
 from holopy.core.utils import dict_without, ensure_scalar
+from holopy.core.parallel import WorkerPool
 from holopy.scattering.errors import MissingParameter
 
 
@@ -67,7 +68,8 @@ class FitResult(HoloPyObject):
         self.data = data
         self.model = model
         self.strategy = strategy
-        if hasattr(strategy, 'parallel') and hasattr(strategy.parallel, 'map'):
+        parallel = getattr(strategy, 'parallel', None)
+        if hasattr(parallel, 'map') and not isinstance(parallel, WorkerPool):
             self.strategy.parallel = 'external_pool'
         self.time = time
         self._kwargs_keys = []
@@ -86,7 +88,25 @@ class FitResult(HoloPyObject):
 
     @property
     def parameters(self):
-        return {name: val for name, val in zip(self._names, self._parameters)}
+        parameters = {name: val for name, val in
+                      zip(self._names, self._parameters)}
+        parameters.update(self.analytic_parameters)
+        return parameters
+
+    @property
+    def analytic_parameters(self):
+        """
+        values the model fits to the data analytically instead of treating
+        them as parameters, such as alpha of an AlphaModel with
+        analytic_alpha, at the best fit parameters
+        """
+        pars = list(self._parameters)
+        if getattr(self, '_analytic_key', None) != pars:
+            # recalculated if the best fit changes, as after burn_in
+            self._analytic_values = self.model._analytic_parameters(
+                pars, self.data)
+            self._analytic_key = pars
+        return self._analytic_values
 
     @property
     def guess_parameters(self):
@@ -118,6 +138,14 @@ class FitResult(HoloPyObject):
             return self.model.lnposterior(self._parameters, self.data)
         return self._calculate_first_time("_max_lnprob", calculation)
 
+    @property
+    def cache_info(self):
+        """
+        hits and misses of the model's caches of evaluations, see
+        :attr:`.Model.cache_info`
+        """
+        return self.model.cache_info
+
     def _calculate_first_time(self, attr_name, long_calculation):
         if not hasattr(self, attr_name):
             setattr(self, attr_name, long_calculation())
@@ -145,7 +173,7 @@ class FitResult(HoloPyObject):
             schema['y'] = y
         else:
             schema = self.data
-        return self.model.forward(pars, schema)
+        return self.model.forward(pars, schema, data=self.data)
 
     @property
     def _source_class(self):
@@ -253,10 +281,46 @@ class FitResult(HoloPyObject):
 
 
 class SamplingResult(FitResult):
-    def __init__(self, data, model, strategy, time, kwargs={}):
-        super().__init__(data, model, strategy, time, kwargs)
-        if not hasattr(self, 'intervals'):
-            self.intervals = self._calc_intervals()
+    """
+    Samples of the posterior and the intervals they give for each parameter.
+
+    The samples and lnprobs in kwargs can be functions that return them, to
+    be called only when they are first used, such as when the chain is
+    stored on disk. The intervals are calculated when first used.
+    """
+    _samples = None
+    _lnprobs = None
+    _intervals = None
+
+    @property
+    def samples(self):
+        if callable(self._samples):
+            self._samples = self._samples()
+        return self._samples
+
+    @samples.setter
+    def samples(self, samples):
+        self._samples = samples
+
+    @property
+    def lnprobs(self):
+        if callable(self._lnprobs):
+            self._lnprobs = self._lnprobs()
+        return self._lnprobs
+
+    @lnprobs.setter
+    def lnprobs(self, lnprobs):
+        self._lnprobs = lnprobs
+
+    @property
+    def intervals(self):
+        if self._intervals is None:
+            self._intervals = self._calc_intervals()
+        return self._intervals
+
+    @intervals.setter
+    def intervals(self, intervals):
+        self._intervals = intervals
 
     def _calc_intervals(self):
         P_LOW = 15.865525393145708  # 100*(1-scipy.special.erf(1/np.sqrt(2)))/2
@@ -304,6 +368,8 @@ GROUPNAME = 'stage_results[{}]'
 class TemperedSamplingResult(SamplingResult):
     def __init__(self, end_result, stage_results, strategy, time):
         kwargs = {'lnprobs': end_result.lnprobs, 'samples': end_result.samples}
+        if hasattr(end_result, 'convergence'):
+            kwargs['convergence'] = end_result.convergence
         super().__init__(end_result.data, end_result.model, strategy, time,
                          kwargs)
         self.stage_results = stage_results
@@ -4,25 +4,55 @@
 
 import time
 import warnings
+from functools import partial
 
 import numpy as np
 from scipy.optimize import least_squares
 
 from holopy.core.holopy_object import HoloPyObject
 from holopy.core.metadata import flat, make_subset_data
+from holopy.core.utils import ResidualsWrapper, finite_difference_jacobian
+from holopy.core.parallel import shared_pool
 from holopy.scattering.errors import  MissingParameter
 from holopy.inference.result import FitResult, UncertainValue
 
 
 class LeastSquaresScipyStrategy(HoloPyObject):
+    """
+    Levenberg-Marquardt minimizer from scipy.optimize.least_squares
+
+    Parameters
+    ----------
+    ftol, xtol, gtol: float
+        Convergence criteria passed on to least_squares
+    max_nfev: int, optional
+        Maximum number of residual evaluations
+    npixels: int, optional
+        Fit only a randomly selected subset of this many pixels
+    initial_guess: list or dict, optional
+        Values of the model parameters to start from. Defaults to the guesses
+        of the model's priors.
+    parallel: optional
+        number of processes or pool object or one of {'all', 'mpi', 'auto'}
+        to compute the columns of the Jacobian on concurrently, one forward
+        model per parameter. A thread pool such as
+        multiprocessing.pool.ThreadPool works well for theories that release
+        the GIL. Default None lets least_squares take finite differences one
+        parameter at a time.
+    """
     def __init__(self, ftol=1e-10, xtol=1e-10, gtol=1e-10, max_nfev=None,
-                 npixels=None):
+                 npixels=None, initial_guess=None, parallel=None):
         self.ftol = ftol
         self.xtol = xtol
         self.gtol = gtol
         self.max_nfev = max_nfev
         self.npixels = npixels
-        self._optimizer_kwargs = {
+        self.initial_guess = initial_guess
+        self.parallel = parallel
+
+    @property
+    def _optimizer_kwargs(self):
+        return {
             'ftol': self.ftol,
             'xtol': self.xtol,
             'gtol': self.gtol,
@@ -65,20 +95,23 @@ class LeastSquaresScipyStrategy(HoloPyObject):
             data = flat(data)
         else:
             data = make_subset_data(data, pixels=self.npixels)
-        guess_lnprior = model.lnprior(model.initial_guess)
-
-        def residual(rescaled_values):
-            unscaled_values = self.unscale_pars_from_minimizer(
-                parameters, rescaled_values)
-            noise = model._find_noise(unscaled_values, data)
-            residuals = model._residuals(unscaled_values, data, noise)
-            ln_prior = model._lnprior(unscaled_values) - guess_lnprior
-            zscore_prior = np.sqrt(2 * -ln_prior)
-            np.append(residuals, zscore_prior)
-            return residuals
+        residuals = ResidualsWrapper(model, data)
 
         # The only work here
-        fitted_pars, minimizer_info = self.minimize(parameters, residual)
+        initial_guess = self.initial_guess
+        if initial_guess is not None:
+            initial_guess = model.ensure_parameters_are_listlike(initial_guess)
+        if self.parallel is None:
+            fitted_pars, minimizer_info = self.minimize(
+                parameters, residuals.evaluate_scaled, initial_guess)
+        else:
+            with shared_pool(self.parallel, residuals.evaluate_scaled) as (
+                    pool, shared_residuals):
+                jacobian = partial(finite_difference_jacobian,
+                                   shared_residuals, pool=pool)
+                fitted_pars, minimizer_info = self.minimize(
+                    parameters, residuals.evaluate_scaled, initial_guess,
+                    jacobian)
 
         if not minimizer_info.success:
             warnings.warn("Minimizer Convergence Failed, your results \
@@ -97,10 +130,34 @@ class LeastSquaresScipyStrategy(HoloPyObject):
         kwargs = {'intervals': intervals, 'minimizer_info': minimizer_info}
         return FitResult(data, model, self, d_time, kwargs)
 
-    def minimize(self, parameters, residuals_function):
-        initial_parameter_guess = [par.scale(par.guess) for par in parameters]
+    def minimize(self, parameters, residuals_function, initial_guess=None,
+                 jacobian=None):
+        """
+        jacobian, if given, is called as jacobian(values, residuals=...) with
+        the residuals at values, if known, and returns the residuals and their
+        Jacobian, as finite_difference_jacobian does.
+        """
+        if initial_guess is None:
+            initial_guess = [par.guess for par in parameters]
+        initial_parameter_guess = [par.scale(guess) for par, guess in
+                                   zip(parameters, initial_guess)]
+        optimizer_kwargs = self._optimizer_kwargs
+        if jacobian is not None:
+            last = {}
+
+            def residuals_function(values, function=residuals_function):
+                last['values'] = np.array(values)
+                last['residuals'] = function(values)
+                return last['residuals']
+
+            def jac(values):
+                known = None
+                if np.array_equal(values, last.get('values')):
+                    known = last['residuals']
+                return jacobian(values, residuals=known)[1]
+            optimizer_kwargs['jac'] = jac
         fitresult = least_squares(residuals_function, initial_parameter_guess,
-                                  **self._optimizer_kwargs)
+                                  **optimizer_kwargs)
         result_pars = self.unscale_pars_from_minimizer(parameters, fitresult.x)
         return result_pars, fitresult
 
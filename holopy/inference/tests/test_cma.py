@@ -16,11 +16,17 @@
 # You should have received a copy of the GNU General Public License
 # along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
+import tempfile
+
 import numpy as np
 from numpy.testing import assert_allclose, assert_equal
 
-from holopy.inference.cmaes import run_cma, CmaStrategy
-from holopy.inference.model import Model
+from holopy.core.process import normalize
+from holopy.core.tests.common import get_example_data
+from holopy.scattering import Sphere
+from holopy.inference.cmaes import run_cma, CmaStrategy, PopulationRecorder
+from holopy.inference.model import Model, AlphaModel
 from holopy.inference import prior
 from holopy.inference.tests.common import SimpleModel
 
@@ -48,16 +54,59 @@ def test_run_cma_returns_reproducible_answer():
     p0 = np.linspace(0, 1, popsize*ndim).reshape((popsize, ndim))
 
     r = run_cma(simplefunc, pars, p0, weightfunc, tols, seed=1)
-    found = r.logger.xrecent.mean()
-    correct = 2.876866703907526
+    found, _ = r.recorder.best()
+    correct = [[0.52631579, 0.57894737], [0.49032591, 0.4652154]]
     assert_allclose(found, correct, rtol=1e-3)
 
 
+def test_run_cma_records_every_generation_without_files():
+    popsize = 6
+    pars = [prior.Uniform(0, 1), prior.Uniform(0, 1)]
+    p0 = np.linspace(0, 1, popsize*2).reshape((popsize, 2))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tempdir:
+        os.chdir(tempdir)
+        try:
+            r = run_cma(simplefunc, pars, p0, weightfunc, {'maxiter': 3},
+                        seed=1, parallel=None)
+            assert_equal(os.listdir(tempdir), [])
+        finally:
+            os.chdir(cwd)
+    recorder = r.recorder
+    assert_equal(recorder.solutions.shape, (3, popsize, 2))
+    assert_equal(recorder.func_vals,
+                 [[simplefunc(x) for x in generation]
+                  for generation in recorder.solutions])
+    assert_allclose(recorder.solutions[0], p0)
+    assert_allclose(recorder.best()[1].min(), r.best.f)
+
+
+def test_population_recorder_grows():
+    recorder = PopulationRecorder(2, 1, maxiter=1)
+    for i in range(3):
+        recorder.add([[i], [-i]], [i, -i])
+    assert_equal(recorder.solutions[:, :, 0], [[0, 0], [1, -1], [2, -2]])
+    best_solutions, best_func_vals = recorder.best()
+    assert_equal(best_solutions[:, 0], [0, -1, -2])
+    assert_equal(best_func_vals, [0, -1, -2])
+
+
 def test_CmaStrategy():
     mod = SimpleModel()
     strat = CmaStrategy(seed=18, tols=tols, popsize=5)
     r = strat.fit(mod, data)
     assert_allclose(np.mean(r._parameters), .55, atol=.001)
+    assert_equal(r.samples.shape, (1, 2, 2))
+    assert_equal(r.lnprobs.shape, (1, 2))
+
+
+def test_vectorized_CmaStrategy_matches_serial():
+    mod = SimpleModel()
+    serial = CmaStrategy(seed=18, tols=tols, popsize=5, parallel=None)
+    vectorized = CmaStrategy(seed=18, tols=tols, popsize=5, parallel=None,
+                             vectorize=True)
+    assert_equal(serial.fit(mod, data)._parameters,
+                 vectorized.fit(mod, data)._parameters)
 
 
 def test_default_popsize():
@@ -67,3 +116,25 @@ def test_default_popsize():
     strat.fit(mod, data)
     assert_equal(strat.popsize, int(2 + npars + np.sqrt(npars)))
 
+
+
+def test_CmaStrategy_with_pixel_weights():
+    holo = normalize(get_example_data('image0001'))
+    scatterer = Sphere(r=0.65e-6, n=1.58, center=[5.5e-6, 5.8e-6, 14e-6])
+    mod = AlphaModel(scatterer, noise_sd=.1, alpha=prior.Uniform(0.5, 1))
+    strat = CmaStrategy(npixels=50, popsize=5, tols=tols, seed=18,
+                        parallel=None, pixel_weights='gradient')
+    result = strat.fit(mod, holo)
+    assert 0.5 < result.parameters['alpha'] < 1
+
+
+def test_resampling_CmaStrategy_is_reproducible():
+    holo = normalize(get_example_data('image0001'))
+    scatterer = Sphere(r=prior.Uniform(0.5e-6, 0.8e-6), n=1.58,
+                       center=[5.5e-6, 5.8e-6, prior.Uniform(10e-6, 20e-6)])
+    mod = AlphaModel(scatterer, noise_sd=.1, alpha=0.7)
+    results = [CmaStrategy(npixels=50, popsize=6, tols={'maxiter': 5},
+                           seed=3, parallel=None).fit(mod, holo)
+               for i in range(2)]
+    assert_equal(results[0]._parameters, results[1]._parameters)
+    assert_equal(results[0].lnprobs.values, results[1].lnprobs.values)
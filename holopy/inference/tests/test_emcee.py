@@ -17,6 +17,9 @@
 # along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import os
+import shutil
+import tempfile
 import warnings
 import unittest
 
@@ -30,8 +33,11 @@ from holopy.core.tests.common import assert_obj_close, get_example_data
 from holopy.scattering import Sphere, Mie
 from holopy.inference import prior
 from holopy.inference.model import AlphaModel, Model, PerfectLensModel
-from holopy.inference.emcee import sample_emcee, EmceeStrategy
+from holopy.inference.emcee import (sample_emcee, EmceeStrategy,
+                                    BufferedBackend, ConvergenceMonitor)
+from holopy.core.io import save, load
 from holopy.inference.tests.common import SimpleModel
+from holopy.core.parallel import WorkerPool
 
 
 class testEmcee(unittest.TestCase):
@@ -71,6 +77,232 @@ class testEmcee(unittest.TestCase):
         r = strat.sample(mod, data)
         assert_allclose(r._parameters, .5, rtol=.001)
 
+    @attr("fast")
+    def test_vectorized_EmceeStrategy_matches_serial(self):
+        data = np.array(.5)
+        mod = SimpleModel(1)
+        serial = EmceeStrategy(10, 15, None, None, parallel=None, seed=48)
+        vectorized = EmceeStrategy(10, 15, None, None, parallel=None,
+                                   seed=48, vectorize=True)
+        assert_equal(serial.sample(mod, data).samples.values,
+                     vectorized.sample(mod, data).samples.values)
+
+    @attr("medium")
+    def test_EmceeStrategy_with_pixel_weights(self):
+        holo = normalize(get_example_data('image0001'))
+        scat = Sphere(r=0.65e-6, n=1.58, center=[5.5e-6, 5.8e-6, 14e-6])
+        mod = AlphaModel(scat, noise_sd=.1, alpha=prior.Gaussian(0.7, 0.1))
+        strat = EmceeStrategy(4, 5, npixels=50, parallel=None, seed=40,
+                              pixel_weights='variance')
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            result = strat.sample(mod, holo)
+        self.assertIn('pixel_weights', result.data.attrs)
+
+
+class TestWorkerPool(unittest.TestCase):
+    @attr("medium")
+    def test_EmceeStrategy_reuses_worker_pool(self):
+        data = np.array(.5)
+        mod = SimpleModel(1)
+        with WorkerPool(2) as pool:
+            strat = EmceeStrategy(10, 15, None, None, parallel=pool, seed=48)
+            first = strat.sample(mod, data)
+            second = strat.sample(mod, data)
+            self.assertIs(strat.parallel, pool)
+            self.assertIs(first.strategy.parallel, pool)
+            self.assertTrue(pool.running)
+        assert_equal(first.samples.values, second.samples.values)
+
+    @attr("medium")
+    def test_tempering_stages_share_workers(self):
+        holo = normalize(get_example_data('image0001'))
+        scat = Sphere(r=0.65e-6, n=1.58, center=[5.5e-6, 5.8e-6, 14e-6])
+        mod = AlphaModel(scat, noise_sd=.1, alpha=prior.Gaussian(0.7, 0.1))
+        results = []
+        for parallel in [None, 2]:
+            strat = TemperedStrategy(nwalkers=4, nsamples=2, stages=1,
+                                     stage_len=2, parallel=parallel, seed=40)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                results.append(strat.sample(mod, holo))
+            for stage in strat.stage_strategies:
+                self.assertEqual(stage.parallel, parallel)
+        assert_equal(results[0].samples.values, results[1].samples.values)
+
+
+class InterruptedModel(SimpleModel):
+    def __init__(self, npars=1, evaluations=100):
+        super().__init__(npars)
+        self.evaluations = evaluations
+
+    def _lnposterior(self, par_vals, data, dummy):
+        self.evaluations -= 1
+        if self.evaluations < 0:
+            raise KeyboardInterrupt
+        return super()._lnposterior(par_vals, data, dummy)
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'chain.h5')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _strategy(self, nsamples=20):
+        return EmceeStrategy(10, nsamples, parallel=None, seed=48,
+                             checkpoint=self.filename, checkpoint_steps=4)
+
+    @attr("fast")
+    def test_matches_sampling_in_memory(self):
+        data = np.array(.5)
+        in_memory = EmceeStrategy(10, 20, parallel=None, seed=48)
+        expected = in_memory.sample(SimpleModel(1), data)
+        result = self._strategy().sample(SimpleModel(1), data)
+        assert_equal(result.samples.values, expected.samples.values)
+        assert_equal(result.lnprobs.values, expected.lnprobs.values)
+
+    @attr("fast")
+    def test_resumes_interrupted_sampling(self):
+        data = np.array(.5)
+        expected = EmceeStrategy(10, 20, parallel=None, seed=48).sample(
+            SimpleModel(1), data)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            self.assertRaises(KeyboardInterrupt, self._strategy().sample,
+                              InterruptedModel(evaluations=75), data)
+        self.assertEqual(BufferedBackend(self.filename, ['x']).iteration, 6)
+        result = self._strategy().sample(SimpleModel(1), data)
+        assert_equal(result.samples.values, expected.samples.values)
+
+    @attr("fast")
+    def test_continues_to_more_samples(self):
+        data = np.array(.5)
+        self._strategy(10).sample(SimpleModel(1), data)
+        result = self._strategy(15).sample(SimpleModel(1), data)
+        self.assertEqual(result.samples.size, 10 * 15)
+
+    @attr("fast")
+    def test_reads_samples_when_first_used(self):
+        result = self._strategy().sample(SimpleModel(1), np.array(.5))
+        self.assertTrue(callable(result._samples))
+        self.assertEqual(result.samples.size, 10 * 20)
+        self.assertAlmostEqual(result.parameters['x'], 0.5, places=2)
+
+    @attr("fast")
+    def test_rejects_chain_of_other_parameters(self):
+        self._strategy().sample(SimpleModel(1), np.array(.5))
+        self.assertRaises(ValueError, self._strategy().sample,
+                          SimpleModel(2), np.array(.5))
+
+    @attr("fast")
+    def test_writes_blocks_of_steps(self):
+        sampler = sample_emcee(SimpleModel(1), np.array(.5), 10, 3,
+                               np.random.rand(10, 1), parallel=None,
+                               backend=BufferedBackend(self.filename, ['x']))
+        backend = BufferedBackend(self.filename, ['x'], steps=4)
+        sampler = sample_emcee(SimpleModel(1), np.array(.5), 10, 6, None,
+                               parallel=None, backend=backend)
+        self.assertEqual(backend.iteration, 6)
+        self.assertEqual(sampler.get_chain().shape, (6, 10, 1))
+
+    @attr("medium")
+    def test_saved_result_holds_samples(self):
+        holo = normalize(get_example_data('image0001'))
+        scat = Sphere(r=0.65e-6, n=1.58, center=[5.5e-6, 5.8e-6, 14e-6])
+        mod = AlphaModel(scat, noise_sd=.1, alpha=prior.Gaussian(0.7, 0.1))
+        strategy = EmceeStrategy(4, 5, npixels=50, parallel=None, seed=40,
+                                 checkpoint=self.filename)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            result = strategy.sample(mod, holo)
+            saved = os.path.join(self.tempdir, 'result.h5')
+            save(saved, result)
+            loaded = load(saved)
+        assert_equal(loaded.samples.values, result.samples.values)
+
+
+class GaussianModel(SimpleModel):
+    def _lnposterior(self, par_vals, data, dummy):
+        return -0.5 * np.sum((np.asarray(par_vals) - 0.5)**2 / 0.01**2)
+
+
+class TestConvergenceMonitor(unittest.TestCase):
+    @attr("fast")
+    def test_stops_converged_chain_early(self):
+        monitor = ConvergenceMonitor(n_autocorr=20, check_steps=50)
+        strategy = EmceeStrategy(10, 5000, parallel=None, seed=1,
+                                 convergence=monitor)
+        result = strategy.sample(GaussianModel(1), np.array(.5))
+        diagnostics = result.convergence
+        self.assertTrue(diagnostics['converged'])
+        self.assertLess(diagnostics['iterations'], 5000)
+        self.assertEqual(result.samples.size, 10 * diagnostics['iterations'])
+        self.assertGreater(diagnostics['iterations'],
+                           20 * diagnostics['autocorr_time']['x'])
+        self.assertIn('autocorrelation times', diagnostics['stop_reason'])
+
+    @attr("fast")
+    def test_records_unconverged_chain(self):
+        monitor = ConvergenceMonitor(check_steps=10)
+        strategy = EmceeStrategy(10, 35, parallel=None, seed=1,
+                                 convergence=monitor)
+        diagnostics = strategy.sample(GaussianModel(1),
+                                      np.array(.5)).convergence
+        self.assertFalse(diagnostics['converged'])
+        self.assertEqual(diagnostics['iterations'], 35)
+        self.assertEqual(diagnostics['check_iterations'], [10, 20, 30, 35])
+        self.assertEqual(len(diagnostics['autocorr_history']), 4)
+        self.assertIn('nsamples', diagnostics['stop_reason'])
+
+    @attr("fast")
+    def test_matches_fixed_length_run_until_stopping(self):
+        data = np.array(.5)
+        fixed = EmceeStrategy(10, 40, parallel=None, seed=1).sample(
+            GaussianModel(1), data)
+        monitor = ConvergenceMonitor(n_autocorr=1, rtol=10, check_steps=20)
+        stopped = EmceeStrategy(10, 100, parallel=None, seed=1,
+                                convergence=monitor).sample(
+                                    GaussianModel(1), data)
+        self.assertEqual(stopped.convergence['iterations'], 40)
+        assert_equal(stopped.samples.values, fixed.samples.values)
+
+    @attr("fast")
+    def test_checks_checkpointed_chain(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            monitor = ConvergenceMonitor(n_autocorr=20, check_steps=50)
+            strategy = EmceeStrategy(
+                10, 5000, parallel=None, seed=1, convergence=monitor,
+                checkpoint=os.path.join(tempdir, 'chain.h5'))
+            result = strategy.sample(GaussianModel(1), np.array(.5))
+            self.assertTrue(result.convergence['converged'])
+            self.assertEqual(result.samples.size,
+                             10 * result.convergence['iterations'])
+        finally:
+            shutil.rmtree(tempdir)
+
+
+    @attr("fast")
+    def test_resumes_checkpointed_chain(self):
+        tempdir = tempfile.mkdtemp()
+        filename = os.path.join(tempdir, 'chain.h5')
+        data = np.array(.5)
+        try:
+            EmceeStrategy(10, 20, parallel=None, seed=1,
+                          checkpoint=filename).sample(GaussianModel(1), data)
+            monitor = ConvergenceMonitor(check_steps=10)
+            result = EmceeStrategy(10, 60, parallel=None, seed=1,
+                                   convergence=monitor,
+                                   checkpoint=filename).sample(
+                                       GaussianModel(1), data)
+            self.assertEqual(result.samples.size, 10 * 60)
+            self.assertEqual(result.convergence['iterations'], 60)
+        finally:
+            shutil.rmtree(tempdir)
+
 
 class TestSubsetTempering(unittest.TestCase):
     @attr("slow")
@@ -26,7 +26,8 @@ from nose.plugins.attrib import attr
 from holopy.core.metadata import data_grid
 from holopy.scattering import Sphere, Spheres
 from holopy.inference import (sample, fit, prior, AlphaModel, EmceeStrategy,
-                              NmpfitStrategy, CmaStrategy, TemperedStrategy)
+                              NmpfitStrategy, CmaStrategy, TemperedStrategy,
+                              ParallelTemperingStrategy)
 from holopy.inference.interface import (
     make_default_model, parameterize_scatterer, make_uniform,
     validate_strategy, available_sampling_strategies, available_fit_strategies)
@@ -139,9 +140,9 @@ class TestStrategyHandling(unittest.TestCase):
                 self.assertEqual(strategy(), strategy_by_name)
 
     @attr('fast')
-    def test_parallel_tempering_not_implemented(self):
-        self.assertRaises(ValueError, validate_strategy,
-                          'parallel tempering', 'sample')
+    def test_parallel_tempering_by_name(self):
+        strategy = validate_strategy('parallel tempering', 'sample')
+        self.assertTrue(isinstance(strategy, ParallelTemperingStrategy))
 
     @attr('medium')
     def test_fit_takes_strategy_object(self):
@@ -0,0 +1,154 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+import unittest
+import warnings
+
+import numpy as np
+from numpy.testing import assert_allclose
+from nose.plugins.attrib import attr
+
+from holopy.core.tests.common import assert_read_matches_write
+from holopy.scattering import Sphere
+from holopy.inference import (
+    prior, AlphaModel, LaplaceStrategy, MarginalizedNoise)
+from holopy.inference.laplace import _covariance, _draw_within_priors
+from holopy.inference.result import SamplingResult
+from holopy.inference.tests.common import SimpleModel
+
+
+class LinearModel(SimpleModel):
+    # residuals linear in the parameters, so the posterior is Gaussian
+    design = np.array([[1., 0.], [1., 1.], [1., 2.], [1., 3.]])
+    noise_sd = 0.5
+
+    def __init__(self, lower_bound=-10):
+        super().__init__()
+        self._parameters = [prior.Uniform(-10, 10),
+                            prior.Uniform(lower_bound, 10)]
+
+    def _find_noise(self, pars, data):
+        return self.noise_sd
+
+    def _residuals(self, pars, data, noise):
+        return (np.dot(self.design, pars) - data) / noise
+
+    def _lnlike(self, pars, data):
+        return -0.5 * np.sum(self._residuals(pars, data, self.noise_sd)**2)
+
+    def _lnposterior(self, par_vals, data, pixels=None):
+        return self.lnprior(par_vals) + self._lnlike(par_vals, data)
+
+
+DATA = np.dot(LinearModel.design, [1, 2]) + np.array([0.3, -0.2, 0.1, -0.4])
+EXPECTED_COVARIANCE = LinearModel.noise_sd**2 * np.linalg.inv(
+    np.dot(LinearModel.design.T, LinearModel.design))
+
+
+class TestLaplaceStrategy(unittest.TestCase):
+    @attr("fast")
+    def test_intervals_match_linear_least_squares(self):
+        expected = np.linalg.lstsq(LinearModel.design, DATA, rcond=None)[0]
+        for method in ['hessian', 'fisher']:
+            strategy = LaplaceStrategy(method=method, nsamples=10,
+                                       parallel=None, seed=1)
+            result = strategy.sample(LinearModel(), DATA)
+            self.assertIsInstance(result, SamplingResult)
+            assert_allclose(result._parameters, expected, rtol=1e-6)
+            assert_allclose([interval.plus for interval in result.intervals],
+                            np.sqrt(np.diag(EXPECTED_COVARIANCE)), rtol=1e-4)
+            assert_allclose(result.laplace['covariance'],
+                            EXPECTED_COVARIANCE, rtol=1e-4, atol=1e-8)
+
+    @attr("fast")
+    def test_samples_follow_covariance(self):
+        strategy = LaplaceStrategy(nsamples=4000, parallel=None, seed=1)
+        result = strategy.sample(LinearModel(), DATA)
+        self.assertEqual(result.samples.shape, (4000, 1, 2))
+        self.assertEqual(list(result.samples.parameter.values), ['x', 'y'])
+        samples = result.samples.values.reshape(-1, 2)
+        assert_allclose(np.cov(samples.T), EXPECTED_COVARIANCE, rtol=0.1,
+                        atol=0.01)
+
+    @attr("fast")
+    def test_lnprobs_match_gaussian_posterior(self):
+        model = LinearModel()
+        strategy = LaplaceStrategy(nsamples=5, parallel=None, seed=1)
+        result = strategy.sample(model, DATA)
+        samples = result.samples.values.reshape(-1, 2)
+        expected = [model.lnposterior(sample, DATA) for sample in samples]
+        assert_allclose(result.lnprobs.values.ravel(), expected)
+
+    @attr("fast")
+    def test_samples_stay_within_priors(self):
+        model = LinearModel(lower_bound=1.9)
+        strategy = LaplaceStrategy(nsamples=200, parallel=None, seed=1)
+        result = strategy.sample(model, DATA)
+        self.assertEqual(result.samples.sizes['walker'], 200)
+        self.assertTrue(np.all(result.samples.sel(parameter='y') >= 1.9))
+
+    @attr("fast")
+    def test_invalid_method(self):
+        self.assertRaises(ValueError, LaplaceStrategy, method='newton')
+
+    @attr("fast")
+    def test_fisher_requires_known_noise(self):
+        model = AlphaModel(Sphere(n=prior.Uniform(1.4, 1.6), r=0.5,
+                                  center=[5, 5, 5]),
+                           noise_sd=MarginalizedNoise())
+        strategy = LaplaceStrategy(method='fisher', parallel=None)
+        self.assertRaises(ValueError, strategy.sample, model, DATA)
+        model = AlphaModel(Sphere(n=prior.Uniform(1.4, 1.6), r=0.5,
+                                  center=[5, 5, 5]),
+                           noise_sd=prior.Uniform(0.01, 1))
+        self.assertRaises(ValueError, strategy.sample, model, DATA)
+        model = AlphaModel(Sphere(n=prior.Uniform(1.4, 1.6), r=0.5,
+                                  center=[5, 5, 5]),
+                           noise_sd={'red': prior.Uniform(0.01, 1),
+                                     'green': 0.1})
+        self.assertRaises(ValueError, strategy.sample, model, DATA)
+
+    @attr("fast")
+    def test_no_warning_when_last_round_fills_samples(self):
+        class OneRoundModel(LinearModel):
+            def _lnprior_batch(self, pars):
+                return np.zeros(len(pars))
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            draws = _draw_within_priors(OneRoundModel(), np.zeros(2),
+                                        np.eye(2), 5, np.random.RandomState(1),
+                                        max_rounds=1)
+        self.assertEqual(len(draws), 5)
+        self.assertEqual(caught, [])
+
+    @attr("fast")
+    def test_warns_if_not_at_maximum(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            covariance = _covariance(np.diag([4., -1.]))
+        self.assertEqual(len(caught), 1)
+        assert_allclose(covariance, np.diag([0.25, 1]))
+
+    @attr("fast")
+    def test_yaml_round_trip(self):
+        strategy = LaplaceStrategy(method='fisher', nsamples=10, seed=1)
+        assert_read_matches_write(strategy)
+
+
+if __name__ == '__main__':
+    unittest.main()
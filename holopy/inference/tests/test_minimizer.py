@@ -63,6 +63,25 @@ def test_minimizer():
     assert_equal(minimization_details.niter, 2) # there's always an offset of 1
 
 
+@attr('fast')
+def test_minimize_from_initial_guess():
+    x = np.arange(-10, 10, .1)
+    y = 5.3*x**2 - 1.8*x + 3.4
+
+    def cost_func(pars):
+        a, b, c = pars
+        return a*x**2 + b*x + c - y
+
+    parameters = [prior.Uniform(0, 10, name='a', guess=1),
+                  prior.Uniform(-10, 0, name='b', guess=-9),
+                  prior.Uniform(0, 10, name='c', guess=9)]
+    from_guess, details = Nmpfit().minimize(parameters, cost_func)
+    from_answer, details_from_answer = Nmpfit().minimize(
+        parameters, cost_func, initial_guess=[5.3, -1.8, 3.4])
+    assert_allclose(from_answer, from_guess)
+    assert details_from_answer.nfev < details.nfev
+
+
 @attr('slow')
 def test_optimization_with_maxiter_of_2():
     gold_fit_dict = {
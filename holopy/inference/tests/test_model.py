@@ -19,27 +19,35 @@
 
 import unittest
 import tempfile
+import pickle
 import warnings
+import weakref
 
 import yaml
 import numpy as np
 import xarray as xr
+from scipy import integrate, stats
 from collections import OrderedDict
 
 from nose.plugins.attrib import attr
 from numpy.testing import assert_raises
 
 from holopy.core import detector_grid, update_metadata, holopy_object
+from holopy.core.metadata import flat
 from holopy.core.tests.common import assert_equal, assert_obj_close
 from holopy.scattering import Sphere, Spheres, Mie, calc_holo
-from holopy.scattering.errors import MissingParameter
+from holopy.scattering.errors import (MissingParameter,
+                                      ParameterSpecificationError)
 from holopy.core.tests.common import assert_read_matches_write
 from holopy.inference import (prior, AlphaModel, ExactModel,
+                              MarginalizedNoise,
                               NmpfitStrategy, EmceeStrategy,
                               available_fit_strategies,
                               available_sampling_strategies)
 from holopy.inference.model import (Model, PerfectLensModel, transformed_prior,
-                                    make_xarray, read_map)
+                                    make_xarray, read_map, compile_map,
+                                    EvaluationCache, _gaussian_lnlike,
+                                    _MISSING)
 from holopy.inference.tests.common import SimpleModel
 from holopy.scattering.tests.common import (
     xschema_lens, sphere as SPHERE_IN_METERS)
@@ -417,6 +425,330 @@ class TestParameterMapping(unittest.TestCase):
         xr.testing.assert_equal(constructed, expected)
 
 
+class TestCompiledMaps(unittest.TestCase):
+    @attr("fast")
+    def test_compile_map_matches_read_map(self):
+        n_map = [dict, [[['red', [transformed_prior, [complex, [1.5, "_parameter_2"]]]],
+                         ['green', [transformed_prior, [complex, [1.7, "_parameter_3"]]]]]]]
+        parameter_map = [dict, [[['r', ["_parameter_0", "_parameter_1"]],
+                                 ['n', n_map],
+                                 ['center', [10, 20, "_parameter_4"]]]]]
+        values = [0.5, 0.7, 0.01, 0.02, 30]
+        self.assertEqual(compile_map(parameter_map)(values),
+                         read_map(parameter_map, values))
+        priors = [prior.Uniform(0, 1) for i in range(5)]
+        self.assertEqual(compile_map(parameter_map)(priors),
+                         read_map(parameter_map, priors))
+
+    @attr("fast")
+    def test_compile_constant_map(self):
+        self.assertEqual(compile_map(3)([]), 3)
+        self.assertEqual(compile_map([dict, [[]]])([]), {})
+
+    @attr("fast")
+    def test_compile_xarray_map(self):
+        parameter_map = [make_xarray, ['color', ['red', 'green'],
+                                       ['_parameter_0', 0.5]]]
+        self.assertTrue(compile_map(parameter_map)([0.2]).equals(
+            read_map(parameter_map, [0.2])))
+
+    @attr("fast")
+    def test_scatterer_is_built_once_per_parameters(self):
+        scatterer = Sphere(n=prior.Uniform(1, 2), r=prior.Uniform(0.5, 1),
+                           center=[0, 0, prior.Uniform(5, 10)])
+        model = AlphaModel(scatterer, alpha=prior.Uniform(0.5, 1))
+        pars = [1.5, 0.7, 6, 0.8]
+        first = model._scatterer_from_parameters(pars)
+        self.assertIs(model._scatterer_from_parameters(list(pars)), first)
+        self.assertIsNot(model._scatterer_from_parameters([1.5, 0.8, 6, 0.8]),
+                         first)
+        self.assertEqual(model._scatterer_from_parameters(pars), first)
+
+    @attr("fast")
+    def test_public_scatterer_is_not_shared(self):
+        model = AlphaModel(Sphere(n=prior.Uniform(1, 2), r=0.5,
+                                  center=[0, 0, 5]))
+        self.assertIsNot(model.scatterer_from_parameters([1.5]),
+                         model.scatterer_from_parameters([1.5]))
+
+    @attr("fast")
+    def test_maps_recompiled_after_tie(self):
+        scatterer = Sphere(n=prior.Uniform(1, 2), r=prior.Uniform(0.5, 1),
+                           center=[prior.Uniform(0, 1), prior.Uniform(0, 1),
+                                   prior.Uniform(5, 10)])
+        model = AlphaModel(scatterer)
+        self.assertEqual(
+            model._scatterer_from_parameters([1.5, 0.7, 0.2, 0.3, 6]).center,
+            [0.2, 0.3, 6])
+        model.add_tie(['center.0', 'center.1'])
+        self.assertEqual(
+            model._scatterer_from_parameters([1.5, 0.7, 0.2, 6]).center,
+            [0.2, 0.2, 6])
+
+    @attr("fast")
+    def test_replaced_map_is_read_again(self):
+        model = AlphaModel(Sphere(n=prior.Uniform(1, 2), r=0.5,
+                                  center=[0, 0, 5]), alpha=0.8)
+        self.assertEqual(model._read_maps([1.5])['model']['alpha'], 0.8)
+        model._maps['model'] = model._convert_to_map({'alpha': 0.6})
+        self.assertEqual(model._read_maps([1.5])['model']['alpha'], 0.6)
+        del model._maps['model']
+        self.assertNotIn('model', model._read_maps([1.5]))
+
+    @attr("fast")
+    def test_clear_cache_forgets_last_read(self):
+        model = AlphaModel(Sphere(n=prior.Uniform(1, 2), r=0.5,
+                                  center=[0, 0, 5]))
+        first = model._scatterer_from_parameters([1.5])
+        model.clear_cache()
+        self.assertIsNot(model._scatterer_from_parameters([1.5]), first)
+
+    @attr("fast")
+    def test_pickle_after_evaluation(self):
+        model = AlphaModel(Sphere(n=prior.Uniform(1, 2), r=0.5,
+                                  center=[0, 0, 5]))
+        model._scatterer_from_parameters([1.5])
+        unpickled = pickle.loads(pickle.dumps(model))
+        self.assertEqual(unpickled, model)
+        self.assertEqual(unpickled._scatterer_from_parameters([1.5]).n, 1.5)
+
+
+class TestEvaluationCache(unittest.TestCase):
+    def setUp(self):
+        self.data = calc_holo(detector_grid(10, 0.2), Sphere(n=1.5, r=0.5,
+                              center=[1, 1, 5]), 1.33, 0.66, (1, 0),
+                              scaling=0.8)
+        self.data.attrs['noise_sd'] = 0.1
+        scatterer = Sphere(n=prior.Uniform(1.4, 1.6), r=0.5,
+                           center=[prior.Uniform(0, 2), 1, 5])
+        self.model = AlphaModel(scatterer, alpha=prior.Uniform(0.5, 1),
+                                medium_index=1.33, illum_wavelen=0.66,
+                                illum_polarization=(1, 0))
+        self.model.cache_size = 4
+        self.model.forward_cache_size = 2
+        self.pars = [1.5, 1, 0.8]
+
+    def hits(self, model=None):
+        model = self.model if model is None else model
+        return {kind: info['hits'] for kind, info in model.cache_info.items()}
+
+    @attr("fast")
+    def test_off_by_default(self):
+        model = AlphaModel(self.model.scatterer, alpha=0.8,
+                           medium_index=1.33, illum_wavelen=0.66,
+                           illum_polarization=(1, 0))
+        for i in range(2):
+            model.lnlike(self.pars[:2], self.data)
+        for info in model.cache_info.values():
+            self.assertEqual(info, {'hits': 0, 'misses': 0, 'size': 0,
+                                    'maxsize': 0})
+
+    @attr("fast")
+    def test_repeated_evaluation_is_a_hit(self):
+        first = self.model.lnposterior(self.pars, self.data)
+        self.assertEqual(self.hits(), {'lnlike': 0, 'forward': 0})
+        second = self.model.lnposterior(np.array(self.pars), self.data)
+        self.assertEqual(second, first)
+        self.assertEqual(self.hits(), {'lnlike': 1, 'forward': 0})
+
+    @attr("fast")
+    def test_cached_results_are_unchanged(self):
+        uncached = AlphaModel(self.model.scatterer, alpha=0.8,
+                              medium_index=1.33, illum_wavelen=0.66,
+                              illum_polarization=(1, 0))
+        for i in range(2):
+            self.assertEqual(self.model.lnlike(self.pars, self.data),
+                             uncached.lnlike(self.pars[:2], self.data))
+
+    @attr("fast")
+    def test_forward_is_shared_by_residuals(self):
+        holo = self.model.forward(self.pars, self.data)
+        self.model._residuals(self.pars, self.data, 0.1)
+        self.assertEqual(self.hits(), {'lnlike': 0, 'forward': 1})
+        holo[:] = 0
+        self.assertTrue(np.allclose(self.model.forward(self.pars, self.data),
+                                    self.data))
+
+    @attr("fast")
+    def test_forward_models_do_not_push_out_lnlikes(self):
+        self.model.lnlike(self.pars, self.data)
+        for n in [1.41, 1.42, 1.43]:
+            self.model.forward([n, 1, 0.8], self.data)
+        self.assertEqual(self.model.cache_info['forward']['size'], 2)
+        self.model.lnlike(self.pars, self.data)
+        self.assertEqual(self.hits()['lnlike'], 1)
+
+    @attr("fast")
+    def test_keyed_by_data_identity(self):
+        self.model.lnlike(self.pars, self.data)
+        self.model.lnlike(self.pars, self.data.copy())
+        self.assertEqual(self.hits(), {'lnlike': 0, 'forward': 0})
+
+    @attr("fast")
+    def test_data_are_not_kept_alive(self):
+        cache = EvaluationCache(4)
+        data = self.data.copy()
+        reference = weakref.ref(data)
+        cache.store([1], data, 1)
+        del data
+        self.assertIsNone(reference())
+        cache.store([2], self.data, 2)
+        self.assertEqual(cache.info()['size'], 1)
+
+    @attr("fast")
+    def test_least_recently_used_are_dropped(self):
+        cache = EvaluationCache(2)
+        for pars in [[1], [2], [1], [3]]:
+            cache.evaluate(pars, self.data, lambda pars, data: pars)
+        self.assertEqual(cache.info(), {'hits': 1, 'misses': 3, 'size': 2,
+                                        'maxsize': 2})
+        self.assertEqual(cache.lookup([1], self.data), [1])
+        self.assertIs(cache.lookup([2], self.data), _MISSING)
+
+    @attr("fast")
+    def test_array_parameters_are_not_cached(self):
+        cache = EvaluationCache(2)
+        pars = [np.array([1, 2])]
+        cache.store(pars, self.data, 1)
+        self.assertIs(cache.lookup(pars, self.data), _MISSING)
+        self.assertEqual(cache.info()['size'], 0)
+
+    @attr("fast")
+    def test_batch_uses_and_fills_cache(self):
+        pars = np.array([self.pars, [1.45, 1.2, 0.7]])
+        expected = self.model.lnposterior(pars[0], self.data)
+        batch = self.model.lnposterior_batch(pars, self.data)
+        self.assertEqual(batch[0], expected)
+        self.assertEqual(self.hits()['lnlike'], 1)
+        self.model.lnposterior(pars[1], self.data)
+        self.assertEqual(self.hits()['lnlike'], 2)
+
+    @attr("fast")
+    def test_cleared_by_tie(self):
+        scatterer = Sphere(n=1.5, r=0.5, center=[prior.Uniform(0, 2),
+                                                 prior.Uniform(0, 2), 5])
+        model = AlphaModel(scatterer, medium_index=1.33, illum_wavelen=0.66,
+                           illum_polarization=(1, 0))
+        model.cache_size = 2
+        model.forward_cache_size = 2
+        model.lnlike([1, 1], self.data)
+        model.add_tie(['center.0', 'center.1'])
+        for info in model.cache_info.values():
+            self.assertEqual(info['size'], 0)
+
+    @attr("fast")
+    def test_not_pickled(self):
+        self.model.lnlike(self.pars, self.data)
+        unpickled = pickle.loads(pickle.dumps(self.model))
+        self.assertEqual(unpickled.cache_info['lnlike']['size'], 0)
+        self.assertEqual(unpickled, self.model)
+
+    @attr("medium")
+    def test_fit_result_reuses_evaluations(self):
+        result = NmpfitStrategy().fit(self.model, self.data)
+        result.max_lnprob
+        hits = result.cache_info['forward']['hits']
+        result.hologram
+        self.assertEqual(result.cache_info['forward']['hits'], hits + 1)
+
+
+class TestBatchPosterior(unittest.TestCase):
+    def setUp(self):
+        self.data = calc_holo(detector_grid(10, 0.2), Sphere(n=1.5, r=0.5,
+                              center=[1, 1, 5]), 1.33, 0.66, (1, 0),
+                              scaling=0.8)
+        self.data.attrs['noise_sd'] = 0.1
+        scatterer = Sphere(n=prior.Uniform(1.4, 1.6),
+                           r=prior.BoundedGaussian(0.5, 0.1, 0.3, 0.8),
+                           center=[prior.Uniform(0, 2), 1,
+                                   prior.Gaussian(5, 1)])
+        self.model = AlphaModel(scatterer, alpha=prior.Uniform(0.5, 1),
+                                medium_index=1.33, illum_wavelen=0.66,
+                                illum_polarization=(1, 0))
+        self.pars = np.array([[1.5, 0.5, 1, 5, 0.8],
+                              [1.45, 0.6, 1.2, 4.5, 0.7],
+                              [1.7, 0.5, 1, 5, 0.8],
+                              [1.55, 0.9, 1, 5, 0.8],
+                              [1.5, 0.4, 0.8, 6, 0.9]])
+
+    @attr("fast")
+    def test_matches_lnposterior(self):
+        expected = [self.model.lnposterior(row, self.data)
+                    for row in self.pars]
+        batch = self.model.lnposterior_batch(self.pars, self.data)
+        self.assertTrue(np.allclose(batch, expected))
+        self.assertEqual(np.isinf(batch).sum(), 2)
+
+    @attr("fast")
+    def test_lnprior_batch_matches_lnprior(self):
+        expected = [self.model.lnprior(row) for row in self.pars]
+        self.assertTrue(np.allclose(self.model._lnprior_batch(self.pars),
+                                    expected))
+
+    @attr("fast")
+    def test_accepts_dicts(self):
+        rows = [dict(zip(self.model._parameter_names, row))
+                for row in self.pars[:2]]
+        self.assertTrue(np.allclose(
+            self.model.lnposterior_batch(rows, self.data),
+            self.model.lnposterior_batch(self.pars[:2], self.data)))
+
+    @attr("fast")
+    def test_exact_model_uses_one_hologram_at_a_time(self):
+        model = ExactModel(self.model.scatterer, medium_index=1.33,
+                           illum_wavelen=0.66, illum_polarization=(1, 0))
+        pars = self.pars[:, :4]
+        expected = [model.lnposterior(row, self.data) for row in pars]
+        self.assertTrue(np.allclose(
+            model.lnposterior_batch(pars, self.data), expected))
+
+    @attr("fast")
+    def test_respects_overridden_lnposterior(self):
+        model = SimpleModel()
+        data = np.array([0.5, 0.6])
+        pars = np.array([[0.1, 0.2], [0.3, 0.4]])
+        expected = [model.lnposterior(row, data) for row in pars]
+        self.assertTrue(np.allclose(model.lnposterior_batch(pars, data),
+                                    expected))
+
+    @attr("fast")
+    def test_batch_uses_pixel_weights(self):
+        data = flat(self.data).assign_attrs(
+            pixel_weights=np.linspace(0.5, 1.5, self.data.size))
+        expected = [self.model.lnposterior(row, data) for row in self.pars]
+        self.assertTrue(np.allclose(
+            self.model.lnposterior_batch(self.pars, data), expected))
+
+
+class TestPixelWeights(unittest.TestCase):
+    def setUp(self):
+        self.data = flat(calc_holo(detector_grid(10, 0.2),
+                                   Sphere(n=1.5, r=0.5, center=[1, 1, 5]),
+                                   1.33, 0.66, (1, 0)))
+        self.data.attrs['noise_sd'] = 0.1
+        self.model = AlphaModel(
+            Sphere(n=prior.Uniform(1.4, 1.6), r=0.5, center=[1, 1, 5]),
+            alpha=1, medium_index=1.33, illum_wavelen=0.66,
+            illum_polarization=(1, 0))
+
+    @attr("fast")
+    def test_unit_weights_do_not_change_lnlike(self):
+        weighted = self.data.assign_attrs(
+            pixel_weights=np.ones(self.data.size))
+        self.assertAlmostEqual(self.model.lnlike([1.45], weighted),
+                               self.model.lnlike([1.45], self.data))
+
+    @attr("fast")
+    def test_weights_count_pixels_repeatedly(self):
+        weights = np.ones(self.data.size)
+        weights[:10] = 2
+        weighted = self.data.assign_attrs(pixel_weights=weights)
+        repeated = xr.concat([self.data, self.data.isel(flat=slice(10))],
+                             dim='flat')
+        self.assertAlmostEqual(self.model.lnlike([1.45], weighted),
+                               self.model.lnlike([1.45], repeated))
+
+
 class TestParameterTying(unittest.TestCase):
     @attr('fast')
     def test_parameters_list(self):
@@ -697,6 +1029,224 @@ class TestAlphaModel(unittest.TestCase):
         self.assertEqual(reloaded, model)
 
 
+class TestAnalyticAlpha(unittest.TestCase):
+    def setUp(self):
+        self.data = calc_holo(detector_grid(15, 0.2), Sphere(n=1.5, r=0.5,
+                              center=[1.5, 1.5, 5]), 1.33, 0.66, (1, 0),
+                              scaling=0.7)
+        self.data.attrs['noise_sd'] = 0.1
+        self.scatterer = Sphere(n=prior.Uniform(1.4, 1.6),
+                                r=prior.Uniform(0.3, 0.8),
+                                center=[prior.Uniform(1, 2), 1.5, 5])
+        self.optics = {'medium_index': 1.33, 'illum_wavelen': 0.66,
+                       'illum_polarization': (1, 0)}
+        self.alpha = prior.Uniform(0.5, 1)
+
+    def make_model(self, analytic_alpha=None, alpha=None):
+        alpha = self.alpha if alpha is None else alpha
+        return AlphaModel(self.scatterer, alpha=alpha,
+                          analytic_alpha=analytic_alpha, **self.optics)
+
+    @attr("fast")
+    def test_alpha_is_not_a_parameter(self):
+        model = self.make_model('profile')
+        self.assertEqual(list(model.parameters), ['n', 'r', 'center.0'])
+        self.assertEqual(model.alpha, self.alpha)
+
+    @attr("fast")
+    def test_invalid_options(self):
+        self.assertRaises(ValueError, self.make_model, 'integrate')
+        self.assertRaises(ValueError, self.make_model, 'profile', 0.7)
+        self.assertRaises(ValueError, self.make_model, 'marginalize',
+                          prior.Uniform(0, np.inf))
+
+    @attr("fast")
+    def test_fit_alpha_recovers_scaling(self):
+        model = self.make_model('profile')
+        alpha = model.fit_alpha([1.5, 0.5, 1.5], self.data)
+        self.assertAlmostEqual(alpha, 0.7)
+
+    @attr("fast")
+    def test_fit_alpha_respects_prior_bounds(self):
+        model = self.make_model('profile', prior.Uniform(0.8, 1))
+        self.assertEqual(model.fit_alpha([1.5, 0.5, 1.5], self.data), 0.8)
+
+    @attr("fast")
+    def test_profile_lnlike_matches_best_alpha(self):
+        model = self.make_model('profile')
+        pars = [1.45, 0.55, 1.6]
+        alpha = model.fit_alpha(pars, self.data)
+        expected = self.make_model().lnlike(pars + [alpha], self.data)
+        self.assertAlmostEqual(model.lnlike(pars, self.data), expected)
+        alphas = np.linspace(0.5, 1, 11)
+        others = [self.make_model().lnlike(pars + [a], self.data)
+                  for a in alphas]
+        self.assertGreaterEqual(model.lnlike(pars, self.data), max(others))
+
+    @attr("fast")
+    def test_profile_residuals_match_lnlike(self):
+        model = self.make_model('profile')
+        pars = [1.45, 0.55, 1.6]
+        residuals = model._residuals(pars, self.data, 0.1)
+        expected = self.make_model()._residuals(
+            pars + [model.fit_alpha(pars, self.data)], self.data, 0.1)
+        self.assertTrue(np.allclose(residuals, expected))
+
+    @attr("fast")
+    def test_marginal_lnlike_matches_quadrature(self):
+        model = self.make_model('marginalize', prior.Gaussian(0.75, 0.1))
+        full_model = self.make_model(alpha=prior.Gaussian(0.75, 0.1))
+        pars = [1.5, 0.5, 1.55]
+        lnlike = model.lnlike(pars, self.data)
+
+        def integrand(alpha):
+            return np.exp(full_model.lnlike(pars + [alpha], self.data) +
+                          model.alpha.lnprob(alpha) - lnlike)
+        best_alpha = model.fit_alpha(pars, self.data)
+        integral = integrate.quad(integrand, 0.3, 1.2, points=[best_alpha],
+                                  limit=200)[0]
+        self.assertAlmostEqual(integral, 1, places=4)
+
+    @attr("fast")
+    def test_batch_matches_lnposterior(self):
+        pars = np.array([[1.5, 0.5, 1.5], [1.45, 0.6, 1.2], [1.7, 0.5, 1]])
+        for analytic_alpha in ['profile', 'marginalize']:
+            model = self.make_model(analytic_alpha)
+            expected = [model.lnposterior(row, self.data) for row in pars]
+            batch = model.lnposterior_batch(pars, self.data)
+            self.assertTrue(np.allclose(batch, expected))
+
+    @attr("fast")
+    def test_forward_fits_alpha_to_data(self):
+        model = self.make_model('profile')
+        holo = model.forward([1.5, 0.5, 1.5], self.data, data=self.data)
+        self.assertTrue(np.allclose(holo, self.data))
+
+    @attr("fast")
+    def test_forward_without_data_uses_alpha_guess(self):
+        model = self.make_model('profile')
+        pars = [1.5, 0.5, 1.5]
+        expected = self.make_model().forward(pars + [self.alpha.guess],
+                                             self.data)
+        self.assertTrue(np.allclose(model.forward(pars, self.data), expected))
+        blank = self.data * 0
+        self.assertTrue(np.allclose(model.forward(pars, blank), expected))
+
+    @attr("fast")
+    def test_yaml_round_trip(self):
+        for analytic_alpha in ['profile', 'marginalize']:
+            model = self.make_model(analytic_alpha)
+            reloaded = take_yaml_round_trip(model)
+            self.assertEqual(reloaded, model)
+            self.assertEqual(reloaded.analytic_alpha, analytic_alpha)
+
+    @attr("medium")
+    def test_fit_with_profiled_alpha(self):
+        model = self.make_model('profile')
+        result = NmpfitStrategy().fit(model, self.data)
+        assert_obj_close(result.parameters, {'n': 1.5, 'r': 0.5,
+                         'center.0': 1.5, 'alpha': 0.7}, rtol=1e-3)
+        self.assertTrue(np.allclose(result.hologram, self.data, atol=1e-3))
+
+
+class TestMarginalizedNoise(unittest.TestCase):
+    def setUp(self):
+        data = calc_holo(detector_grid(12, 0.2), Sphere(n=1.5, r=0.5,
+                         center=[1.2, 1.2, 5]), 1.33, 0.66, (1, 0),
+                         scaling=0.7)
+        noise = np.random.default_rng(1).normal(0, 0.05, data.shape)
+        self.data = data + noise
+        self.scatterer = Sphere(n=prior.Uniform(1.4, 1.6),
+                                r=prior.Uniform(0.3, 0.8),
+                                center=[prior.Uniform(1, 2), 1.2, 5])
+        self.optics = {'medium_index': 1.33, 'illum_wavelen': 0.66,
+                       'illum_polarization': (1, 0)}
+        self.pars = [1.5, 0.5, 1.2, 0.7]
+
+    def make_model(self, noise_sd, **kwargs):
+        return AlphaModel(self.scatterer, alpha=prior.Uniform(0.5, 1),
+                          noise_sd=noise_sd, **self.optics, **kwargs)
+
+    @attr("fast")
+    def test_noise_is_not_a_parameter(self):
+        noise = MarginalizedNoise()
+        model = self.make_model(noise)
+        self.assertEqual(list(model.parameters),
+                         ['n', 'r', 'center.0', 'alpha'])
+        self.assertEqual(model.noise_sd, noise)
+
+    @attr("fast")
+    def test_negative_prior_parameters_fail(self):
+        self.assertRaises(ParameterSpecificationError, MarginalizedNoise, -1)
+        self.assertRaises(ParameterSpecificationError, MarginalizedNoise,
+                          1, -1)
+
+    @attr("fast")
+    def test_lnlike_matches_integral_over_variance(self):
+        model = self.make_model(MarginalizedNoise(2, 0.01))
+        residuals = model._residuals(self.pars, self.data, 1)
+        lnlike = model.lnlike(self.pars, self.data)
+        variances = np.linspace(1e-4, 0.02, 20001)
+        gaussian = [_gaussian_lnlike(residuals / np.sqrt(variance),
+                                     np.sqrt(variance), self.data)
+                    for variance in variances]
+        integrand = np.exp(np.array(gaussian) - lnlike) * stats.invgamma.pdf(
+            variances, 2, scale=0.01)
+        self.assertAlmostEqual(np.trapz(integrand, variances), 1, places=4)
+
+    @attr("fast")
+    def test_jeffreys_prior_depends_on_sum_of_squares(self):
+        model = self.make_model(MarginalizedNoise())
+        other = [1.45, 0.5, 1.3, 0.8]
+        chisq = [np.sum(model._residuals(pars, self.data, 1)**2)
+                 for pars in (self.pars, other)]
+        difference = (model.lnlike(self.pars, self.data) -
+                      model.lnlike(other, self.data))
+        expected = -self.data.size / 2 * np.log(chisq[0] / chisq[1])
+        self.assertAlmostEqual(difference, expected)
+
+    @attr("fast")
+    def test_batch_matches_lnposterior(self):
+        model = self.make_model(MarginalizedNoise())
+        pars = np.array([self.pars, [1.45, 0.5, 1.3, 0.8],
+                         [1.7, 0.5, 1.2, 0.7]])
+        expected = [model.lnposterior(row, self.data) for row in pars]
+        batch = model.lnposterior_batch(pars, self.data)
+        self.assertTrue(np.allclose(batch, expected))
+
+    @attr("fast")
+    def test_with_profiled_alpha(self):
+        noise = MarginalizedNoise(2, 0.01)
+        model = self.make_model(noise, analytic_alpha='profile')
+        alpha = model.fit_alpha(self.pars[:3], self.data)
+        expected = self.make_model(noise).lnlike(
+            self.pars[:3] + [alpha], self.data)
+        self.assertAlmostEqual(model.lnlike(self.pars[:3], self.data),
+                               expected)
+
+    @attr("fast")
+    def test_with_marginalized_alpha(self):
+        noise = MarginalizedNoise(2, 0.01)
+        model = self.make_model(noise, analytic_alpha='marginalize')
+        full_model = self.make_model(noise)
+        lnlike = model.lnlike(self.pars[:3], self.data)
+
+        def integrand(alpha):
+            return 2 * np.exp(full_model.lnlike(self.pars[:3] + [alpha],
+                                                self.data) - lnlike)
+        best_alpha = model.fit_alpha(self.pars[:3], self.data)
+        integral = integrate.quad(integrand, 0.5, 1, points=[best_alpha],
+                                  limit=200)[0]
+        self.assertAlmostEqual(integral, 1, places=3)
+
+    @attr("fast")
+    def test_yaml_round_trip(self):
+        model = self.make_model(MarginalizedNoise(2, 0.01))
+        reloaded = take_yaml_round_trip(model)
+        self.assertEqual(reloaded, model)
+        self.assertEqual(reloaded.noise_sd, MarginalizedNoise(2, 0.01))
+
+
 class TestPerfectLensModel(unittest.TestCase):
     @attr('fast')
     def test_initializable(self):
@@ -0,0 +1,88 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+import unittest
+import warnings
+
+import numpy as np
+from nose.plugins.attrib import attr
+
+from holopy.core.process import bin_image
+from holopy.core.tests.common import assert_read_matches_write
+from holopy.inference import (
+    MultiresolutionStrategy, NmpfitStrategy, LeastSquaresScipyStrategy)
+from holopy.inference.result import FitResult
+from holopy.inference.tests.test_scipyfit import (
+    SPHERE, CORRECT_ALPHA, make_fake_data, make_model)
+
+
+class TestMultiresolutionStrategy(unittest.TestCase):
+    @attr("medium")
+    def test_fit_matches_full_resolution_fit(self):
+        data = make_fake_data()
+        model = make_model()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            result = MultiresolutionStrategy(factors=[2]).fit(model, data)
+            full = NmpfitStrategy().fit(model, data)
+        self.assertIsInstance(result, FitResult)
+        self.assertEqual(result.data.shape, data.shape)
+        for key, value in full.parameters.items():
+            self.assertTrue(np.isclose(result.parameters[key], value,
+                                       rtol=1e-4))
+        self.assertTrue(np.isclose(result.scatterer.n, SPHERE.n, rtol=1e-3))
+        self.assertTrue(np.isclose(result.parameters['alpha'],
+                                   CORRECT_ALPHA, rtol=0.1))
+
+    @attr("medium")
+    def test_restores_strategy(self):
+        strategy = LeastSquaresScipyStrategy(max_nfev=5, npixels=500)
+        multires = MultiresolutionStrategy(strategy, factors=[2])
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            result = multires.fit(make_model(), make_fake_data())
+        self.assertIsNone(strategy.initial_guess)
+        self.assertEqual(strategy.npixels, 500)
+        self.assertIs(result.strategy, multires)
+
+    @attr("fast")
+    def test_downsample_keeps_every_factor_th_pixel(self):
+        data = make_fake_data()
+        downsampled = MultiresolutionStrategy()._downsample(data, 4)
+        self.assertEqual((len(downsampled.x), len(downsampled.y)), (10, 10))
+        self.assertTrue(np.all(downsampled.x == data.x[2::4]))
+        self.assertTrue(downsampled.equals(
+            data.isel(x=slice(2, None, 4), y=slice(2, None, 4))))
+        self.assertEqual(downsampled.illum_wavelen, data.illum_wavelen)
+
+    @attr("fast")
+    def test_downsample_can_bin_pixels(self):
+        data = make_fake_data()
+        strategy = MultiresolutionStrategy(bin_pixels=True)
+        self.assertTrue(strategy._downsample(data, 4).equals(
+            bin_image(data, 4)))
+        self.assertIs(strategy._downsample(data, 1), data)
+
+    @attr("fast")
+    def test_serialization(self):
+        strategy = MultiresolutionStrategy(
+            LeastSquaresScipyStrategy(max_nfev=5), factors=[8, 4, 2])
+        assert_read_matches_write(strategy)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+import unittest
+import warnings
+
+import numpy as np
+from nose.plugins.attrib import attr
+
+from holopy.core.tests.common import assert_read_matches_write
+from holopy.inference import (
+    prior, AlphaModel, MultiStartStrategy, NmpfitStrategy,
+    LeastSquaresScipyStrategy)
+from holopy.inference.multistart import _cannot_catch_up
+from holopy.inference.result import FitResult
+from holopy.inference.tests.test_scipyfit import (
+    SPHERE, CORRECT_ALPHA, make_fake_data)
+from holopy.scattering import Sphere
+from holopy.scattering.errors import InvalidScatterer
+
+
+def make_model():
+    # wide priors on z and r, with several basins for local fits to land in
+    sphere = Sphere(n=SPHERE.n, center=SPHERE.center[:2] + (
+                        prior.Uniform(5e-6, 30e-6, guess=25e-6),),
+                    r=prior.Uniform(0.3e-6, 1.5e-6, guess=1.2e-6))
+    return AlphaModel(sphere, noise_sd=.01,
+                      alpha=prior.Uniform(0.5, 1, guess=0.9))
+
+
+class SmallRadiusFailsStrategy(NmpfitStrategy):
+    def fit(self, model, data):
+        if self.initial_guess[0] < 0.6e-6:
+            raise InvalidScatterer(SPHERE, "radius too small for this test")
+        return super().fit(model, data)
+
+
+class TestMultiStartStrategy(unittest.TestCase):
+    @attr("medium")
+    def test_finds_best_of_local_optima(self):
+        strategy = MultiStartStrategy(nstarts=6, parallel=None, seed=1)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            result = strategy.fit(make_model(), make_fake_data())
+        self.assertIsInstance(result, FitResult)
+        self.assertIs(result.strategy, strategy)
+        self.assertTrue(np.isclose(result.parameters['r'], SPHERE.r,
+                                   rtol=1e-3))
+        self.assertTrue(np.isclose(result.parameters['alpha'],
+                                   CORRECT_ALPHA, rtol=1e-3))
+        optima = result.local_optima
+        self.assertEqual(len(optima), 6)
+        lnprobs = [optimum['lnprob'] for optimum in optima]
+        self.assertEqual(lnprobs, sorted(lnprobs, reverse=True))
+        self.assertEqual(optima[0]['parameters'], result.parameters)
+        # some starts land in the wrong basin
+        self.assertLess(lnprobs[-1], lnprobs[0] - 1000)
+
+    @attr("medium")
+    def test_stops_hopeless_starts_early(self):
+        strategy = MultiStartStrategy(nstarts=6, round_iterations=1,
+                                      max_rounds=10, parallel=None, seed=1)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            result = strategy.fit(make_model(), make_fake_data())
+        stopped = [optimum for optimum in result.local_optima
+                   if optimum['status'] == 'stopped early']
+        self.assertGreater(len(stopped), 0)
+        for optimum in stopped:
+            self.assertLess(optimum['rounds'], 10)
+            self.assertLess(optimum['lnprob'], result.local_optima[0]['lnprob'])
+        self.assertTrue(np.isclose(result.parameters['r'], SPHERE.r,
+                                   rtol=1e-3))
+
+    @attr("medium")
+    def test_failed_starts_are_recorded(self):
+        strategy = MultiStartStrategy(SmallRadiusFailsStrategy(), nstarts=6,
+                                      parallel=None, seed=1)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            result = strategy.fit(make_model(), make_fake_data())
+        failed = [optimum for optimum in result.local_optima
+                  if optimum['status'] == 'failed']
+        self.assertGreater(len(failed), 0)
+        for optimum in failed:
+            self.assertLess(optimum['start']['r'], 0.6e-6)
+            self.assertEqual(optimum['lnprob'], -np.inf)
+
+    @attr("medium")
+    def test_parallel_matches_serial(self):
+        kwargs = {'nstarts': 3, 'seed': 2}
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            serial = MultiStartStrategy(parallel=None, **kwargs).fit(
+                make_model(), make_fake_data())
+            parallel = MultiStartStrategy(parallel=2, **kwargs).fit(
+                make_model(), make_fake_data())
+        self.assertEqual(serial.local_optima, parallel.local_optima)
+
+    @attr("medium")
+    def test_limits_scipy_function_evaluations(self):
+        strategy = MultiStartStrategy(
+            LeastSquaresScipyStrategy(), nstarts=2, round_iterations=1,
+            max_rounds=1, parallel=None, seed=1)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            result = strategy.fit(make_model(), make_fake_data())
+        # least_squares can overrun max_nfev = 4 by an evaluation
+        self.assertLessEqual(result.minimizer_info.nfev, 5)
+        self.assertIsNone(strategy.strategy.max_nfev)
+
+    @attr("fast")
+    def test_yaml_round_trip(self):
+        assert_read_matches_write(MultiStartStrategy(nstarts=3, seed=1))
+
+
+class TestCannotCatchUp(unittest.TestCase):
+    @attr("fast")
+    def test_needs_a_trajectory(self):
+        self.assertFalse(_cannot_catch_up([-100], 0, 5))
+
+    @attr("fast")
+    def test_projects_current_improvement(self):
+        self.assertFalse(_cannot_catch_up([-100, -50], 0, 1))
+        self.assertTrue(_cannot_catch_up([-100, -50], 0, 0))
+        self.assertTrue(_cannot_catch_up([-100, -90], 0, 5))
+        self.assertTrue(_cannot_catch_up([-100, -110], 0, 100))
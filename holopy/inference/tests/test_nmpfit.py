@@ -19,6 +19,7 @@
 import tempfile
 import warnings
 import unittest
+from multiprocessing.pool import ThreadPool
 
 import numpy as np
 from nose.plugins.attrib import attr
@@ -118,6 +119,29 @@ class TestRandomSubsetFitting(unittest.TestCase):
         # probably track down if this is a sign of a problem
         assert_obj_close(result.scatterer, gold_sphere, rtol=1e-2)
 
+    @attr('medium')
+    def test_parallel_jacobian_matches_serial_fit(self):
+        model = self._make_model()
+        holo = normalize(get_example_data('image0001'))
+        serial = NmpfitStrategy(npixels=1000, seed=40).fit(model, holo)
+        with ThreadPool(2) as pool:
+            threaded = NmpfitStrategy(npixels=1000, seed=40,
+                                      parallel=pool).fit(model, holo)
+        processes = NmpfitStrategy(npixels=1000, seed=40,
+                                   parallel=2).fit(model, holo)
+        for result in [threaded, processes]:
+            assert_obj_close(result.parameters, serial.parameters,
+                             rtol=1e-5)
+
+
+@attr('fast')
+def test_damp_not_allowed_with_parallel_jacobian():
+    assert_raises(ValueError, NmpfitStrategy, damp=1, parallel=2)
+    strategy = NmpfitStrategy()
+    strategy.damp = 1
+    assert_raises(ValueError, strategy.minimize, [Uniform(0, 1)],
+                  lambda pars: np.array(pars), jacobian=lambda x: None)
+
 
 @attr('medium')
 def test_serialization():
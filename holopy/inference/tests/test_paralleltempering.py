@@ -0,0 +1,147 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+import unittest
+
+import numpy as np
+from numpy.testing import assert_equal
+from nose.plugins.attrib import attr
+
+from holopy.core.tests.common import assert_read_matches_write
+from holopy.inference import (
+    prior, EmceeStrategy, ParallelTemperingStrategy)
+from holopy.inference.paralleltempering import (
+    sample_parallel_tempering, _exchange)
+from holopy.inference.result import SamplingResult
+from holopy.inference.tests.common import SimpleModel
+
+
+class BimodalModel(SimpleModel):
+    # two narrow, equally probable modes at x = -3 and x = 3
+    def __init__(self):
+        super().__init__(npars=1)
+        self._parameters = [prior.Uniform(-5, 5)]
+
+    def _lnlike(self, pars, data):
+        x = np.asarray(pars)[0]
+        return np.logaddexp(-0.5 * ((x - 3) / 0.1)**2,
+                            -0.5 * ((x + 3) / 0.1)**2)
+
+    def _lnposterior(self, par_vals, data, dummy):
+        return self.lnprior(par_vals) + self._lnlike(par_vals, data)
+
+
+DATA = np.array(0.)
+
+
+class TestParallelTemperingStrategy(unittest.TestCase):
+    @attr("fast")
+    def test_returns_cold_chain(self):
+        strategy = ParallelTemperingStrategy(
+            nwalkers=6, nsamples=5, ntemps=3, parallel=None, seed=1)
+        result = strategy.sample(BimodalModel(), DATA)
+        self.assertIsInstance(result, SamplingResult)
+        self.assertEqual(result.samples.sizes['walker'], 6)
+        self.assertEqual(result.samples.sizes['chain'], 5)
+        self.assertEqual(list(result.samples.parameter.values), ['x'])
+        self.assertEqual(result.lnprobs.shape, (6, 5))
+        self.assertEqual(len(result.tempering['temperatures']), 3)
+        self.assertEqual(len(result.tempering['swap_acceptance_fraction']), 2)
+
+    @attr("fast")
+    def test_temperature_ladder(self):
+        strategy = ParallelTemperingStrategy(ntemps=4, max_temp=1000)
+        assert_equal(1 / strategy.betas, [1, 10, 100, 1000])
+
+    @attr("medium")
+    def test_visits_both_modes(self):
+        strategy = ParallelTemperingStrategy(
+            nwalkers=20, nsamples=400, ntemps=8, max_temp=1e4, parallel=None,
+            walker_initial_pos=np.full((20, 1), 3.) + np.random.RandomState(
+                2).normal(0, 0.01, (20, 1)), seed=2)
+        result = strategy.sample(BimodalModel(), DATA)
+        x = result.samples.isel(chain=slice(100, None)).values
+        self.assertTrue(np.allclose(np.abs(x), 3, atol=0.5))
+        self.assertTrue(0.3 < (x < 0).mean() < 0.7)
+        self.assertTrue(all(
+            fraction > 0 for fraction in
+            result.tempering['swap_acceptance_fraction']))
+
+    @attr("medium")
+    def test_untempered_walkers_stay_in_one_mode(self):
+        initial_pos = np.full((20, 1), 3.) + np.random.RandomState(
+            2).normal(0, 0.01, (20, 1))
+        strategy = EmceeStrategy(20, 400, walker_initial_pos=initial_pos,
+                                 parallel=None, seed=2)
+        result = strategy.sample(BimodalModel(), DATA)
+        self.assertTrue(np.all(result.samples.values > 0))
+
+    @attr("fast")
+    def test_seed_reproducible(self):
+        strategy = ParallelTemperingStrategy(
+            nwalkers=6, nsamples=10, ntemps=3, parallel=None, seed=3)
+        first = strategy.sample(BimodalModel(), DATA).samples
+        strategy = ParallelTemperingStrategy(
+            nwalkers=6, nsamples=10, ntemps=3, parallel=None, seed=3)
+        second = strategy.sample(BimodalModel(), DATA).samples
+        assert_equal(first.values, second.values)
+
+    @attr("medium")
+    def test_parallel_matches_serial(self):
+        kwargs = {'nwalkers': 6, 'nsamples': 10, 'ntemps': 3, 'seed': 4}
+        serial = ParallelTemperingStrategy(parallel=None, **kwargs)
+        parallel = ParallelTemperingStrategy(parallel=2, **kwargs)
+        assert_equal(serial.sample(BimodalModel(), DATA).samples.values,
+                     parallel.sample(BimodalModel(), DATA).samples.values)
+
+    @attr("fast")
+    def test_yaml_round_trip(self):
+        strategy = ParallelTemperingStrategy(nwalkers=6, ntemps=3, seed=1)
+        assert_read_matches_write(strategy)
+
+
+class TestSampleParallelTempering(unittest.TestCase):
+    @attr("fast")
+    def test_exchange_conserves_walkers(self):
+        random = np.random.RandomState(5)
+        positions = random.normal(size=(3, 4, 2))
+        like_values = -positions[..., 0]**2
+        prior_values = positions[..., 1]
+        before = positions.copy()
+        swapped = _exchange(positions, prior_values, like_values,
+                            np.array([1, 0.5, 0.25]), random)
+        self.assertGreater(swapped.sum(), 0)
+        assert_equal(np.sort(positions.reshape(-1, 2), axis=0),
+                     np.sort(before.reshape(-1, 2), axis=0))
+        assert_equal(like_values, -positions[..., 0]**2)
+        assert_equal(prior_values, positions[..., 1])
+
+    @attr("fast")
+    def test_single_temperature_is_ensemble_sampler(self):
+        def lnprior(points):
+            return np.where(np.abs(points[:, 0]) < 1, 0, -np.inf)
+
+        def lnlike(points):
+            return -points[:, 0]**2
+
+        positions = np.random.RandomState(6).uniform(-1, 1, size=(1, 10, 1))
+        run = sample_parallel_tempering(
+            lnprior, lnlike, positions, [1], 50, np.random.RandomState(6))
+        self.assertEqual(run['chain'].shape, (50, 10, 1))
+        self.assertTrue(np.all(np.abs(run['chain']) < 1))
+        self.assertEqual(len(run['swap_acceptance']), 0)
+        assert_equal(run['lnprob'], -run['chain'][..., 0]**2)
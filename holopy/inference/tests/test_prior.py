@@ -113,6 +113,13 @@ class TestUniform(unittest.TestCase):
         self.assertEqual(u.lnprob(2), -np.inf)
         self.assertTrue(np.allclose(u.lnprob(1), -np.log(np.diff(bounds))))
 
+    @attr("fast")
+    def test_lnprob_of_array(self):
+        u = Uniform(0, 2)
+        values = np.array([-1, 0.5, 1.5, 3])
+        self.assertTrue(np.array_equal(u.lnprob(values),
+                                       [u.lnprob(v) for v in values]))
+
     @attr("fast")
     def test_sample_shape(self):
         n_samples = 7
@@ -243,6 +250,13 @@ class TestBoundedGaussian(unittest.TestCase):
         self.assertEqual(bg.lnprob(-2), -np.inf)
         self.assertEqual(bg.lnprob(3), -np.inf)
 
+    @attr("fast")
+    def test_lnprob_of_array(self):
+        bg = BoundedGaussian(0.5, 1, -1, 2)
+        values = np.array([-2, -0.5, 1, 3])
+        self.assertTrue(np.array_equal(bg.lnprob(values),
+                                       [bg.lnprob(v) for v in values]))
+
     @attr("fast")
     def test_prob(self):
         mean, sd = np.random.rand(2)
@@ -1,5 +1,6 @@
 import unittest
 import warnings
+from multiprocessing.pool import ThreadPool
 
 import numpy as np
 from nose.plugins.attrib import attr
@@ -56,6 +57,36 @@ class TestLeastSquaresScipyStrategy(unittest.TestCase):
             np.isclose(result.parameters['alpha'], CORRECT_ALPHA, rtol=0.1))
         self.assertEqual(model, result.model)
 
+    @attr('medium')
+    def test_fit_from_initial_guess(self):
+        data = make_fake_data()
+        model = make_1_parameter_model()
+        result = LeastSquaresScipyStrategy().fit(model, data)
+        fitter = LeastSquaresScipyStrategy(initial_guess=[CORRECT_ALPHA])
+        refit = fitter.fit(model, data)
+        self.assertLess(refit.minimizer_info.nfev,
+                        result.minimizer_info.nfev)
+        self.assertAlmostEqual(refit.parameters['alpha'],
+                               result.parameters['alpha'], places=6)
+
+    @attr('medium')
+    def test_parallel_jacobian_matches_serial_fit(self):
+        data = make_fake_data()
+        model = make_model()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            serial = LeastSquaresScipyStrategy().fit(model, data)
+            with ThreadPool(2) as pool:
+                fitter = LeastSquaresScipyStrategy(parallel=pool)
+                parallel = fitter.fit(model, data)
+        for key, value in serial.parameters.items():
+            self.assertTrue(
+                np.isclose(parallel.parameters[key], value, rtol=1e-6))
+        for serial_interval, interval in zip(serial.intervals,
+                                             parallel.intervals):
+            self.assertTrue(np.isclose(interval.plus, serial_interval.plus,
+                                       rtol=1e-3))
+
     @attr('medium')
     def test_fitted_parameters_similar_to_nmpfit(self):
         data = make_fake_data()
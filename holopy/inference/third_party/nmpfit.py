@@ -1491,7 +1491,7 @@ e.g. mpfit.status, mpfit.errmsg, mpfit.params, npfit.niter, mpfit.covar.
         if (self.debug): print('Entering call...')
         if (self.qanytied): x = self.tie(x, self.ptied)
         self.nfev = self.nfev + 1
-        if (fjac == None):
+        if fjac is None:
             [status, f] = fcn(x, fjac=fjac, **functkw)
 
             if (self.damp > 0):
@@ -1554,11 +1554,13 @@ e.g. mpfit.status, mpfit.errmsg, mpfit.params, npfit.niter, mpfit.covar.
         ## Compute analytical derivative if requested
         if (autoderivative == 0):
             mperr = 0
-            fjac = numpy.zeros(nall, numpy.float)
+            fjac = numpy.zeros(nall, float)
             numpy.put(fjac, ifree, 1.0)  ## Specify which parameters need derivatives
-            [status, fp] = self.call(fcn, xall, functkw, fjac=fjac)
+            [status, fp, fjac] = self.call(fcn, xall, functkw, fjac=fjac)
+            if (status < 0): return(None)
+            fjac = numpy.array(fjac, dtype=float)
 
-            if len(fjac) != m*nall:
+            if fjac.size != m*nall:
                 print('ERROR: Derivative matrix was not computed properly.')
                 return(None)
 
@@ -1571,7 +1573,7 @@ e.g. mpfit.status, mpfit.errmsg, mpfit.params, npfit.niter, mpfit.covar.
             if len(ifree) < nall:
                 fjac = fjac[:,ifree]
                 fjac.shape = [m, n]
-                return(fjac)
+            return(fjac)
 
         fjac = numpy.zeros([m, n], numpy.float)
 
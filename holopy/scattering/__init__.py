@@ -38,10 +38,17 @@ The HoloPy scattering module is used to:
 
 '''
 
-from holopy.scattering import scatterer, theory
-from holopy.scattering.scatterer import (Scatterer, Scatterers, Sphere,
-    LayeredSphere, Spheres, RigidCluster, Ellipsoid, Capsule, Cylinder,
-    Bisphere, Spheroid, JanusSphere_Uniform, JanusSphere_Tapered)
-from holopy.scattering.interface import (calc_holo, calc_field,
-    calc_intensity, calc_cross_sections, calc_scat_matrix)
-from holopy.scattering.theory import Mie, MieLens, Multisphere, DDA, Tmatrix
+from holopy.core.lazy import lazy_import
+
+_SCATTERERS = ['Scatterer', 'Scatterers', 'Sphere', 'LayeredSphere',
+               'Spheres', 'SphereArray', 'RigidCluster', 'Ellipsoid', 'Capsule', 'Cylinder',
+               'Bisphere', 'Spheroid', 'JanusSphere_Uniform',
+               'JanusSphere_Tapered']
+_CALC_FUNCTIONS = ['calc_holo', 'calc_holo_batch', 'calc_field',
+                   'calc_intensity', 'calc_cross_sections', 'calc_scat_matrix']
+_THEORIES = ['Mie', 'MieLens', 'Multisphere', 'DDA', 'Tmatrix']
+
+__getattr__, __dir__ = lazy_import(__name__, dict(
+    [(name, 'holopy.scattering.scatterer') for name in _SCATTERERS] +
+    [(name, 'holopy.scattering.interface') for name in _CALC_FUNCTIONS] +
+    [(name, 'holopy.scattering.theory') for name in _THEORIES]))
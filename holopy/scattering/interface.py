@@ -22,23 +22,31 @@ calc_intensity and calc_holo, based on subclass's calc_field
 .. moduleauthor:: Thomas G. Dimiduk <tdimiduk@physics.harvard.edu>
 """
 
+import logging
 from warnings import warn
 
 import xarray as xr
 import numpy as np
 
 from holopy.core.holopy_object import SerializableMetaclass
+from holopy.core.profiling import profiled
 from holopy.core.metadata import (
-    vector, illumination, update_metadata, to_vector, copy_metadata, from_flat,
-    dict_to_array)
+    vector, illumination, update_metadata, to_vector, copy_metadata, flat,
+    from_flat, dict_to_array)
 from holopy.core.utils import dict_without, ensure_array
 from holopy.scattering.scatterer import Sphere, Spheres, Spheroid, Cylinder
 from holopy.scattering.errors import AutoTheoryFailed, MissingParameter
 from holopy.scattering.theory import Mie, Multisphere
 from holopy.scattering.theory import Tmatrix
 from holopy.scattering.theory.dda import DDA
+from holopy.scattering.theory.clustered import (
+    AutoFast, ClusteredMultisphere, interacting_groups, mie_cost,
+    multisphere_cost, clustered_cost, DEFAULT_COUPLING_TOLERANCE)
 
+logger = logging.getLogger(__name__)
 
+
+@profiled
 def prep_schema(detector, medium_index, illum_wavelen, illum_polarization):
     detector = update_metadata(
         detector, medium_index, illum_wavelen, illum_polarization)
@@ -84,14 +92,21 @@ def prep_schema(detector, medium_index, illum_wavelen, illum_polarization):
     return detector
 
 
-def interpret_theory(scatterer, theory='auto'):
+@profiled
+def interpret_theory(scatterer, theory='auto', detector=None):
     if isinstance(theory, str) and theory == 'auto':
         theory = determine_default_theory_for(scatterer)
+    elif isinstance(theory, str) and theory == 'auto-fast':
+        theory = AutoFast()
     if isinstance(theory, SerializableMetaclass):
         theory = theory()
+    if isinstance(theory, AutoFast):
+        theory = determine_fast_theory_for(scatterer, detector,
+                                           theory.tolerance)
     return theory
 
 
+@profiled
 def finalize(detector, result):
     if not hasattr(detector, 'flat'):
         result = from_flat(result)
@@ -126,6 +141,74 @@ def determine_default_theory_for(scatterer):
     return theory
 
 
+def determine_fast_theory_for(scatterer, detector,
+                              tolerance=DEFAULT_COUPLING_TOLERANCE):
+    """
+    Choose the cheapest theory accurate to within a tolerance
+
+    For clusters of spheres, estimates the coupling between every pair of
+    spheres and the cost of each candidate theory on the detector, then
+    picks Mie superposition if no coupling exceeds `tolerance`, and
+    otherwise the cheaper of Multisphere for all spheres and
+    :class:`.ClusteredMultisphere`, which uses Multisphere only for groups
+    of interacting spheres. Other scatterers get their default theory. The
+    choice is logged at INFO level to the holopy.scattering.interface
+    logger.
+
+    Parameters
+    ----------
+    scatterer : :class:`.scatterer` object
+    detector : xarray object
+        detector with illum_wavelen and medium_index metadata, as returned
+        by prep_schema. If None, the default theory is used.
+    tolerance : float
+        largest acceptable coupling between spheres treated independently,
+        roughly the relative error accepted in their scattered fields.
+
+    Returns
+    -------
+    theory : :class:`.ScatteringTheory` object
+    """
+    is_cluster = (isinstance(scatterer, Spheres) and
+                  all(np.isscalar(s.r) for s in scatterer.scatterers))
+    if not is_cluster or detector is None:
+        theory = determine_default_theory_for(scatterer)
+        logger.info("auto-fast: using default theory %s for %s",
+                    type(theory).__name__, type(scatterer).__name__)
+        return theory
+
+    medium_wavevec = 2 * np.pi * detector.medium_index / np.min(
+        ensure_array(detector.illum_wavelen))
+    npoints = np.prod([size for dim, size in detector.sizes.items()
+                       if dim not in (illumination, vector)])
+    groups = interacting_groups(
+        scatterer, medium_wavevec, detector.medium_index, tolerance)
+    nspheres = len(scatterer.scatterers)
+    if len(groups) == nspheres:
+        costs = {'Mie': mie_cost(scatterer, medium_wavevec, npoints)}
+    else:
+        costs = {'Multisphere': multisphere_cost(
+            scatterer, medium_wavevec, npoints)}
+        if len(groups) > 1:
+            costs['ClusteredMultisphere'] = clustered_cost(
+                scatterer, groups, medium_wavevec, npoints)
+    choice = min(costs, key=costs.get)
+    if np.isinf(costs[choice]):
+        warn("Interacting spheres exceed the limits of Multisphere theory. "
+             "Using Mie theory, which neglects multiple scattering.")
+        costs['Mie'] = mie_cost(scatterer, medium_wavevec, npoints)
+        choice = 'Mie'
+    logger.info(
+        "auto-fast: %d spheres in %d interacting groups (largest %d) at "
+        "tolerance %g, estimated costs %s; using %s", nspheres, len(groups),
+        max(len(group) for group in groups), tolerance,
+        ", ".join("{} {:.3g} s".format(name, cost)
+                  for name, cost in costs.items()), choice)
+    if choice == 'ClusteredMultisphere':
+        return ClusteredMultisphere(tolerance=tolerance)
+    return {'Mie': Mie, 'Multisphere': Multisphere}[choice]()
+
+
 def calc_intensity(detector, scatterer, medium_index=None, illum_wavelen=None,
                    illum_polarization=None, theory='auto'):
     """
@@ -148,6 +231,9 @@ def calc_intensity(detector, scatterer, medium_index=None, illum_wavelen=None,
         optional if there is a clear choice of theory for your scatterer.
         If there is not a clear choice, calc_intensity will error out and
         ask you to specify a theory
+        ('auto-fast' picks the cheapest theory accurate to within a default
+        tolerance; pass :class:`.AutoFast` to set the tolerance. See
+        :func:`determine_fast_theory_for`.)
     Returns
     -------
     inten : xarray.DataArray
@@ -183,6 +269,9 @@ def calc_holo(detector, scatterer, medium_index=None, illum_wavelen=None,
         optional if there is a clear choice of theory for your scatterer.
         If there is not a clear choice, `calc_holo` will error out and
         ask you to specify a theory
+        ('auto-fast' picks the cheapest theory accurate to within a default
+        tolerance; pass :class:`.AutoFast` to set the tolerance. See
+        :func:`determine_fast_theory_for`.)
     scaling : scaling value (alpha) for amplitude of reference wave
 
     Returns
@@ -190,9 +279,9 @@ def calc_holo(detector, scatterer, medium_index=None, illum_wavelen=None,
     holo : xarray.DataArray
         Calculated hologram from the given distribution of spheres
     """
-    theory = interpret_theory(scatterer, theory)
     uschema = prep_schema(
         detector, medium_index, illum_wavelen, illum_polarization)
+    theory = interpret_theory(scatterer, theory, uschema)
     scaling = dict_to_array(detector, scaling)
     scattered_field = theory.calculate_scattered_field(scatterer, uschema)
     reference_field = uschema.illum_polarization
@@ -201,6 +290,64 @@ def calc_holo(detector, scatterer, medium_index=None, illum_wavelen=None,
     return finalize(uschema, holo)
 
 
+def calc_holo_batch(detector, scatterers, medium_index=None,
+                    illum_wavelen=None, illum_polarization=None,
+                    theory='auto', scaling=1.0):
+    """
+    Calculate holograms of several scatterers on the same detector
+
+    Gives the same holograms as calling :func:`calc_holo` for each scatterer,
+    but the detector is prepared once and the holograms are computed as plain
+    arrays and packed together, which saves most of the per-hologram
+    overhead when many scatterers are compared to the same data, as in
+    ensemble samplers.
+
+    Parameters
+    ----------
+    detector : xarray object
+        The detector points and calculation metadata used to calculate
+        the holograms.
+    scatterers : list of :class:`.scatterer` objects
+        scatterers to compute holograms of
+    medium_index : float or complex
+        Refractive index of the medium in which the scatter is imbedded
+    illum_wavelen : float or ndarray(float)
+        Wavelength of illumination light.
+    theory : :class:`.theory` object (optional)
+        Scattering theory object to use for the calculation, see
+        :func:`calc_holo`.
+    scaling : float or list of float
+        scaling value (alpha) for amplitude of reference wave, either one
+        for all holograms or one for each scatterer
+
+    Returns
+    -------
+    holos : xarray.DataArray
+        Calculated holograms, stacked along a new leading 'batch' dimension
+    """
+    uschema = prep_schema(
+        detector, medium_index, illum_wavelen, illum_polarization)
+    scaling = np.broadcast_to(np.asarray(scaling), (len(scatterers),))
+    if len(ensure_array(uschema.illum_wavelen)) > 1:
+        holos = [calc_holo(detector, scatterer, medium_index, illum_wavelen,
+                           illum_polarization, theory, alpha)
+                 for scatterer, alpha in zip(scatterers, scaling)]
+        return xr.concat(holos, dim='batch')
+
+    flattened = flat(uschema)
+    reference = uschema.illum_polarization.sel(vector=['x', 'y']).values
+    holos = np.empty((len(scatterers), flattened.size))
+    for i, (scatterer, alpha) in enumerate(zip(scatterers, scaling)):
+        if scatterer.center is None:
+            raise MissingParameter("center")
+        scatterer_theory = interpret_theory(scatterer, theory, uschema)
+        field = scatterer_theory._calculate_raw_field(scatterer, flattened)
+        holos[i] = (np.abs(alpha * field[:, :2] + reference)**2).sum(axis=-1)
+    holos = xr.DataArray(holos, dims=('batch',) + flattened.dims,
+                         coords=flattened.coords)
+    return finalize(uschema, holos)
+
+
 def calc_cross_sections(scatterer, medium_index=None, illum_wavelen=None,
                         illum_polarization=None, theory='auto'):
     """
@@ -259,6 +406,9 @@ def calc_scat_matrix(detector, scatterer, medium_index=None, illum_wavelen=None,
         optional if there is a clear choice of theory for your scatterer.
         If there is not a clear choice, `calc_scat_matrix` will error out
         and ask you to specify a theory
+        ('auto-fast' picks the cheapest theory accurate to within a default
+        tolerance; pass :class:`.AutoFast` to set the tolerance. See
+        :func:`determine_fast_theory_for`.)
 
     Returns
     -------
@@ -266,10 +416,10 @@ def calc_scat_matrix(detector, scatterer, medium_index=None, illum_wavelen=None,
         Scattering matrices at specified positions
 
     """
-    theory = interpret_theory(scatterer, theory)
     uschema = prep_schema(
         detector, medium_index=medium_index, illum_wavelen=illum_wavelen,
         illum_polarization=False)
+    theory = interpret_theory(scatterer, theory, uschema)
     result = theory.calculate_scattering_matrix(scatterer, uschema)
     return finalize(uschema, result)
 
@@ -297,22 +447,26 @@ def calc_field(detector, scatterer, medium_index=None, illum_wavelen=None,
         optional if there is a clear choice of theory for your scatterer.
         If there is not a clear choice, `calc_field` will error out and
         ask you to specify a theory
+        ('auto-fast' picks the cheapest theory accurate to within a default
+        tolerance; pass :class:`.AutoFast` to set the tolerance. See
+        :func:`determine_fast_theory_for`.)
 
     Returns
     -------
     e_field : :class:`.Vector` object
         Calculated hologram from the given distribution of spheres
     """
-    theory = interpret_theory(scatterer, theory)
     uschema = prep_schema(
         detector, medium_index=medium_index, illum_wavelen=illum_wavelen,
         illum_polarization=illum_polarization)
+    theory = interpret_theory(scatterer, theory, uschema)
     result = theory.calculate_scattered_field(scatterer, uschema)
     return finalize(uschema, result)
 
 
 # this is pulled out separate from the calc_holo method because
 # occasionally you want to turn prepared  e_fields into holograms directly
+@profiled
 def scattered_field_to_hologram(scat, ref):
     """
     Calculate a hologram from an E-field
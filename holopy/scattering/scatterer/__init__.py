@@ -29,7 +29,8 @@ as Clusters.
 from holopy.scattering.scatterer.scatterer import Scatterer, Indicators
 from holopy.scattering.scatterer.sphere import Sphere, LayeredSphere
 from holopy.scattering.scatterer.composite import Scatterers
-from holopy.scattering.scatterer.spherecluster import Spheres, RigidCluster
+from holopy.scattering.scatterer.spherecluster import (
+    Spheres, SphereArray, RigidCluster)
 from holopy.scattering.scatterer.janus import (JanusSphere_Uniform,
                                                JanusSphere_Tapered)
 from holopy.scattering.scatterer.spheroid import Spheroid
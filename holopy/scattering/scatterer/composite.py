@@ -25,6 +25,7 @@ scatterers (e.g. two trimers).
 
 
 from copy import copy
+from functools import lru_cache
 from numbers import Number
 import warnings
 
@@ -118,15 +119,14 @@ class Scatterers(Scatterer):
         overwrite : bool (optional)
             if True, constant values are replaced by those in parameters
         '''
-        n_scatterers = len(self.scatterers)
-        collected = [{} for i in range(n_scatterers)]
-        for key, val in new_parameters.items():
-            parts = key.split(':', 1)
-            if len(parts) == 2:
-                n, par = parts
-                collected[int(n)][par] = val
+        components = self.scatterers
+        collected = [{} for i in range(len(components))]
+        layout = _parameter_layout(tuple(new_parameters))
+        for (n, par), val in zip(layout, new_parameters.values()):
+            if n is not None:
+                collected[n][par] = val
         scatterers = [scat.from_parameters(pars)
-                         for scat, pars in zip(self.scatterers, collected)]
+                      for scat, pars in zip(components, collected)]
         self_dict = dict(self._iteritems())
         self_dict['scatterers'] = scatterers
         return type(self)(**self_dict)
@@ -223,3 +223,18 @@ class Scatterers(Scatterer):
             return self.scatterers[self.in_domain(point)[0]].index_at(point)
         except TypeError:
             return None
+
+
+@lru_cache(maxsize=256)
+def _parameter_layout(names):
+    # Map each 'i:key' parameter name to (component index, key). The names of
+    # a composite's parameters rarely change between calls, so the parsed
+    # layout is compiled once and reused.
+    layout = []
+    for name in names:
+        parts = name.split(':', 1)
+        if len(parts) == 2:
+            layout.append((int(parts[0]), parts[1]))
+        else:
+            layout.append((None, None))
+    return tuple(layout)
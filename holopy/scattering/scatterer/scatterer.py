@@ -138,9 +138,12 @@ class Scatterer(HoloPyObject):
             A scatterer with the given parameter values
         """
         # This will need to be overriden for subclasses that do anything
-        # complicated with parameters
+        # complicated with parameters. Values missing from parameters are
+        # copied with _copy_mutable rather than deep copied, since this is
+        # called on every likelihood evaluation during inference.
         parameters = {key: parameters[key] if key in parameters else
-                      self.parameters[key] for key in self.parameters.keys()}
+                      _copy_mutable(val)
+                      for key, val in self._parameters.items()}
         return type(self)(**parameters)
 
     def contains(self, points):
@@ -280,6 +283,18 @@ def bound_union(d1, d2):
     return new
 
 
+def _copy_mutable(value):
+    # copy the lists, dicts and arrays that hold a scatterer's parameters,
+    # leaving immutable values (numbers, strings, priors) shared
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if isinstance(value, list):
+        return [_copy_mutable(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy_mutable(item) for key, item in value.items()}
+    return value
+
+
 class Indicators(HoloPyObject):
     """
     Class holding functions describing a scatterer
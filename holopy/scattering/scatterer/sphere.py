@@ -24,6 +24,7 @@ Defines Sphere, a scattering primitive
 '''
 
 from copy import copy
+from numbers import Real
 
 import numpy as np
 
@@ -56,7 +57,13 @@ class Sphere(CenteredScatterer):
         super().__init__(center)
 
         try:
-            if np.any(np.array(self.r) < 0):
+            # plain numbers skip the array conversion, this is on the hot path
+            # of every Scatterer.from_parameters during inference
+            if isinstance(self.r, Real):
+                negative = self.r < 0
+            else:
+                negative = np.any(np.array(self.r) < 0)
+            if negative:
                 raise InvalidScatterer(self, "radius is negative")
         except TypeError:
             # Simplest solution to deal with spheres with a parameter or prior
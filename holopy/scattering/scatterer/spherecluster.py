@@ -28,10 +28,14 @@ Defines Spheres, a Scatterers scatterer consisting of Spheres
 import numpy as np
 import warnings
 from copy import copy
+from functools import lru_cache
 from numbers import Number
 
+from scipy.spatial import cKDTree
+
 from holopy.scattering.scatterer.sphere import Sphere
-from holopy.scattering.scatterer.composite import Scatterers
+from holopy.scattering.scatterer.composite import (
+    Scatterers, _parameter_layout)
 from holopy.scattering.errors import OverlapWarning, InvalidScatterer
 from holopy.core.math import cartesian_distance, rotate_points
 from holopy.core.utils import ensure_array, dict_without, ensure_listlike
@@ -67,34 +71,28 @@ class Spheres(Scatterers):
         super().__init__(scatterers)
 
 
-        if self.overlaps and self.warn:
+        if self.warn and self.overlaps:
             warnings.warn(OverlapWarning(self, self.overlaps))
 
     @property
     def overlaps(self):
-        overlaps = []
-        for i, s1 in enumerate(self.scatterers):
-            for j in range(i+1, len(self.scatterers)):
-                s2= self.scatterers[j]
-                try:
-                    if cartesian_distance(s1.center, s2.center) < (np.max(s1.r) + np.max(s2.r)):
-                        overlaps.append((i, j))
-                except:
-                    # if the coordinates are not something that we can do
-                    # arithmatic on, just pass for now, hopefully the overlap
-                    # will be caught later.
-                    pass
-        return overlaps
+        try:
+            centers = np.array(self.centers, dtype=float)
+            radii = np.array([_outer_radius(s) for s in self.scatterers],
+                             dtype=float)
+            pairs = _overlapping_pairs(centers, radii)
+        except (TypeError, ValueError):
+            # if the coordinates are not something that we can do
+            # arithmatic on, just pass for now, hopefully the overlap
+            # will be caught later.
+            return []
+        return [tuple(pair) for pair in pairs.tolist()]
 
     def largest_overlap(self):
-        largest = 0
-        for i, s1 in enumerate(self.scatterers):
-            for j in range(i+1, len(self.scatterers)):
-                s2= self.scatterers[j]
-                largest = max(largest, (np.max(s1.r) + np.max(s2.r)) -
-                                       cartesian_distance(s1.center, s2.center))
-
-        return largest
+        centers = np.array(self.centers, dtype=float)
+        radii = np.array([_outer_radius(s) for s in self.scatterers],
+                         dtype=float)
+        return _largest_overlap(centers, radii)
 
     def add(self, scatterer):
         if not isinstance(scatterer, Sphere):
@@ -133,6 +131,196 @@ class Spheres(Scatterers):
     def center(self):
         return self.centers.mean(0)
 
+class SphereArray(Spheres):
+    """
+    A cluster of uniform spheres stored as arrays of their properties
+
+    Behaves like :class:`Spheres`, but keeps the refractive indices, radii
+    and centers of all spheres in arrays instead of a list of
+    :class:`Sphere` objects, so clusters of many spheres are cheap to build
+    and their properties and overlaps are computed without python loops.
+    Sphere objects are only created when individual components are asked
+    for.
+
+    Attributes
+    ----------
+    n : array (N,)
+        index of refraction of each sphere
+    r : array (N,)
+        radius of each sphere
+    centers : array (N, 3)
+        center of each sphere
+    warn : bool
+       if True, overlapping spheres raise warnings.
+
+    Notes
+    -----
+    Layered spheres cannot be represented, use :class:`Spheres` for them.
+    """
+
+    def __init__(self, n, r, centers, warn=True):
+        centers = np.array(centers)
+        if centers.ndim == 1:
+            centers = centers.reshape(-1, 3)
+        if centers.ndim != 2 or centers.shape[1] != 3:
+            raise InvalidScatterer(self, "centers should have shape (N, 3)")
+        nspheres = len(centers)
+        try:
+            self._n = np.broadcast_to(np.asarray(n), (nspheres,)).copy()
+            self._r = np.broadcast_to(np.asarray(r), (nspheres,)).copy()
+        except ValueError:
+            raise InvalidScatterer(
+                self, "SphereArray needs one scalar n and r per sphere")
+        self._centers = centers
+        self.warn = warn
+        if self.warn and self.overlaps:
+            warnings.warn(OverlapWarning(self, self.overlaps))
+
+    @classmethod
+    def from_spheres(cls, spheres):
+        """
+        Convert a :class:`Spheres` of uniform spheres to a SphereArray
+        """
+        if not all(np.isscalar(s.r) and np.isscalar(s.n)
+                   for s in spheres.scatterers):
+            raise InvalidScatterer(
+                spheres, "SphereArray cannot hold layered spheres")
+        return cls(spheres.n, spheres.r, spheres.centers,
+                   warn=getattr(spheres, 'warn', True))
+
+    def to_spheres(self):
+        """
+        Convert to an equivalent :class:`Spheres` holding Sphere objects
+        """
+        return Spheres(self.scatterers, warn=self.warn)
+
+    @property
+    def scatterers(self):
+        return [Sphere(n=n, r=r, center=tuple(center))
+                for n, r, center in zip(self._n.tolist(), self._r.tolist(),
+                                        self._centers.tolist())]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return SphereArray(self._n[key], self._r[key], self._centers[key],
+                               warn=self.warn)
+        return Sphere(n=self._n[key].item(), r=self._r[key].item(),
+                      center=tuple(self._centers[key].tolist()))
+
+    def __len__(self):
+        return len(self._centers)
+
+    def _iteritems(self):
+        # plain python values keep yaml output readable and __eq__ well
+        # defined for the (N, 3) centers array
+        yield 'n', self._n.tolist()
+        yield 'r', self._r.tolist()
+        yield 'centers', self._centers.tolist()
+        yield 'warn', self.warn
+
+    def get_component_list(self):
+        return self.scatterers
+
+    def add(self, scatterer):
+        if not isinstance(scatterer, Sphere) or not np.isscalar(scatterer.r):
+            raise InvalidScatterer(self,
+                "SphereArray can only add uniform Spheres.\n" +
+                repr(scatterer) + " is not a uniform Sphere")
+        self._n = np.append(self._n, scatterer.n)
+        self._r = np.append(self._r, scatterer.r)
+        self._centers = np.vstack([self._centers, scatterer.center])
+
+    @property
+    def overlaps(self):
+        try:
+            pairs = _overlapping_pairs(self._centers.astype(float),
+                                       self._r.astype(float))
+        except (TypeError, ValueError):
+            return []
+        return [tuple(pair) for pair in pairs.tolist()]
+
+    def largest_overlap(self):
+        return _largest_overlap(self._centers.astype(float),
+                                self._r.astype(float))
+
+    @property
+    def _parameters(self):
+        parameters = {}
+        for i, (n, r, center) in enumerate(zip(
+                self._n.tolist(), self._r.tolist(), self._centers.tolist())):
+            parameters.update({'{}:n'.format(i): n, '{}:r'.format(i): r,
+                               '{}:center'.format(i): center})
+        return parameters
+
+    def from_parameters(self, new_parameters):
+        n = self._n.copy()
+        r = self._r.copy()
+        centers = self._centers.copy()
+        arrays = {'n': n, 'r': r, 'center': centers}
+        layout = _parameter_layout(tuple(new_parameters))
+        for (index, par), val in zip(layout, new_parameters.values()):
+            if par in arrays:
+                if par == 'n' and np.iscomplexobj(val) and not np.iscomplexobj(n):
+                    n = arrays['n'] = n.astype(complex)
+                arrays[par][index] = val
+        return SphereArray(n, r, centers, warn=self.warn)
+
+    def translated(self, coord1, coord2=None, coord3=None):
+        if coord2 is None and len(ensure_array(coord1)) == 3:
+            translation = ensure_array(coord1)
+        elif coord2 is not None and coord3 is not None:
+            translation = np.array([coord1, coord2, coord3])
+        else:
+            raise InvalidScatterer(
+                self, "Cannot interpret translation coordinates")
+        return SphereArray(self._n, self._r, self._centers + translation,
+                           warn=self.warn)
+
+    def rotated(self, ang1, ang2=None, ang3=None):
+        if ang2 is None and len(ensure_array(ang1)) == 3:
+            alpha, beta, gamma = ang1
+        elif ang2 is not None and ang3 is not None:
+            alpha, beta, gamma = ang1, ang2, ang3
+        else:
+            raise InvalidScatterer(
+                self, "Cannot interpret rotation coordinates")
+        com = self._centers.mean(0)
+        centers = com + rotate_points(self._centers - com, alpha, beta, gamma)
+        return SphereArray(self._n, self._r, centers, warn=self.warn)
+
+    @property
+    def n(self):
+        return self._n
+
+    @property
+    def n_real(self):
+        return self._n.real
+
+    @property
+    def n_imag(self):
+        return self._n.imag
+
+    @property
+    def r(self):
+        return self._r
+
+    @property
+    def x(self):
+        return self._centers[:, 0]
+
+    @property
+    def y(self):
+        return self._centers[:, 1]
+
+    @property
+    def z(self):
+        return self._centers[:, 2]
+
+    @property
+    def centers(self):
+        return self._centers
+
+
 class RigidCluster(Spheres):
 
     def __init__(self, spheres, translation=(0,0,0), rotation=(0,0,0)):
@@ -170,3 +358,53 @@ class RigidCluster(Spheres):
         spheres = self.spheres.from_parameters(parameters)
         return spheres.rotated(rotation).translated(translation)
 
+
+def _outer_radius(sphere):
+    return sphere.r if np.isscalar(sphere.r) else np.max(sphere.r)
+
+
+_SMALL_CLUSTER = 32
+
+
+@lru_cache(maxsize=_SMALL_CLUSTER)
+def _all_pairs(n):
+    return np.stack(np.triu_indices(n, 1), axis=1)
+
+
+def _candidate_pairs(centers, radii):
+    # pairs (i, j) with i < j in sorted order of spheres close enough to
+    # overlap, with their overlap distance. Spheres with undefined positions
+    # or radii never overlap.
+    if centers.ndim != 2 or centers.shape[1:] != (3,):
+        raise ValueError("centers should have shape (N, 3)")
+    valid = np.isfinite(centers).all(axis=1) & np.isfinite(radii)
+    if valid.all():
+        valid = None
+    else:
+        valid = np.flatnonzero(valid)
+        centers, radii = centers[valid], radii[valid]
+    if len(centers) < 2:
+        return np.zeros((0, 2), dtype=int), np.zeros(0)
+    if len(centers) <= _SMALL_CLUSTER:
+        # building a tree costs more than checking every pair of a few spheres
+        pairs = _all_pairs(len(centers))
+    else:
+        pairs = cKDTree(centers).query_pairs(2 * radii.max(),
+                                             output_type='ndarray')
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    difference = centers[pairs[:, 0]] - centers[pairs[:, 1]]
+    distance = np.sqrt((difference**2).sum(axis=1))
+    overlap = radii[pairs[:, 0]] + radii[pairs[:, 1]] - distance
+    if valid is not None:
+        pairs = valid[pairs]
+    return pairs, overlap
+
+
+def _overlapping_pairs(centers, radii):
+    pairs, overlap = _candidate_pairs(centers, radii)
+    return pairs[overlap > 0]
+
+
+def _largest_overlap(centers, radii):
+    pairs, overlap = _candidate_pairs(centers, radii)
+    return max(0, overlap.max()) if len(overlap) else 0
@@ -0,0 +1,240 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+'''
+Test scattering from sphere clusters partitioned into interacting groups.
+'''
+import gc
+import unittest
+import pickle
+import multiprocessing
+
+import numpy as np
+import yaml
+from numpy.testing import assert_allclose, assert_equal
+from nose.plugins.attrib import attr
+
+from holopy.core import detector_grid, update_metadata
+from holopy.core.holopy_object import FullLoader
+from holopy.core.parallel import WorkerPool
+from holopy.scattering import (
+    calc_holo, calc_field, Sphere, Spheres, Mie, Multisphere)
+from holopy.scattering.theory import ClusteredMultisphere
+from holopy.scattering.theory.clustered import (
+    coupling_strengths, interacting_groups, mie_cost, multisphere_cost,
+    clustered_cost, MULTISPHERE_MAX_SPHERES)
+from holopy.scattering.tests.common import index, wavelen, xpolarization
+
+MEDIUM_WAVEVEC = 2 * np.pi * index / wavelen
+SCHEMA = update_metadata(detector_grid(shape=16, spacing=.5e-6),
+                         illum_wavelen=wavelen, medium_index=index,
+                         illum_polarization=xpolarization)
+
+DIMER = [Sphere(n=1.59, r=.5e-6, center=(4e-6, 4e-6, 10e-6)),
+         Sphere(n=1.59, r=.5e-6, center=(5.05e-6, 4e-6, 10e-6))]
+ISOLATED = Sphere(n=1.59, r=.5e-6, center=(24e-6, 4e-6, 10e-6))
+SPHERES = Spheres(DIMER + [ISOLATED], warn=False)
+
+
+class TestCoupling(unittest.TestCase):
+    @attr("fast")
+    def test_coupling_is_symmetric_with_zero_diagonal(self):
+        coupling = coupling_strengths(SPHERES, MEDIUM_WAVEVEC, index)
+        assert_allclose(coupling, coupling.T)
+        assert_equal(np.diag(coupling), 0)
+
+    @attr("fast")
+    def test_coupling_decreases_with_distance(self):
+        coupling = coupling_strengths(SPHERES, MEDIUM_WAVEVEC, index)
+        self.assertGreater(coupling[0, 1], coupling[0, 2])
+
+    @attr("fast")
+    def test_interacting_groups(self):
+        groups = interacting_groups(SPHERES, MEDIUM_WAVEVEC, index)
+        self.assertEqual(groups, [[0, 1], [2]])
+
+    @attr("fast")
+    def test_everything_interacts_at_zero_tolerance(self):
+        groups = interacting_groups(SPHERES, MEDIUM_WAVEVEC, index, 0)
+        self.assertEqual(groups, [[0, 1, 2]])
+
+    @attr("fast")
+    def test_groups_match_full_coupling_matrix(self):
+        random = np.random.RandomState(0)
+        centers = random.uniform(0, 50e-6, (40, 3))
+        spheres = Spheres([Sphere(n=1.59, r=.3e-6, center=c)
+                           for c in centers], warn=False)
+        coupling = coupling_strengths(spheres, MEDIUM_WAVEVEC, index)
+        groups = interacting_groups(spheres, MEDIUM_WAVEVEC, index, 0.02)
+        labels = np.empty(len(centers), dtype=int)
+        for label, group in enumerate(groups):
+            labels[group] = label
+        coupled = np.argwhere(coupling > 0.02)
+        assert_equal(labels[coupled[:, 0]], labels[coupled[:, 1]])
+        self.assertGreater(len(groups), 1)
+        self.assertLess(len(groups), len(centers))
+
+    @attr("fast")
+    def test_groups_by_distance_threshold(self):
+        groups = interacting_groups(SPHERES, MEDIUM_WAVEVEC, index,
+                                    threshold=0.1e-6)
+        self.assertEqual(groups, [[0, 1], [2]])
+        groups = interacting_groups(SPHERES, MEDIUM_WAVEVEC, index,
+                                    threshold=0.01e-6)
+        self.assertEqual(groups, [[0], [1], [2]])
+
+
+class TestCosts(unittest.TestCase):
+    @attr("fast")
+    def test_costs_grow_with_detector_size(self):
+        spheres = Spheres(DIMER, warn=False)
+        for cost in [mie_cost, multisphere_cost]:
+            self.assertLess(cost(spheres, MEDIUM_WAVEVEC, 100),
+                            cost(spheres, MEDIUM_WAVEVEC, 10000))
+
+    @attr("fast")
+    def test_multisphere_costs_more_than_mie(self):
+        spheres = Spheres(DIMER, warn=False)
+        self.assertLess(mie_cost(spheres, MEDIUM_WAVEVEC, 10000),
+                        multisphere_cost(spheres, MEDIUM_WAVEVEC, 10000))
+
+    @attr("fast")
+    def test_multisphere_cost_infinite_beyond_compiled_limits(self):
+        many = Spheres([Sphere(n=1.59, r=.5e-6, center=(2e-6 * i, 0, 10e-6))
+                        for i in range(MULTISPHERE_MAX_SPHERES + 1)])
+        self.assertEqual(multisphere_cost(many, MEDIUM_WAVEVEC, 1), np.inf)
+        spread = Spheres([Sphere(n=1.59, r=.5e-6, center=(0, 0, 10e-6)),
+                          Sphere(n=1.59, r=.5e-6, center=(20e-6, 0, 10e-6))])
+        self.assertEqual(multisphere_cost(spread, MEDIUM_WAVEVEC, 1), np.inf)
+
+    @attr("fast")
+    def test_clustered_cost_is_sum_over_groups(self):
+        cost = clustered_cost(SPHERES, [[0, 1], [2]], MEDIUM_WAVEVEC, 100)
+        expected = (multisphere_cost(Spheres(DIMER), MEDIUM_WAVEVEC, 100) +
+                    mie_cost(Spheres([ISOLATED]), MEDIUM_WAVEVEC, 100))
+        self.assertAlmostEqual(cost, expected)
+
+
+class TestClusteredMultisphere(unittest.TestCase):
+    @attr("fast")
+    def test_can_handle(self):
+        theory = ClusteredMultisphere()
+        self.assertTrue(theory._can_handle(ISOLATED))
+        self.assertTrue(theory._can_handle(SPHERES))
+
+    @attr("medium")
+    def test_single_group_matches_multisphere(self):
+        dimer = Spheres(DIMER, warn=False)
+        holo = calc_holo(SCHEMA, dimer, theory=ClusteredMultisphere())
+        expected = calc_holo(SCHEMA, dimer, theory=Multisphere())
+        assert_allclose(holo, expected)
+
+    @attr("medium")
+    def test_isolated_spheres_match_mie(self):
+        spheres = Spheres([ISOLATED, DIMER[0]], warn=False)
+        holo = calc_holo(SCHEMA, spheres, theory=ClusteredMultisphere())
+        expected = calc_holo(SCHEMA, spheres,
+                             theory=Mie(compute_escat_radial=False))
+        assert_allclose(holo, expected)
+
+    @attr("medium")
+    def test_superposes_groups(self):
+        field = calc_field(SCHEMA, SPHERES, theory=ClusteredMultisphere())
+        dimer = calc_field(SCHEMA, Spheres(DIMER), theory=Multisphere())
+        isolated = calc_field(SCHEMA, ISOLATED,
+                              theory=Mie(compute_escat_radial=False))
+        assert_allclose(field, dimer + isolated)
+
+    @attr("medium")
+    def test_parallel_matches_serial(self):
+        serial = calc_field(SCHEMA, SPHERES, theory=ClusteredMultisphere())
+        pool = multiprocessing.Pool(2)
+        try:
+            parallel = calc_field(
+                SCHEMA, SPHERES, theory=ClusteredMultisphere(parallel=pool))
+        finally:
+            pool.close()
+        assert_allclose(parallel, serial)
+
+    @attr("medium")
+    def test_processes_are_started_once(self):
+        serial = calc_field(SCHEMA, SPHERES, theory=ClusteredMultisphere())
+        theory = ClusteredMultisphere(parallel=2)
+        try:
+            first = calc_field(SCHEMA, SPHERES, theory=theory)
+            pool = theory._pool
+            second = calc_field(SCHEMA, SPHERES, theory=theory)
+            self.assertIs(theory._pool, pool)
+            self.assertTrue(pool.running)
+            unpickled = pickle.loads(pickle.dumps(theory))
+            self.assertNotIn('_pool', unpickled.__dict__)
+        finally:
+            theory.close()
+        self.assertFalse(pool.running)
+        assert_allclose(first, serial)
+        assert_allclose(second, serial)
+
+    @attr("medium")
+    def test_context_manager_closes_processes(self):
+        with ClusteredMultisphere(parallel=2) as theory:
+            calc_field(SCHEMA, SPHERES, theory=theory)
+            pool = theory._pool
+            self.assertTrue(pool.running)
+        self.assertFalse(pool.running)
+        self.assertNotIn('_pool', theory.__dict__)
+
+    @attr("medium")
+    def test_processes_closed_when_theory_is_collected(self):
+        theory = ClusteredMultisphere(parallel=2)
+        calc_field(SCHEMA, SPHERES, theory=theory)
+        pool = theory._pool
+        del theory
+        gc.collect()
+        self.assertFalse(pool.running)
+
+    @attr("medium")
+    def test_serial_inside_worker_processes(self):
+        theory = ClusteredMultisphere(parallel=2)
+        with WorkerPool(1) as pool:
+            field, = pool.map(_field_in_worker, [theory])
+        self.assertNotIn('_pool', theory.__dict__)
+        assert_allclose(field, calc_field(SCHEMA, SPHERES,
+                                          theory=ClusteredMultisphere()))
+
+    @attr("medium")
+    def test_group_too_large_for_multisphere_uses_mie(self):
+        chain = Spheres([Sphere(n=1.59, r=.5e-6, center=(1.05e-6 * i, 0, 1e-5))
+                         for i in range(MULTISPHERE_MAX_SPHERES + 1)])
+        theory = ClusteredMultisphere(threshold=0.2e-6)
+        with self.assertWarns(UserWarning):
+            field = calc_field(SCHEMA, chain, theory=theory)
+        expected = calc_field(SCHEMA, chain, theory=theory.mie)
+        assert_allclose(field, expected)
+
+    @attr("fast")
+    def test_yaml_round_trip(self):
+        theory = ClusteredMultisphere(tolerance=1e-3, threshold=1e-7)
+        loaded = yaml.load(yaml.dump(theory), Loader=FullLoader)
+        self.assertEqual(theory, loaded)
+
+
+def _field_in_worker(theory):
+    return calc_field(SCHEMA, SPHERES, theory=theory)
+
+
+if __name__ == '__main__':
+    unittest.main()
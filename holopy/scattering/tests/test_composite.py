@@ -6,6 +6,8 @@ from nose.plugins.attrib import attr
 
 import holopy as hp
 from holopy.scattering import Sphere, Spheres
+from holopy.scattering.scatterer import Scatterers
+from holopy.scattering.scatterer.composite import _parameter_layout
 from holopy.inference.prior import Uniform
 
 class TestBasicMethods(unittest.TestCase):
@@ -24,6 +26,34 @@ class TestBasicMethods(unittest.TestCase):
         spheres = spheres.from_parameters(spheres.parameters)
         self.assertEqual(spheres.warn, "TEST")
 
+    @attr("fast")
+    def test_from_parameters_with_some_parameters(self):
+        spheres = Spheres([Sphere(n=1.59, r=0.5, center=[i, 0, 0])
+                           for i in range(3)])
+        new = spheres.from_parameters({'1:r': 0.3, '2:n': 1.4})
+        self.assertEqual(new.r.tolist(), [0.5, 0.3, 0.5])
+        self.assertEqual(new.n.tolist(), [1.59, 1.59, 1.4])
+        self.assertEqual(new.centers.tolist(), spheres.centers.tolist())
+
+    @attr("fast")
+    def test_from_parameters_of_nested_composites(self):
+        inner = Spheres([Sphere(n=1.59, r=0.5, center=[i, 0, 0])
+                         for i in range(2)])
+        outer = Scatterers([inner, Sphere(n=1.4, r=0.2, center=[5, 5, 5])])
+        parameters = outer.parameters
+        parameters['0:1:r'] = 0.3
+        new = outer.from_parameters(parameters)
+        self.assertEqual(new.scatterers[0].r.tolist(), [0.5, 0.3])
+        self.assertEqual(new.scatterers[1], outer.scatterers[1])
+
+
+class TestParameterLayout(unittest.TestCase):
+    @attr("fast")
+    def test_splits_component_index(self):
+        layout = _parameter_layout(('0:r', '12:center', '1:0:n', 'other'))
+        self.assertEqual(layout, ((0, 'r'), (12, 'center'), (1, '0:n'),
+                                  (None, None)))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -25,12 +25,17 @@ calc_intensity and calc_holo, based on subclass's calc_field
 import unittest
 import warnings
 
+import yaml
+
 from nose.plugins.attrib import attr
 
 from holopy.scattering import (Sphere, Spheres, Mie, Multisphere,
                                Spheroid, Cylinder, Tmatrix)
+from holopy.scattering.theory import ClusteredMultisphere, AutoFast
 from holopy.core import detector_grid
+from holopy.core.holopy_object import FullLoader
 from holopy.core.tests.common import assert_obj_close
+from holopy.core.profiling import Profiler
 from holopy.scattering.interface import *
 from holopy.scattering.errors import MissingParameter
 
@@ -108,6 +113,35 @@ class TestInterface(unittest.TestCase):
         holo = scattered_field_to_hologram(scat, ref)
         self.assertEqual(holo.values.mean(), correct_holo.values.mean())
 
+    @attr('fast')
+    def test_calc_holo_batch_matches_calc_holo(self):
+        detector = detector_grid(shape=8, spacing=0.3)
+        scatterers = [SCATTERER.translated(-3, -3, 0),
+                      Sphere(n=1.5, r=.3, center=(1, 1, 4))]
+        scaling = [0.8, 0.9]
+        result = calc_holo_batch(detector, scatterers, MED_INDEX, WAVELEN, POL,
+                                 scaling=scaling)
+        self.assertEqual(result.dims[0], 'batch')
+        for holo, scatterer, alpha in zip(result, scatterers, scaling):
+            expected = calc_holo(detector, scatterer, MED_INDEX, WAVELEN, POL,
+                                 scaling=alpha)
+            self.assertTrue(np.allclose(holo.values, expected.values))
+
+    @attr('fast')
+    def test_calc_holo_batch_requires_center(self):
+        self.assertRaises(MissingParameter, calc_holo_batch, LOCATIONS,
+                          [Sphere(n=1.6, r=.5)], MED_INDEX, WAVELEN, POL)
+
+    @attr('fast')
+    def test_calc_holo_records_stages(self):
+        with Profiler() as profiler:
+            calc_holo(LOCATIONS, SCATTERER, MED_INDEX, WAVELEN, POL)
+        stages = {record.name for record in profiler.records}
+        expected = {'interpret_theory', 'prep_schema',
+                    'calculate_scattered_field', 'scattering coefficients',
+                    'field kernel', 'scattered_field_to_hologram', 'finalize'}
+        self.assertTrue(expected.issubset(stages))
+
 
 class TestDetermineDefaultTheoryFor(unittest.TestCase):
     @attr('fast')
@@ -194,5 +228,85 @@ class TestInterpretTheory(unittest.TestCase):
         theory_ok = type(theory) == Mie
         self.assertTrue(theory_ok)
 
+    @attr('fast')
+    def test_interpret_auto_fast_theory(self):
+        schema = prep_schema(LOCATIONS, MED_INDEX, WAVELEN, POL)
+        theory = interpret_theory(SCATTERER, 'auto-fast', schema)
+        self.assertEqual(type(theory), Mie)
+
+
+class TestDetermineFastTheoryFor(unittest.TestCase):
+    def setUp(self):
+        self.schema = prep_schema(
+            detector_grid(shape=64, spacing=.1), MED_INDEX, WAVELEN, POL)
+        self.dimer = [Sphere(n=1.59, r=.5, center=(3, 3, 10)),
+                      Sphere(n=1.59, r=.5, center=(4.05, 3, 10))]
+        self.isolated = [Sphere(n=1.59, r=.5, center=(23, 3, 10)),
+                         Sphere(n=1.59, r=.5, center=(3, 23, 10))]
+
+    @attr('fast')
+    def test_sphere_uses_default_theory(self):
+        theory = determine_fast_theory_for(SCATTERER, self.schema)
+        self.assertEqual(type(theory), Mie)
+
+    @attr('fast')
+    def test_no_detector_uses_default_theory(self):
+        theory = determine_fast_theory_for(Spheres(self.dimer), None)
+        self.assertEqual(type(theory), Multisphere)
+
+    @attr('fast')
+    def test_isolated_spheres_use_mie(self):
+        theory = determine_fast_theory_for(
+            Spheres(self.isolated), self.schema)
+        self.assertEqual(type(theory), Mie)
+
+    @attr('fast')
+    def test_touching_spheres_use_multisphere(self):
+        theory = determine_fast_theory_for(Spheres(self.dimer), self.schema)
+        self.assertEqual(type(theory), Multisphere)
+
+    @attr('fast')
+    def test_sparse_cluster_uses_clustered_multisphere(self):
+        spheres = Spheres(self.dimer + self.isolated)
+        theory = determine_fast_theory_for(spheres, self.schema)
+        self.assertEqual(type(theory), ClusteredMultisphere)
+
+    @attr('fast')
+    def test_tolerance_is_passed_to_theory(self):
+        spheres = Spheres(self.dimer + self.isolated)
+        theory = determine_fast_theory_for(spheres, self.schema, 0.05)
+        self.assertEqual(theory.tolerance, 0.05)
+
+    @attr('fast')
+    def test_auto_fast_tolerance(self):
+        dimer = Spheres(self.dimer)
+        strict = interpret_theory(dimer, AutoFast(), self.schema)
+        self.assertEqual(type(strict), Multisphere)
+        loose = interpret_theory(dimer, AutoFast(tolerance=1), self.schema)
+        self.assertEqual(type(loose), Mie)
+        self.assertEqual(type(interpret_theory(dimer, AutoFast, self.schema)),
+                         Multisphere)
+
+    @attr('fast')
+    def test_auto_fast_yaml_round_trip(self):
+        theory = AutoFast(tolerance=1e-3)
+        self.assertEqual(yaml.load(yaml.dump(theory), Loader=FullLoader),
+                         theory)
+
+    @attr('fast')
+    def test_logs_choice(self):
+        with self.assertLogs('holopy.scattering.interface', 'INFO') as logs:
+            determine_fast_theory_for(Spheres(self.dimer), self.schema)
+        self.assertIn('Multisphere', logs.output[0])
+
+    @attr('fast')
+    def test_falls_back_to_mie_beyond_multisphere_limits(self):
+        touching = [Sphere(n=1.59, r=.5, center=(1.05 * i, 3, 10))
+                    for i in range(25)]
+        with self.assertWarns(UserWarning):
+            theory = determine_fast_theory_for(
+                Spheres(touching), self.schema)
+        self.assertEqual(type(theory), Mie)
+
 if __name__ == '__main__':
     unittest.main()
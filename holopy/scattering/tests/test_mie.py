@@ -390,3 +390,55 @@ def test_j0_roots():
     h_close = calc_field(d,s_close)
 
     np.testing.assert_allclose(h_exact, h_close)
+
+
+TRUNCATION_SCHEMA = update_metadata(
+    detector_grid(shape=64, spacing=.5e-6), illum_wavelen=wavelen,
+    medium_index=index, illum_polarization=xpolarization)
+SMALL_SPHERES = Spheres([Sphere(n=1.59, r=.2e-6, center=(5e-6, 5e-6, 5e-6)),
+                         Sphere(n=1.59, r=.2e-6, center=(25e-6, 25e-6, 5e-6))])
+
+
+@attr('fast')
+def test_truncation_radius():
+    flat_schema = TRUNCATION_SCHEMA.stack(flat=('x', 'y', 'z'))
+    small = Mie(truncation_tolerance=1e-2)._truncation_radius(
+        SMALL_SPHERES.scatterers[0], flat_schema)
+    smaller = Mie(truncation_tolerance=3e-2)._truncation_radius(
+        SMALL_SPHERES.scatterers[0], flat_schema)
+    assert 0 < smaller < small < 32e-6
+    nothing = Mie(truncation_tolerance=1)._truncation_radius(
+        SMALL_SPHERES.scatterers[0], flat_schema)
+    assert_equal(nothing, 0)
+
+
+@attr('fast')
+def test_truncation_radius_infinite_below_scatterer():
+    flat_schema = TRUNCATION_SCHEMA.stack(flat=('x', 'y', 'z'))
+    below = Sphere(n=1.59, r=.2e-6, center=(5e-6, 5e-6, -5e-6))
+    radius = Mie(truncation_tolerance=1e-2)._truncation_radius(
+        below, flat_schema)
+    assert_equal(radius, np.inf)
+
+
+@attr('medium')
+def test_truncated_superposition_within_tolerance():
+    tolerance = 1e-3
+    full = calc_field(TRUNCATION_SCHEMA, SMALL_SPHERES, theory=Mie())
+    truncated = calc_field(TRUNCATION_SCHEMA, SMALL_SPHERES,
+                           theory=Mie(truncation_tolerance=tolerance))
+    difference = np.abs(truncated - full)
+    assert difference.max() < tolerance
+    # pixels far from both spheres are skipped
+    assert (difference > 0).any()
+
+
+@attr('medium')
+def test_truncated_superposition_on_detector_points():
+    detector = detector_points(x=[5e-6, 25e-6], y=[5e-6, 25e-6], z=0)
+    full = calc_field(detector, SMALL_SPHERES, index, wavelen, xpolarization,
+                      theory=Mie())
+    truncated = calc_field(detector, SMALL_SPHERES, index, wavelen,
+                           xpolarization,
+                           theory=Mie(truncation_tolerance=1e-3))
+    assert_allclose(truncated, full, atol=1e-3)
@@ -38,7 +38,7 @@ import scipy
 from holopy.core.metadata import detector_points
 from holopy.scattering import (
     calc_holo, calc_scat_matrix, calc_cross_sections, Multisphere, Sphere,
-    Spheres)
+    Spheres, SphereArray)
 from holopy.scattering.errors import (
     InvalidScatterer, TheoryNotCompatibleError, MultisphereFailure,
     OverlapWarning)
@@ -251,6 +251,18 @@ def test_wrap_sphere():
     assert_array_equal(holo,holo_w)
 
 
+@attr('medium')
+def test_sphere_array_matches_spheres():
+    sc = Spheres(scatterers=[Sphere(center=[7.1e-6, 7e-6, 10e-6],
+                                    n=1.5811+1e-4j, r=5e-07),
+                             Sphere(center=[6e-6, 7e-6, 10e-6],
+                                    n=1.5811+1e-4j, r=5e-07)])
+    holo = calc_holo(schema, sc, theory=Multisphere, scaling=.6)
+    holo_array = calc_holo(schema, SphereArray.from_spheres(sc),
+                           theory=Multisphere, scaling=.6)
+    assert_array_equal(holo, holo_array)
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -131,6 +131,18 @@ def test_from_parameters():
     assert_equal(s_prior.from_parameters(pars), s_new_nr)
 
 
+def test_from_parameters_copies_unchanged_values():
+    sphere = Sphere(n=1.6, r=0.5, center=[10, 10, 10])
+    new = sphere.from_parameters({'r': 0.7})
+    assert_equal(new.r, 0.7)
+    new.center[0] = 99
+    assert_equal(sphere.center, [10, 10, 10])
+    layered = Sphere(n=[1.6, 1.5], r=[0.5, 0.6], center=[10, 10, 10])
+    new = layered.from_parameters({'n': [1.7, 1.5]})
+    new.r[0] = 0.1
+    assert_equal(layered.r, [0.5, 0.6])
+
+
 @attr('fast')
 def test_Composite_construction():
     # empty composite
@@ -7,6 +7,7 @@ from nose.plugins.attrib import attr
 
 from holopy.core import detector_grid, detector_points
 from holopy.core.metadata import update_metadata, flat
+from holopy.core.profiling import Profiler
 from holopy.scattering.theory.scatteringtheory import ScatteringTheory
 from holopy.scattering.theory import Mie
 from holopy.scattering.scatterer import Sphere, Spheres, Ellipsoid
@@ -306,6 +307,19 @@ class TestScatteringTheory(unittest.TestCase):
         self.assertTrue(
             np.allclose(fields02.values, 2 * fields01.values, **TOLS))
 
+    @attr("fast")
+    def test_calculate_scattered_field_records_stages(self):
+        theory = MockTheory()
+        with Profiler(track_memory=False) as profiler:
+            theory.calculate_scattered_field(SPHERES, XSCHEMA)
+        calls = {}
+        for record in profiler.records:
+            calls[record.name] = calls.get(record.name, 0) + 1
+        self.assertEqual(calls, {
+            'calculate_scattered_field': 1, 'superposition': 1,
+            '_transform_to_desired_coordinates': 2, '_raw_fields': 2,
+            '_pack_field_into_xarray': 1})
+
 
 class TestMockTheory(unittest.TestCase):
     @attr("fast")
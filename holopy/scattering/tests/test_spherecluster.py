@@ -28,7 +28,8 @@ from holopy.core.tests.common import assert_obj_close
 from nose.plugins.attrib import attr
 from nose.tools import raises
 
-from holopy.scattering.scatterer import Sphere, Ellipsoid, Spheres, RigidCluster
+from holopy.scattering.scatterer import (
+    Sphere, Ellipsoid, Spheres, SphereArray, RigidCluster)
 from holopy.scattering.errors import InvalidScatterer, OverlapWarning
 
 import warnings
@@ -150,3 +151,118 @@ def test_RigidCluster():
 
     # test parameters, from_parameters
     assert_obj_close(trc.from_parameters(trc.parameters), trans)
+
+
+def _random_spheres(nspheres, size, radius=0.5, seed=0):
+    centers = np.random.RandomState(seed).uniform(0, size, (nspheres, 3))
+    return Spheres([Sphere(n=1.59, r=radius, center=c) for c in centers],
+                   warn=False)
+
+
+def _brute_force_overlaps(spheres):
+    overlaps = []
+    largest = 0
+    for i, s1 in enumerate(spheres.scatterers):
+        for j in range(i + 1, len(spheres.scatterers)):
+            s2 = spheres.scatterers[j]
+            gap = s1.r + s2.r - np.linalg.norm(np.subtract(s1.center,
+                                                           s2.center))
+            largest = max(largest, gap)
+            if gap > 0:
+                overlaps.append((i, j))
+    return overlaps, largest
+
+
+@attr("fast")
+def test_Spheres_overlaps_match_pairwise_check():
+    spheres = _random_spheres(200, 20)
+    overlaps, largest = _brute_force_overlaps(spheres)
+    assert len(overlaps) > 0
+    assert_equal(spheres.overlaps, overlaps)
+    assert_almost_equal(spheres.largest_overlap(), largest)
+
+
+@attr("fast")
+def test_SphereArray_roundtrips_Spheres():
+    s1 = Sphere(n=1.59, r=5e-7, center=(1e-6, -1e-6, 10e-6))
+    s2 = Sphere(n=1.59+0.0001j, r=1e-6, center=(0, 0, 0))
+    spheres = Spheres([s1, s2])
+    array = SphereArray.from_spheres(spheres)
+    assert_equal(array.n, spheres.n)
+    assert_equal(array.r, spheres.r)
+    assert_equal(array.centers, spheres.centers)
+    assert_equal(array.center, spheres.center)
+    assert_obj_close(array.scatterers, spheres.scatterers)
+    assert_obj_close(array.to_spheres(), spheres)
+    assert_equal(len(array), 2)
+    assert_obj_close(array[1], s2)
+    assert_obj_close(array[:1].scatterers, [s1])
+
+
+@attr("fast")
+def test_SphereArray_broadcasts_scalar_properties():
+    array = SphereArray(1.59, 0.5, [[0, 0, 0], [2, 0, 0], [0, 2, 0]])
+    assert_equal(array.n, [1.59] * 3)
+    assert_equal(array.r, [0.5] * 3)
+    assert_raises(InvalidScatterer, SphereArray, [1.59, 1.6], 0.5,
+                  [[0, 0, 0], [2, 0, 0], [0, 2, 0]])
+    assert_raises(InvalidScatterer, SphereArray, 1.59, 0.5, [[0, 0], [2, 0]])
+
+
+@attr("fast")
+def test_SphereArray_rejects_layered_spheres():
+    layered = Spheres([Sphere(n=(1.59, 1.4), r=(0.3, 0.5), center=(0, 0, 0))])
+    assert_raises(InvalidScatterer, SphereArray.from_spheres, layered)
+    array = SphereArray(1.59, 0.5, [[0, 0, 0]])
+    assert_raises(InvalidScatterer, array.add, layered.scatterers[0])
+
+
+@attr("fast")
+def test_SphereArray_overlaps():
+    spheres = _random_spheres(200, 20)
+    array = SphereArray.from_spheres(spheres)
+    assert_equal(array.overlaps, spheres.overlaps)
+    assert_almost_equal(array.largest_overlap(), spheres.largest_overlap())
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        SphereArray(array.n, array.r, array.centers)
+        assert len(w) > 0
+
+
+@attr("fast")
+def test_SphereArray_add():
+    array = SphereArray(1.59, 0.5, [[0, 0, 0]])
+    array.add(Sphere(n=1.4, r=0.2, center=(3, 0, 0)))
+    assert_equal(len(array), 2)
+    assert_obj_close(array[1], Sphere(n=1.4, r=0.2, center=(3, 0, 0)))
+
+
+@attr("fast")
+def test_SphereArray_parameters():
+    spheres = Spheres([Sphere(n=1.59, r=5e-7, center=(1e-6, -1e-6, 10e-6)),
+                       Sphere(n=1.59, r=1e-6, center=(0, 0, 0))])
+    array = SphereArray.from_spheres(spheres)
+    assert_equal(array.parameters, spheres.parameters)
+    new_parameters = {'0:r': 3e-7, '1:n': 1.4+0.001j, '1:center': (1, 2, 3)}
+    assert_obj_close(array.from_parameters(new_parameters).to_spheres(),
+                     spheres.from_parameters(new_parameters))
+    assert_obj_close(array.from_parameters(array.parameters), array)
+
+
+@attr("fast")
+def test_SphereArray_translation_and_rotation():
+    spheres = Spheres([Sphere(n=1.59, r=0.5, center=(1, 0, 0)),
+                       Sphere(n=1.59, r=0.5, center=(-1, 0, 0)),
+                       Sphere(n=1.59, r=0.5, center=(0, 2, 1))])
+    array = SphereArray.from_spheres(spheres)
+    assert_obj_close(array.translated(1, 2, 3).to_spheres(),
+                     spheres.translated(1, 2, 3))
+    assert_obj_close(array.rotated(np.pi/4, np.pi/2, 0).to_spheres(),
+                     spheres.rotated(np.pi/4, np.pi/2, 0))
+
+
+@attr("fast")
+def test_SphereArray_yaml_roundtrip():
+    from holopy.core.tests.common import assert_read_matches_write
+    array = SphereArray([1.59, 1.59+0.001j], 0.5, [[0, 0, 0], [2, 0, 0]])
+    assert_read_matches_write(array)
@@ -28,9 +28,15 @@ All theories have a common interface defined by
 .. moduleauthor:: Vinothan N. Manoharan <vnm@seas.harvard.edu>
 '''
 
-from holopy.scattering.theory.mie import Mie
-from holopy.scattering.theory.mielens import MieLens
-from holopy.scattering.theory.multisphere import Multisphere
-from holopy.scattering.theory.lens import Lens
-from holopy.scattering.theory.dda import DDA
-from holopy.scattering.theory.tmatrix import Tmatrix
+from holopy.core.lazy import lazy_import
+
+__getattr__, __dir__ = lazy_import(__name__, {
+    'Mie': 'holopy.scattering.theory.mie',
+    'MieLens': 'holopy.scattering.theory.mielens',
+    'Multisphere': 'holopy.scattering.theory.multisphere',
+    'ClusteredMultisphere': 'holopy.scattering.theory.clustered',
+    'AutoFast': 'holopy.scattering.theory.clustered',
+    'Lens': 'holopy.scattering.theory.lens',
+    'DDA': 'holopy.scattering.theory.dda',
+    'Tmatrix': 'holopy.scattering.theory.tmatrix',
+    })
@@ -0,0 +1,399 @@
+# Copyright 2011-2016, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Scattering from sparse sphere clusters, treating only strongly coupled
+spheres with multiple scattering.
+
+Spheres whose mutual coupling is below a tolerance are computed
+independently with Mie theory; interacting groups of spheres are solved
+with Multisphere. Also provides the coupling and cost estimates behind
+the 'auto-fast' theory choice.
+"""
+import weakref
+from warnings import warn
+
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from holopy.core.holopy_object import HoloPyObject
+from holopy.core.utils import choose_pool
+from holopy.core.parallel import (
+    WorkerPool, in_worker_process, _chooses_mpi, _starts_process_pool)
+from holopy.scattering.scatterer import Sphere, Spheres
+from holopy.scattering.theory.scatteringtheory import ScatteringTheory
+from holopy.scattering.theory.mie import Mie
+from holopy.scattering.theory.multisphere import Multisphere
+try:
+    from holopy.scattering.theory.mie_f import mieangfuncs
+except ImportError:
+    pass
+
+DEFAULT_COUPLING_TOLERANCE = 1e-2
+
+# limits compiled into Multisphere's fortran, see scfodim.for
+MULTISPHERE_MAX_SPHERES = 20
+MULTISPHERE_MAX_ORDER = 70
+
+# Rough cost of each step in seconds, fit to timings of the field kernels
+# and of amncalc for polystyrene spheres in water. Only the relative sizes
+# matter for choosing a theory.
+_MIE_COST_PER_POINT = 5e-6
+_MIE_COST_PER_POINT_AND_ORDER = 3e-8
+_MULTISPHERE_COST_PER_POINT = 1e-5
+_MULTISPHERE_COST_PER_POINT_AND_TERM = 3e-8
+_MULTISPHERE_SOLVE_COST = 2.5e-9
+
+_N_ANGLES = 91
+
+
+def expansion_order(size_parameter):
+    """Number of multipole orders needed for a given size parameter"""
+    return np.round(size_parameter + 4.05 * size_parameter**(1/3) + 2)
+
+
+def coupling_strengths(spheres, medium_wavevec, medium_index):
+    """
+    Estimate how strongly each sphere's scattered field excites the others
+
+    The coupling from sphere j to sphere i is the amplitude of the field
+    scattered by j at the position of i relative to the incident field,
+    |S_j(theta_ij)| / (k d_ij), where theta_ij is the scattering angle
+    from j towards i. This is roughly the relative error in the field
+    scattered by i made by neglecting multiple scattering between them.
+
+    Parameters
+    ----------
+    spheres : :class:`.Spheres`
+        spheres with scalar radius and index
+    medium_wavevec : float
+    medium_index : float
+
+    Returns
+    -------
+    coupling : (N, N) ndarray
+        symmetrized coupling between each pair of spheres
+    """
+    nspheres = len(spheres.scatterers)
+    pairs = np.array(np.triu_indices(nspheres, 1)).T
+    amplitudes = _amplitude_tables(spheres, medium_wavevec, medium_index)
+    coupling = np.zeros((nspheres, nspheres))
+    coupling[pairs[:, 0], pairs[:, 1]] = _pair_coupling(
+        spheres.centers, amplitudes, pairs, medium_wavevec)
+    return np.maximum(coupling, coupling.T)
+
+
+def interacting_groups(spheres, medium_wavevec, medium_index,
+                       tolerance=DEFAULT_COUPLING_TOLERANCE, threshold=None):
+    """
+    Partition spheres into groups connected by strong coupling
+
+    Candidate pairs are found with a KD-tree, so sparse fields of many
+    spheres only estimate the coupling of nearby pairs.
+
+    Parameters
+    ----------
+    spheres : :class:`.Spheres`
+    medium_wavevec : float
+    medium_index : float
+    tolerance : float
+        pairs with a larger coupling (see :func:`coupling_strengths`)
+        interact
+    threshold : float (optional)
+        if given, pairs interact if the gap between their surfaces is
+        smaller than threshold instead, regardless of tolerance
+
+    Returns
+    -------
+    groups : list of lists of int
+        indices of the spheres in each group, in order of their first sphere
+    """
+    centers = np.asarray(spheres.centers, dtype=float)
+    radii = np.array([s.r for s in spheres.scatterers], dtype=float)
+    if threshold is not None:
+        pairs = _pairs_within(centers, threshold + 2 * radii.max())
+        distance = np.sqrt(
+            ((centers[pairs[:, 0]] - centers[pairs[:, 1]])**2).sum(axis=1))
+        gap = distance - radii[pairs[:, 0]] - radii[pairs[:, 1]]
+        pairs = pairs[gap < threshold]
+    else:
+        amplitudes = _amplitude_tables(spheres, medium_wavevec, medium_index)
+        # no pair further apart than this can be coupled above tolerance
+        cutoff = (amplitudes.max() / (medium_wavevec * tolerance)
+                  if tolerance > 0 else np.inf)
+        pairs = _pairs_within(centers, cutoff)
+        coupling = _pair_coupling(centers, amplitudes, pairs, medium_wavevec)
+        pairs = pairs[coupling > tolerance]
+
+    nspheres = len(centers)
+    adjacency = csr_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])),
+                           shape=(nspheres, nspheres))
+    _, labels = connected_components(adjacency, directed=False)
+    groups = {}
+    for index, label in enumerate(labels):
+        groups.setdefault(label, []).append(index)
+    return list(groups.values())
+
+
+def _pairs_within(centers, distance):
+    if np.isinf(distance):
+        return np.array(np.triu_indices(len(centers), 1)).T
+    return cKDTree(centers).query_pairs(distance, output_type='ndarray')
+
+
+def _amplitude_tables(spheres, medium_wavevec, medium_index):
+    # largest scattering amplitude of each sphere on a grid of angles
+    angles = np.linspace(0, np.pi, _N_ANGLES)
+    tables = {}
+    for sphere in spheres.scatterers:
+        key = (sphere.r, sphere.n)
+        if key not in tables:
+            scat_coeffs = Mie()._scat_coeffs(
+                sphere, medium_wavevec, medium_index)
+            tables[key] = [
+                np.abs(mieangfuncs.asm_mie_far(scat_coeffs, theta)).max()
+                for theta in angles]
+    return np.array([tables[(s.r, s.n)] for s in spheres.scatterers])
+
+
+def _pair_coupling(centers, amplitudes, pairs, medium_wavevec):
+    # symmetrized coupling of each pair (i, j), see coupling_strengths
+    i, j = pairs.T
+    separation = centers[i] - centers[j]
+    distance = np.sqrt((separation**2).sum(axis=1))
+    # light propagates along -z, so scattering from j towards i is at
+    # cos(theta) = -dz / d
+    costheta = np.clip(-separation[:, 2] / distance, -1, 1)
+    j_to_i = _interpolate(amplitudes[j], np.arccos(costheta))
+    i_to_j = _interpolate(amplitudes[i], np.arccos(-costheta))
+    return np.maximum(j_to_i, i_to_j) / (medium_wavevec * distance)
+
+
+def _interpolate(tables, theta):
+    position = theta / np.pi * (_N_ANGLES - 1)
+    lower = np.minimum(position.astype(int), _N_ANGLES - 2)
+    fraction = position - lower
+    rows = np.arange(len(tables))
+    return ((1 - fraction) * tables[rows, lower] +
+            fraction * tables[rows, lower + 1])
+
+
+def mie_cost(spheres, medium_wavevec, npoints):
+    """Estimated time to compute Mie superposition fields of spheres"""
+    orders = expansion_order(medium_wavevec * _radii(spheres))
+    return npoints * np.sum(
+        _MIE_COST_PER_POINT + _MIE_COST_PER_POINT_AND_ORDER * orders)
+
+
+def multisphere_cost(spheres, medium_wavevec, npoints):
+    """
+    Estimated time to compute Multisphere fields of spheres
+
+    Returns infinity for clusters beyond Multisphere's compiled limits on
+    the number of spheres and the order of the cluster expansion.
+    """
+    nspheres = len(spheres.scatterers)
+    if nspheres > MULTISPHERE_MAX_SPHERES:
+        return np.inf
+    radii = _radii(spheres)
+    centers = spheres.centers
+    extent = np.sqrt(((centers - centers.mean(0))**2).sum(axis=1)) + radii
+    cluster_order = expansion_order(medium_wavevec * extent.max())
+    if cluster_order > MULTISPHERE_MAX_ORDER:
+        # the cluster expansion would be truncated
+        return np.inf
+    sphere_order = expansion_order(medium_wavevec * radii.max())
+    solve = _MULTISPHERE_SOLVE_COST * nspheres**2 * sphere_order**4.5
+    fields = npoints * (_MULTISPHERE_COST_PER_POINT +
+                        _MULTISPHERE_COST_PER_POINT_AND_TERM *
+                        cluster_order**2)
+    return solve + fields
+
+
+def clustered_cost(spheres, groups, medium_wavevec, npoints):
+    """Estimated time to compute fields group by group, see `groups`"""
+    return sum(_group_cost(_select(spheres, group), medium_wavevec, npoints)
+               for group in groups)
+
+
+def _group_cost(group, medium_wavevec, npoints):
+    if len(group.scatterers) == 1:
+        return mie_cost(group, medium_wavevec, npoints)
+    return multisphere_cost(group, medium_wavevec, npoints)
+
+
+def _radii(spheres):
+    return np.array([s.r for s in spheres.scatterers], dtype=float)
+
+
+def _select(spheres, indices):
+    return Spheres([spheres.scatterers[i] for i in indices], warn=False)
+
+
+class ClusteredMultisphere(ScatteringTheory):
+    """
+    Multiple scattering within groups of nearby spheres only.
+
+    Spheres are partitioned into groups linked by a coupling (see
+    :func:`coupling_strengths`) larger than `tolerance`, or alternatively
+    by surface to surface distances below `threshold`. Each group of more
+    than one sphere is solved with Multisphere, isolated spheres with Mie,
+    and the fields of all groups are superposed. For fields of view with a
+    few touching particles among many isolated ones this is much cheaper
+    than Multisphere for all spheres, and unlike plain Mie superposition it
+    keeps the coupling within clusters. Multisphere can only solve groups of
+    up to 20 spheres; larger groups are computed with Mie and a warning.
+
+    Parameters
+    ----------
+    tolerance : float
+        Coupling below which multiple scattering between two spheres is
+        neglected. This is roughly the relative error accepted in the
+        scattered field of each sphere.
+    threshold : float (optional)
+        If given, spheres closer than threshold surface to surface are
+        grouped together instead, regardless of tolerance.
+    multisphere : :class:`.Multisphere` (optional)
+        theory for groups of spheres, defaults to Multisphere()
+    mie : :class:`.Mie` (optional)
+        theory for isolated spheres, defaults to
+        Mie(compute_escat_radial=False) for consistency with Multisphere
+    parallel : optional
+        number of processes to use or pool object or one of {None, 'all',
+        'auto', 'mpi'} to compute the fields of different groups in parallel.
+        Processes are started the first time they are needed and reused for
+        later fields. They keep running until :meth:`close` is called, the
+        theory is used as a context manager and its block ends, or the
+        theory is garbage collected. Pools passed in are left open. Inside
+        the worker processes of another pool, fields are computed serially.
+
+    Examples
+    --------
+    >>> with ClusteredMultisphere(parallel=4) as theory:
+    ...     holos = [calc_holo(detector, spheres, theory=theory)
+    ...              for spheres in clusters]
+    """
+    def __init__(self, tolerance=DEFAULT_COUPLING_TOLERANCE, threshold=None,
+                 multisphere=None, mie=None, parallel=None):
+        self.tolerance = tolerance
+        self.threshold = threshold
+        self.multisphere = Multisphere() if multisphere is None else multisphere
+        # match Multisphere, which leaves out the radial component
+        self.mie = Mie(compute_escat_radial=False) if mie is None else mie
+        self.parallel = parallel
+        super().__init__()
+
+    def _can_handle(self, scatterer):
+        if isinstance(scatterer, Sphere):
+            return True
+        return (isinstance(scatterer, Spheres) and
+                all(np.isscalar(s.r) for s in scatterer.scatterers))
+
+    def _get_field_from(self, scatterer, schema):
+        if isinstance(scatterer, Sphere):
+            return self.mie._get_field_from(scatterer, schema)
+        medium_wavevec = 2 * np.pi / (schema.illum_wavelen /
+                                      schema.medium_index)
+        groups = self.groups(scatterer, medium_wavevec, schema.medium_index)
+        tasks = []
+        for group in groups:
+            if len(group) > MULTISPHERE_MAX_SPHERES:
+                warn("Group of {} interacting spheres is too large for "
+                     "Multisphere, neglecting multiple scattering between "
+                     "them.".format(len(group)))
+            if 1 < len(group) <= MULTISPHERE_MAX_SPHERES:
+                tasks.append(
+                    (self.multisphere, _select(scatterer, group), schema))
+            else:
+                tasks.extend((self.mie, scatterer.scatterers[index], schema)
+                             for index in group)
+        fields = list(self._choose_pool().map(_field_from, tasks))
+        return sum(fields[1:], fields[0])
+
+    def _choose_pool(self):
+        if self.parallel is None or hasattr(self.parallel, 'map'):
+            return choose_pool(self.parallel)
+        if in_worker_process():
+            return choose_pool(None)
+        if self.__dict__.get('_pool') is None:
+            if (_starts_process_pool(self.parallel) and
+                    not _chooses_mpi(self.parallel)):
+                processes = (self.parallel if isinstance(self.parallel, int)
+                             else None)
+                self._pool = WorkerPool(processes)
+            else:
+                self._pool = choose_pool(self.parallel)
+            # stop the processes if the theory is dropped without close()
+            self._finalizer = weakref.finalize(self, self._pool.close)
+        return self._pool
+
+    def close(self):
+        """Stop the processes started to compute fields in parallel."""
+        self.__dict__.pop('_pool', None)
+        finalizer = self.__dict__.pop('_finalizer', None)
+        if finalizer is not None:
+            finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getstate__(self):
+        # running processes cannot be sent to another process
+        state = self.__dict__.copy()
+        state.pop('_pool', None)
+        state.pop('_finalizer', None)
+        return state
+
+    def groups(self, spheres, medium_wavevec, medium_index):
+        """
+        Indices of the spheres solved together
+
+        Returns
+        -------
+        groups : list of lists of int
+        """
+        return interacting_groups(spheres, medium_wavevec, medium_index,
+                                  self.tolerance, self.threshold)
+
+
+class AutoFast(HoloPyObject):
+    """
+    Choose the cheapest theory accurate to within a tolerance for each
+    scatterer, as theory='auto-fast' does with the default tolerance.
+
+    Pass it as the theory of calc functions or models. The theory is chosen
+    again for every scatterer, so it follows the spheres as a model's
+    parameters change. See :func:`.determine_fast_theory_for`.
+
+    Parameters
+    ----------
+    tolerance : float
+        largest acceptable coupling between spheres treated independently,
+        roughly the relative error accepted in their scattered fields.
+    """
+    def __init__(self, tolerance=DEFAULT_COUPLING_TOLERANCE):
+        self.tolerance = tolerance
+
+
+def _field_from(task):
+    theory, scatterer, schema = task
+    return theory._get_field_from(scatterer, schema)
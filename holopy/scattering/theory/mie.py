@@ -29,6 +29,7 @@ scattered field.
 import numpy as np
 from holopy.core.utils import ensure_array
 from holopy.core.errors import DependencyMissing
+from holopy.core.profiling import stage
 from holopy.scattering.errors import TheoryNotCompatibleError, InvalidScatterer
 from holopy.scattering.scatterer import Sphere, Spheres
 from holopy.scattering.theory.scatteringtheory import ScatteringTheory
@@ -63,7 +64,7 @@ class Mie(ScatteringTheory):
     """
 
     def __init__(self, compute_escat_radial=True, full_radial_dependence=True,
-                 eps1=1e-2, eps2=1e-16):
+                 eps1=1e-2, eps2=1e-16, truncation_tolerance=None):
         """
         Parameters
         ----------
@@ -72,11 +73,18 @@ class Mie(ScatteringTheory):
         full_radial dependence : bool
             determines if the full spherical Hankel function will be used,
             or if it will be approximated to be in the far field.
+        truncation_tolerance : float (optional)
+            When superposing fields of several spheres, only compute each
+            sphere's field at detector points where it is estimated to be
+            larger than truncation_tolerance times the incident field.
+            Speeds up holograms of many small or distant spheres on large
+            detectors. By default fields are computed everywhere.
         """
         self.compute_escat_radial = compute_escat_radial
         self.full_radial_dependence = full_radial_dependence
         self.eps1 = eps1
         self.eps2 = eps2
+        self.truncation_tolerance = truncation_tolerance
         if not _COMPILED_FORTRAN:
             raise DependencyMissing("Mie theory", "This is probably "
                                     "due to a problem with compiling Fortran "
@@ -106,10 +114,13 @@ class Mie(ScatteringTheory):
     def _raw_fields(
             self, positions, scatterer, medium_wavevec, medium_index,
             illum_polarization):
-        scat_coeffs = self._scat_coeffs(scatterer, medium_wavevec, medium_index)
-        fields = mieangfuncs.mie_fields(
-            positions, scat_coeffs, illum_polarization.values[:2],
-            self.compute_escat_radial, self.full_radial_dependence)
+        with stage('scattering coefficients'):
+            scat_coeffs = self._scat_coeffs(
+                scatterer, medium_wavevec, medium_index)
+        with stage('field kernel'):
+            fields = mieangfuncs.mie_fields(
+                positions, scat_coeffs, illum_polarization.values[:2],
+                self.compute_escat_radial, self.full_radial_dependence)
         return fields
 
     def _raw_internal_fields(
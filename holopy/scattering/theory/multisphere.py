@@ -35,6 +35,7 @@ from scipy.integrate import dblquad
 
 from holopy.core.utils import SuppressOutput
 from holopy.core.errors import DependencyMissing
+from holopy.core.profiling import stage
 from holopy.scattering.scatterer import Spheres,Sphere
 from holopy.scattering.errors import (
     TheoryNotCompatibleError, InvalidScatterer, MultisphereFailure)
@@ -213,10 +214,12 @@ class Multisphere(ScatteringTheory):
 
     def _raw_fields(self, positions, scatterer, medium_wavevec, medium_index,
                     illum_polarization):
-        amn, lmax = self._scsmfo_setup(scatterer, medium_wavevec=medium_wavevec, medium_index=medium_index)
-        fields = mieangfuncs.tmatrix_fields(positions, amn, lmax, 0,
-                                            illum_polarization.values[:2],
-                                            self.compute_escat_radial)
+        with stage('scattering coefficients'):
+            amn, lmax = self._scsmfo_setup(scatterer, medium_wavevec=medium_wavevec, medium_index=medium_index)
+        with stage('field kernel'):
+            fields = mieangfuncs.tmatrix_fields(positions, amn, lmax, 0,
+                                                illum_polarization.values[:2],
+                                                self.compute_escat_radial)
         if np.isnan(fields[0][0]):
             raise MultisphereFailure()
 
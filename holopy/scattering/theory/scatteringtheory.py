@@ -31,10 +31,12 @@ import xarray as xr
 
 from holopy.core.math import find_transformation_function
 from holopy.core.holopy_object import HoloPyObject
+from holopy.core.profiling import profiled, stage
 from holopy.scattering.scatterer import Scatterers
 from holopy.scattering.errors import TheoryNotCompatibleError, MissingParameter
 from holopy.core.metadata import (
-    vector, illumination, flat, update_metadata, clean_concat)
+    vector, illumination, flat, update_metadata, clean_concat, get_metadata,
+    get_coordinate)
 from holopy.core.utils import ensure_array
 try:
     from holopy.scattering.theory.mie_f import mieangfuncs
@@ -43,7 +45,8 @@ except ImportError:
 
 
 def get_wavevec_from(schema):
-    return 2 * np.pi / (schema.illum_wavelen / schema.medium_index)
+    return 2 * np.pi / (get_metadata(schema, 'illum_wavelen') /
+                        get_metadata(schema, 'medium_index'))
 
 
 class ScatteringTheory(HoloPyObject):
@@ -62,9 +65,18 @@ class ScatteringTheory(HoloPyObject):
     need to do _raw_fields there is a way to compute it more efficently
     and you care about that speed, or if it is easier and you don't care
     about matrices.
+
+    Fields of composite scatterers the theory cannot handle directly are
+    superposed from their components. Theories setting
+    `truncation_tolerance` evaluate each component's field only within
+    the window of detector points where it exceeds that fraction of the
+    incident field, which makes superposition over many small particles
+    on large detectors scale with the total window area.
     """
     desired_coordinate_system = 'spherical'
+    truncation_tolerance = None
 
+    @profiled
     def calculate_scattered_field(self, scatterer, schema):
         """
         Implemented in derived classes only.
@@ -146,21 +158,77 @@ class ScatteringTheory(HoloPyObject):
 
     def _calculate_scattered_field_from_superposition(
             self, scatterers, schema):
-        field = self._calculate_single_color_scattered_field(
-            scatterers[0], schema)
-        for s in scatterers[1:]:
-            field += self._calculate_single_color_scattered_field(s, schema)
+        if self.truncation_tolerance is None or not hasattr(schema, 'x'):
+            field = self._calculate_raw_field(scatterers[0], schema)
+            for s in scatterers[1:]:
+                field = field + self._calculate_raw_field(s, schema)
+            return field
+
+        # evaluate each component only where its field is above tolerance,
+        # accumulating into a single buffer
+        flattened_schema = flat(schema)
+        point_or_flat = self._is_detector_view_point_or_flat(flattened_schema)
+        x = flattened_schema.x.values
+        y = flattened_schema.y.values
+        field = np.zeros((len(x), 3), dtype='complex128')
+        for s in scatterers:
+            radius = self._truncation_radius(s, flattened_schema)
+            inside = (x - s.center[0])**2 + (y - s.center[1])**2 <= radius**2
+            if inside.all():
+                field += self._calculate_raw_field(s, flattened_schema)
+            elif inside.any():
+                window = flattened_schema.isel(
+                    {point_or_flat: np.flatnonzero(inside)})
+                field[inside] += self._calculate_raw_field(s, window)
         return field
 
+    @profiled
+    def _truncation_radius(self, scatterer, schema):
+        """
+        Lateral distance from scatterer beyond which its scattered field
+        is below truncation_tolerance times the incident field, estimated
+        from its far field scattering matrix. Infinite if the far field
+        is unavailable or the scatterer is not above the detector.
+        """
+        height = scatterer.center[2] - schema.z.values.max()
+        if not hasattr(self, '_raw_scat_matrs') or not height > 0:
+            return np.inf
+        wavevec = get_wavevec_from(schema)
+        theta = np.linspace(0, np.pi / 2, 91)[:-1]
+        positions = np.array([np.full_like(theta, np.inf), theta,
+                              np.zeros_like(theta)])
+        try:
+            scat_matrs = self._raw_scat_matrs(
+                scatterer, positions, medium_wavevec=wavevec,
+                medium_index=schema.medium_index)
+        except (TheoryNotCompatibleError, NotImplementedError):
+            return np.inf
+        amplitude = np.abs(np.reshape(scat_matrs, (len(theta), -1))).max(1)
+        # largest amplitude at this or any larger angle
+        envelope = np.maximum.accumulate(amplitude[::-1])[::-1]
+        # far field amplitude at a detector point seen at angle theta
+        field = envelope * np.cos(theta) / (wavevec * height)
+        above = np.flatnonzero(field >= self.truncation_tolerance)
+        if len(above) == 0:
+            return 0.
+        if above[-1] == len(theta) - 1:
+            return np.inf
+        return height * np.tan(theta[above[-1] + 1])
+
     def _calculate_single_color_scattered_field(self, scatterer, schema):
+        field = self._calculate_raw_field(scatterer, schema)
+        return self._pack_field_into_xarray(field, schema)
+
+    def _calculate_raw_field(self, scatterer, schema):
         if self._can_handle(scatterer):
             field = self._get_field_from(scatterer, schema)
         elif isinstance(scatterer, Scatterers):
-            field = self._calculate_scattered_field_from_superposition(
-                scatterer.get_component_list(), schema)
+            with stage('superposition'):
+                field = self._calculate_scattered_field_from_superposition(
+                    scatterer.get_component_list(), schema)
         else:
             raise TheoryNotCompatibleError(self, scatterer)
-        return self._pack_field_into_xarray(field, schema)
+        return field
 
     def _get_field_from(self, scatterer, schema):
         """
@@ -177,18 +245,21 @@ class ScatteringTheory(HoloPyObject):
         wavevector = get_wavevec_from(schema)
         positions = self._transform_to_desired_coordinates(
             schema, scatterer.center, wavevec=wavevector)
-        scattered_field = np.transpose(
-            self._raw_fields(
-                positions,
-                scatterer,
-                medium_wavevec=wavevector,
-                medium_index=schema.medium_index,
-                illum_polarization=schema.illum_polarization)
-            )
+        with stage('_raw_fields'):
+            scattered_field = np.transpose(
+                self._raw_fields(
+                    positions,
+                    scatterer,
+                    medium_wavevec=wavevector,
+                    medium_index=get_metadata(schema, 'medium_index'),
+                    illum_polarization=get_metadata(
+                        schema, 'illum_polarization'))
+                )
         phase = np.exp(-1j * wavevector * scatterer.center[2])
         scattered_field *= phase
         return scattered_field
 
+    @profiled
     def _pack_field_into_xarray(self, scattered_field, schema):
         """Packs the numpy.ndarray, shape (N, 3) ``scattered_field`` into
         an xr.DataArray, shape (N, 3). This function needs to pack the
@@ -255,22 +326,26 @@ class ScatteringTheory(HoloPyObject):
         return point_or_flat
 
     @classmethod
+    @profiled
     def _transform_to_desired_coordinates(cls, detector, origin, wavevec=1):
-        if hasattr(detector, 'theta') and hasattr(detector, 'phi'):
+        theta = get_coordinate(detector, 'theta')
+        phi = get_coordinate(detector, 'phi')
+        if theta is not None and phi is not None:
             original_coordinate_system = 'spherical'
+            r = get_coordinate(detector, 'r')
             original_coordinate_values = [
-                (detector.r.values * wavevec if hasattr(detector, 'r')
-                    else np.full(detector.theta.values.shape, np.inf)),
-                detector.theta.values,
-                detector.phi.values,
+                (r * wavevec if r is not None
+                    else np.full(theta.shape, np.inf)),
+                theta,
+                phi,
                 ]
         else:
             original_coordinate_system = 'cartesian'
             f = flat(detector)  # 1.6 ms
             original_coordinate_values = [
-                wavevec * (f.x.values - origin[0]),
-                wavevec * (f.y.values - origin[1]),
-                wavevec * (origin[2] - f.z.values),
+                wavevec * (get_coordinate(f, 'x') - origin[0]),
+                wavevec * (get_coordinate(f, 'y') - origin[1]),
+                wavevec * (origin[2] - get_coordinate(f, 'z')),
                 # z is defined opposite light propagation, so we invert
                 ]
         method = find_transformation_function(
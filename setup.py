@@ -88,6 +88,7 @@ if __name__ == "__main__":
           version=__version__,
           description='Holography in Python',
           install_requires=requires,
+          python_requires='>=3.7',
           tests_require=tests_require,
           author='Manoharan Lab, Harvard University',
           author_email='vnm@seas.harvard.edu',